@@ -0,0 +1,101 @@
+"""
+Concurrent-request throughput of a Stripe-backed route, blocking vs. async.
+
+The "blocking" variant reproduces the old handlers: an ``async def`` route
+that calls the synchronous Stripe SDK and therefore parks the event loop for
+the whole round trip. The "async" variant drives the real
+``GET /customer/{id}`` route, which awaits ``CustomerService``.
+
+Every request asks for a different customer, so the real route can neither
+answer from ``customer_cache`` nor coalesce calls through ``stripe_reads``:
+both variants make one Stripe call per request, and the difference is only
+whether the event loop waits for it.
+
+Usage:
+    python -m benchmarks.async_io --requests 200 --concurrency 50 --latency 0.05
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+import stripe
+from fastapi import FastAPI
+
+from benchmarks.fake_stripe import FakeStripe, FakeStripeHTTPClient
+from src.app import app
+from src.core import StripeScheduler, configure_stripe_client
+from src.schemas import CustomerResponse
+
+
+def blocking_app() -> FastAPI:
+    """Build an app whose handler blocks on the synchronous SDK."""
+    legacy = FastAPI()
+
+    @legacy.get("/customer/{customer_id}")
+    async def retrieve_customer(customer_id: str) -> CustomerResponse:
+        customer = stripe.Customer.retrieve(customer_id)
+        return CustomerResponse.model_validate(customer, from_attributes=True)
+
+    return legacy
+
+
+async def drive(target: FastAPI, paths: list[str], concurrency: int) -> float:
+    """
+    GET each of ``paths`` once, with at most ``concurrency`` in flight.
+
+    Returns:
+        float: Achieved throughput in requests per second.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    transport = httpx.ASGITransport(app=target)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+
+        async def one(path: str) -> None:
+            async with semaphore:
+                response = await client.get(path)
+                response.raise_for_status()
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(path) for path in paths))
+        return len(paths) / (time.perf_counter() - started)
+
+
+async def main(requests: int, concurrency: int, latency: float) -> None:
+    backend = FakeStripe()
+    address = {"city": "Recife", "country": "BR", "line1": "Rua 1", "postal_code": "50000-000", "state": "PE"}
+    # One customer per request and variant: no request can reuse another's read.
+    customers = [
+        backend.seed(
+            "customers",
+            email=f"bench-{index}@example.com",
+            name="Bench",
+            metadata={"user_id": f"bench-user-{index}"},
+            address=address,
+            shipping={"name": "Bench", "address": address},
+        )
+        for index in range(2 * requests)
+    ]
+    stripe.api_key = "sk_test_benchmark"
+    stripe.default_http_client = FakeStripeHTTPClient(backend, latency=latency)
+    # Lift Stripe's rate limits: this measures the event loop, not the scheduler.
+    unthrottled = StripeScheduler(search_rate=1e9, read_rate=1e9, write_rate=1e9, deadline=60.0)
+    configure_stripe_client(FakeStripeHTTPClient(backend, latency=latency), unthrottled)
+    paths = [f"/customer/{customer['id']}" for customer in customers]
+
+    print(f"{requests} requests, concurrency {concurrency}, Stripe latency {latency * 1000:.0f} ms")
+    for index, (label, target) in enumerate((("blocking", blocking_app()), ("async", app))):
+        backend.calls.clear()
+        throughput = await drive(target, paths[index * requests:(index + 1) * requests], concurrency)
+        per_request = sum(backend.calls.values()) / requests
+        print(f"  {label:<9} {throughput:8.1f} req/s {per_request:6.2f} Stripe calls/request")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.05, help="simulated Stripe round trip, seconds")
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.concurrency, args.latency))
@@ -0,0 +1,115 @@
+"""
+Hit rate and lookup cost of each cache backend as workers are added.
+
+Splits ``--lookups`` random customer lookups among ``--keys`` over
+``--workers`` processes, like uvicorn workers behind one port. Each lookup
+goes through a ``Cache`` and stores a ``CustomerResponse`` on a miss, as
+``CustomerService`` does. With the ``memory`` backend every worker warms its
+own copy, so the hit rate falls as workers are added; the ``sqlite`` and
+``redis`` backends are shared, so it does not.
+
+The ``redis`` backend is measured only when ``--redis-url`` is given, e.g. a
+local ``docker run -p 6379:6379 redis``.
+
+Usage:
+    python -m benchmarks.cache --workers 1 2 4 8 --keys 2000 --lookups 20000
+    python -m benchmarks.cache --redis-url redis://localhost:6379/15
+"""
+import argparse
+import asyncio
+import multiprocessing
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from src.core import (
+    Cache,
+    CacheBackend,
+    MemoryCacheBackend,
+    RedisCacheBackend,
+    SQLiteCacheBackend,
+    model_codec,
+    settings,
+)
+from src.schemas import CustomerResponse
+
+ADDRESS = {"city": "Recife", "country": "BR", "line1": "Rua da Aurora, 100", "postal_code": "50050-000", "state": "PE"}
+
+
+def make_backend(name: str, location: str | None) -> CacheBackend:
+    """Create a backend like ``get_cache_backend`` does, at ``location`` (file or URL)."""
+    if name == "redis":
+        return RedisCacheBackend(location, settings.CACHE_REDIS_TIMEOUT)
+    if name == "sqlite":
+        return SQLiteCacheBackend(settings.CACHE_MAXSIZE, location)
+    return MemoryCacheBackend(settings.CACHE_MAXSIZE)
+
+
+def customer_cache(backend: CacheBackend) -> Cache:
+    return Cache("bench_customer", ttl=300.0, codec=model_codec(CustomerResponse), backend=backend)
+
+
+def lookups(backend: str, location: str | None, keys: int, count: int, seed: int) -> tuple[int, int, float]:
+    """
+    Run ``count`` read-through lookups in a worker process.
+
+    Returns:
+        tuple[int, int, float]: Hits, misses and the mean µs per lookup.
+    """
+    cache = customer_cache(make_backend(backend, location))
+    rng = random.Random(seed)
+
+    async def read_through() -> None:
+        for _ in range(count):
+            key = f"cus_{rng.randrange(keys):08d}"
+            if await cache.get(key) is None:
+                await cache.set(key, CustomerResponse(
+                    id=key,
+                    email=f"{key}@example.com",
+                    name="Cliente",
+                    shipping={"name": "Cliente", "address": ADDRESS},
+                    address=ADDRESS,
+                    metadata={"user_id": key},
+                ))
+
+    started = time.perf_counter()
+    asyncio.run(read_through())
+    elapsed = time.perf_counter() - started
+    return cache.hits, cache.misses, elapsed / count * 1e6
+
+
+def run(backend: str, location: str | None, workers: int, keys: int, count: int) -> tuple[float, float]:
+    """Return the hit rate over all workers and their mean µs per lookup."""
+    asyncio.run(customer_cache(make_backend(backend, location)).clear())
+
+    with multiprocessing.get_context("spawn").Pool(workers) as pool:
+        results = pool.starmap(
+            lookups, [(backend, location, keys, count // workers, seed) for seed in range(workers)]
+        )
+    hits = sum(result[0] for result in results)
+    total = sum(result[0] + result[1] for result in results)
+    return hits / total, sum(result[2] for result in results) / workers
+
+
+def main(args: argparse.Namespace) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        backends = {"memory": None, "sqlite": str(Path(directory) / "cache.db")}
+        if args.redis_url:
+            backends["redis"] = args.redis_url
+
+        print(f"{args.keys} keys, {args.lookups} lookups split over the workers")
+        print(f"{'backend':<8} {'workers':>7} {'hit rate':>9} {'µs/lookup':>10}")
+        for backend, location in backends.items():
+            for workers in args.workers:
+                hit_rate, us = run(backend, location, workers, args.keys, args.lookups)
+                print(f"{backend:<8} {workers:>7} {hit_rate:>9.1%} {us:>10.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8], help="worker processes")
+    parser.add_argument("--keys", type=int, default=2000, help="distinct customers looked up")
+    parser.add_argument("--lookups", type=int, default=20000, help="lookups in total")
+    parser.add_argument("--redis-url", help="also measure a Redis-protocol server at this URL")
+    main(parser.parse_args())
@@ -0,0 +1,94 @@
+"""
+Latency and Stripe call count of the product catalog listing.
+
+Compares the old per-product listing (one ``Price.list`` per product) with
+``ProductService.list_products_async``, which drains ``Product.list`` and
+``Price.list`` once each and groups prices locally, and with a second
+``list_products_async`` call answered from ``catalog_cache``.
+
+Usage:
+    python -m benchmarks.catalog --sizes 10 100 1000 --latency 0.02
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks.fake_stripe import FakeStripe, FakeStripeHTTPClient
+from src.core import configure_stripe_client, get_stripe_client
+from src.schemas import ProductResponse
+from src.services import ProductService
+from src.services.catalog import catalog_cache
+
+
+def seed_catalog(backend: FakeStripe, products: int, prices_per_product: int = 2) -> None:
+    """Fill ``backend`` with ``products`` active products and their prices."""
+    for index in range(products):
+        product = backend.seed("products", name=f"Plan {index}", description=f"Plan number {index}")
+        for interval in ("month", "year")[:prices_per_product]:
+            backend.seed(
+                "prices",
+                product=product["id"],
+                unit_amount=990 * (index + 1),
+                currency="brl",
+                recurring={"interval": interval, "interval_count": 1, "trial_period_days": None},
+            )
+
+
+async def per_product_listing() -> list[ProductResponse]:
+    """The listing as it used to be: one ``Price.list`` call per product."""
+    client = get_stripe_client()
+    products = await ProductService._list_all(client.v1.products, {"active": True, "limit": 100})
+    result = []
+    for product in products:
+        prices = await client.v1.prices.list_async(
+            params={"product": product.id, "active": True, "expand": ["data.product"]}
+        )
+        result.append(
+            ProductResponse(
+                id=product.id,
+                name=product.name,
+                description=product.description,
+                metadata=dict(product.metadata) if product.metadata else None,
+                created=product.created,
+                prices=[ProductService.map_price_to_response(price) for price in prices.data],
+            )
+        )
+    return result
+
+
+async def measure(backend: FakeStripe, listing) -> tuple[float, int, int]:
+    """
+    Run one listing and return its wall time, Stripe calls and product count.
+    """
+    backend.calls.clear()
+    started = time.perf_counter()
+    products = await listing()
+    elapsed = time.perf_counter() - started
+    return elapsed, sum(backend.calls.values()), len(products)
+
+
+async def main(sizes: list[int], latency: float) -> None:
+    print(f"Stripe latency {latency * 1000:.0f} ms")
+    print(f"{'products':>8}  {'variant':<12} {'time (ms)':>10} {'calls':>6}")
+    for size in sizes:
+        backend = FakeStripe()
+        seed_catalog(backend, size)
+        configure_stripe_client(FakeStripeHTTPClient(backend, latency=latency))
+        await catalog_cache.clear()
+
+        for label, listing in (
+            ("per-product", per_product_listing),
+            ("batched", ProductService.list_products_async),
+            ("cached", ProductService.list_products_async),
+        ):
+            elapsed, calls, listed = await measure(backend, listing)
+            assert listed == size, f"{label} listed {listed} of {size} products"
+            print(f"{size:>8}  {label:<12} {elapsed * 1000:>10.3f} {calls:>6}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--latency", type=float, default=0.02, help="simulated Stripe round trip, seconds")
+    args = parser.parse_args()
+    asyncio.run(main(args.sizes, args.latency))
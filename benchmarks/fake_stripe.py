@@ -0,0 +1,329 @@
+import asyncio
+import itertools
+import json
+import re
+import time
+from collections import defaultdict
+from email.utils import formatdate
+from typing import Any
+from urllib.parse import parse_qsl, urlsplit
+
+import stripe
+
+
+RESOURCES = {
+    "customers": ("customer", "cus"),
+    "payment_intents": ("payment_intent", "pi"),
+    "products": ("product", "prod"),
+    "prices": ("price", "price"),
+    "subscriptions": ("subscription", "sub"),
+}
+
+NUMERIC_FIELDS = {"amount", "unit_amount", "interval_count", "trial_period_days", "limit"}
+
+SEARCH_QUERY = re.compile(r'metadata\["(?P<key>\w+)"\]:"(?P<value>[^"]*)"')
+
+
+def route_key(method: str, path: str) -> str:
+    """
+    Name the endpoint a request hits, with object ids replaced by ``{id}``.
+
+    Example: ``route_key("post", "/v1/customers/cus_1")`` is
+    ``"POST /v1/customers/{id}"``.
+    """
+    parts = path.strip("/").split("/")[1:]
+    route = "/".join(["{id}" if i == 1 and p != "search" else p for i, p in enumerate(parts)])
+    return f"{method.upper()} /v1/{route}"
+
+
+def decode_params(raw: str) -> dict[str, Any]:
+    """
+    Decode Stripe's form encoding (``a[b][0]=c``) back into nested values.
+
+    Args:
+        raw (str): The url-encoded query string or request body.
+
+    Returns:
+        dict[str, Any]: The decoded parameters, with numeric keys turned into lists.
+    """
+    root: dict[str, Any] = {}
+    for key, value in parse_qsl(raw, keep_blank_values=True):
+        parts = re.findall(r"[^\[\]]+", key)
+        node = root
+        for part in parts[:-1]:
+            node = node.setdefault(part, {})
+        node[parts[-1]] = value
+
+    def listify(node: Any) -> Any:
+        if not isinstance(node, dict):
+            return node
+        if node and all(k.isdigit() for k in node):
+            return [listify(node[k]) for k in sorted(node, key=int)]
+        return {k: listify(v) for k, v in node.items()}
+
+    return listify(root)
+
+
+def coerce(value: Any, field: str = "") -> Any:
+    """
+    Coerce form-encoded scalars back into the JSON types Stripe would return.
+    """
+    if isinstance(value, dict):
+        return {k: coerce(v, k) for k, v in value.items()}
+    if isinstance(value, list):
+        return [coerce(v, field) for v in value]
+    if value in ("true", "false"):
+        return value == "true"
+    if value == "":
+        return None
+    if field in NUMERIC_FIELDS and isinstance(value, str):
+        return int(value)
+    return value
+
+
+class FakeStripe:
+    """
+    In-memory stand-in for the slice of the Stripe API used by the services.
+
+    It understands create, retrieve, update, delete, list (with cursor
+    pagination) and ``metadata["key"]:"value"`` search for every resource in
+    ``RESOURCES``, plus the payment intent and subscription cancel actions.
+
+    Like Stripe, search can lag behind writes: an object created less than
+    ``search_lag`` seconds ago is not returned by search yet, while retrieve
+    and list see it immediately.
+
+    Attributes:
+        objects (dict[str, dict[str, dict]]): Stored objects grouped by resource.
+        calls (dict[str, int]): Number of requests served per ``METHOD /path``.
+        search_lag (float): Seconds before a new object becomes searchable.
+    """
+
+    def __init__(self, search_lag: float = 0.0):
+        self.objects: dict[str, dict[str, dict]] = defaultdict(dict)
+        self.calls: dict[str, int] = defaultdict(int)
+        self.search_lag = search_lag
+        self._ids = itertools.count(1)
+        self._clock = itertools.count(1_700_000_000)
+        self._searchable_at: dict[str, float] = {}
+
+    def seed(self, resource: str, **fields) -> dict:
+        """Insert an object directly, bypassing the request path."""
+        return self._create(resource, coerce(fields))
+
+    def handle(self, method: str, path: str, params: dict[str, Any]) -> tuple[int, dict]:
+        """
+        Serve one API request.
+
+        Args:
+            method (str): The HTTP method.
+            path (str): The request path, e.g. ``/v1/customers/cus_1``.
+            params (dict[str, Any]): The decoded query or body parameters.
+
+        Returns:
+            tuple[int, dict]: The HTTP status code and the JSON body.
+        """
+        parts = path.strip("/").split("/")[1:]
+        resource = parts[0] if parts else ""
+        self.calls[route_key(method, path)] += 1
+
+        if resource not in RESOURCES:
+            return self._error(404, f"Unrecognized request URL ({method} {path})")
+
+        params = coerce(params)
+        expand = params.pop("expand", None) or []
+        method = method.upper()
+
+        if len(parts) == 1 and method == "POST":
+            return 200, self._expand(resource, self._create(resource, params), expand)
+        if len(parts) == 1 and method == "GET":
+            return 200, self._list(resource, params, expand)
+        if parts[1] == "search":
+            return 200, self._search(resource, params, expand)
+
+        obj = self.objects[resource].get(parts[1])
+        if obj is None:
+            return self._error(404, f"No such {RESOURCES[resource][0]}: '{parts[1]}'")
+
+        if len(parts) == 3 and parts[2] == "cancel" and method == "POST":
+            obj.update(status="canceled", cancellation_reason=params.get("cancellation_reason"))
+            if resource == "subscriptions":
+                obj.update(canceled_at=next(self._clock), ended_at=next(self._clock))
+        elif method == "POST":
+            self._merge(obj, params)
+            obj["updated"] = next(self._clock)
+        elif method == "DELETE" and resource == "subscriptions":
+            obj.update(status="canceled", canceled_at=next(self._clock), ended_at=next(self._clock))
+        elif method == "DELETE":
+            del self.objects[resource][obj["id"]]
+            return 200, {"id": obj["id"], "object": obj["object"], "deleted": True}
+
+        return 200, self._expand(resource, obj, expand)
+
+    def _create(self, resource: str, params: dict[str, Any]) -> dict:
+        kind, prefix = RESOURCES[resource]
+        obj = {
+            "id": params.pop("id", None) or f"{prefix}_{next(self._ids):08d}",
+            "object": kind,
+            "created": next(self._clock),
+            "livemode": False,
+            "metadata": {},
+        }
+        obj.update(getattr(self, f"_defaults_{resource}")(params))
+        obj.update(params)
+        obj["metadata"] = obj["metadata"] or {}
+        self.objects[resource][obj["id"]] = obj
+        if self.search_lag:
+            self._searchable_at[obj["id"]] = time.monotonic() + self.search_lag
+        return obj
+
+    def _defaults_customers(self, params: dict) -> dict:
+        return {"email": None, "name": None, "address": None, "shipping": None}
+
+    def _defaults_payment_intents(self, params: dict) -> dict:
+        return {
+            "status": "requires_payment_method",
+            "client_secret": f"secret_{next(self._ids)}",
+            "cancellation_reason": None,
+        }
+
+    def _defaults_products(self, params: dict) -> dict:
+        return {"active": True, "description": None, "updated": next(self._clock)}
+
+    def _defaults_prices(self, params: dict) -> dict:
+        recurring = params.get("recurring")
+        if recurring:
+            recurring.setdefault("interval_count", 1)
+            recurring.setdefault("trial_period_days", None)
+        return {"active": True, "recurring": None}
+
+    def _defaults_subscriptions(self, params: dict) -> dict:
+        items = params.pop("items", None) or []
+        prices = self.objects["prices"]
+        data = [
+            {"id": f"si_{next(self._ids)}", "object": "subscription_item", "price": prices.get(item["price"], {"id": item["price"]})}
+            for item in items
+        ]
+        trial = params.pop("trial_period_days", None)
+        start = next(self._clock)
+        for key in ("payment_behavior", "payment_settings"):
+            params.pop(key, None)
+        return {
+            "status": "trialing" if trial else "active",
+            "start_date": start,
+            "ended_at": None,
+            "canceled_at": None,
+            "cancel_at_period_end": False,
+            "trial_start": start if trial else None,
+            "trial_end": start + trial * 86400 if trial else None,
+            "items": {"object": "list", "data": data, "has_more": False},
+        }
+
+    def _merge(self, target: dict, changes: dict) -> None:
+        for key, value in changes.items():
+            if isinstance(value, dict) and isinstance(target.get(key), dict):
+                self._merge(target[key], value)
+            else:
+                target[key] = value
+
+    def _list(self, resource: str, params: dict, expand: list[str]) -> dict:
+        limit = int(params.pop("limit", 10))
+        after = params.pop("starting_after", None)
+        rows = [
+            obj for obj in self.objects[resource].values()
+            if all(obj.get(k) == v for k, v in params.items())
+        ]
+        rows.sort(key=lambda o: o["created"], reverse=True)
+        if after is not None:
+            ids = [o["id"] for o in rows]
+            rows = rows[ids.index(after) + 1:] if after in ids else []
+        page = rows[:limit]
+        return {
+            "object": "list",
+            "url": f"/v1/{resource}",
+            "has_more": len(rows) > limit,
+            "data": [self._expand(resource, o, expand, prefix="data.") for o in page],
+        }
+
+    def _search(self, resource: str, params: dict, expand: list[str]) -> dict:
+        match = SEARCH_QUERY.search(str(params.get("query", "")))
+        limit = int(params.get("limit", 10))
+        offset = int(params.get("page") or 0)
+        now = time.monotonic()
+        rows = [
+            obj for obj in self.objects[resource].values()
+            if match and str(obj["metadata"].get(match["key"])) == match["value"]
+            and self._searchable_at.get(obj["id"], 0.0) <= now
+        ]
+        page = rows[offset:offset + limit]
+        has_more = len(rows) > offset + limit
+        return {
+            "object": "search_result",
+            "url": f"/v1/{resource}/search",
+            "has_more": has_more,
+            "next_page": str(offset + limit) if has_more else None,
+            "data": [self._expand(resource, o, expand, prefix="data.") for o in page],
+        }
+
+    def _expand(self, resource: str, obj: dict, expand: list[str], prefix: str = "") -> dict:
+        obj = dict(obj)
+        if resource == "prices" and f"{prefix}product" in expand:
+            obj["product"] = self.objects["products"].get(obj["product"], obj["product"])
+        return obj
+
+    @staticmethod
+    def _error(status: int, message: str) -> tuple[int, dict]:
+        return status, {"error": {"type": "invalid_request_error", "message": message}}
+
+
+class FakeStripeHTTPClient(stripe.HTTPClient):
+    """
+    Stripe SDK HTTP client that answers from a ``FakeStripe`` backend.
+
+    Synchronous requests sleep with ``time.sleep`` and asynchronous ones with
+    ``asyncio.sleep``, so the configured latency behaves like real network
+    I/O for both code paths.
+
+    Attributes:
+        backend (FakeStripe): The in-memory backend serving the requests.
+        latency (float): Simulated round-trip time in seconds.
+    """
+
+    name = "fake"
+
+    def __init__(self, backend: FakeStripe, latency: float = 0.0):
+        super().__init__()
+        self.backend = backend
+        self.latency = latency
+
+    def _respond(self, method: str, url: str, post_data) -> tuple[bytes, int, dict[str, str]]:
+        parts = urlsplit(url)
+        params = decode_params(parts.query)
+        if post_data:
+            params.update(decode_params(post_data if isinstance(post_data, str) else post_data.decode()))
+        status, body = self.backend.handle(method, parts.path, params)
+        headers = {"request-id": f"req_{next(self.backend._ids)}", "Date": formatdate(usegmt=True)}
+        return json.dumps(body).encode(), status, headers
+
+    def request(self, method, url, headers, post_data=None):
+        time.sleep(self.latency)
+        return self._respond(method, url, post_data)
+
+    async def request_async(self, method, url, headers, post_data=None):
+        await asyncio.sleep(self.latency)
+        return self._respond(method, url, post_data)
+
+    def request_stream(self, method, url, headers, post_data=None):
+        raise NotImplementedError("FakeStripeHTTPClient does not stream")
+
+    async def request_stream_async(self, method, url, headers, post_data=None):
+        raise NotImplementedError("FakeStripeHTTPClient does not stream")
+
+    def close(self):
+        pass
+
+    async def close_async(self):
+        pass
+
+    def sleep_async(self, secs: float):
+        return asyncio.sleep(secs)
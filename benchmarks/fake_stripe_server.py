@@ -0,0 +1,209 @@
+"""
+Fake Stripe API served over HTTP, with latency and failure injection.
+
+Serves the ``FakeStripe`` backend (customers, payment intents, products,
+prices and subscriptions, including list and search) on a local port so the
+real app, with its real pooled HTTP client, can be load-tested without
+network access, rate limits or cost. Point the app at it with
+``STRIPE_API_BASE``.
+
+Faults are drawn from a seeded random generator, so a run is reproducible:
+
+* ``--latency ENDPOINT=DIST`` sets the response delay of one endpoint
+  (named like ``"GET /v1/customers/search"``) or of every endpoint
+  (``default``). ``DIST`` is ``constant:s``, ``uniform:low,high``,
+  ``normal:mean,stddev``, ``lognormal:median,sigma`` or ``exponential:mean``,
+  all in seconds.
+* ``--rate-limit P`` answers a fraction ``P`` of requests with a 429.
+* ``--error-rate P`` answers a fraction ``P`` of requests with a 500, 502 or 503.
+* ``--search-lag S`` hides new objects from search for ``S`` seconds.
+
+``GET /_fake/stats`` returns the calls served and faults injected per
+endpoint; ``POST /_fake/reset`` empties the backend and the counters.
+
+Usage:
+    python -m benchmarks.fake_stripe_server --port 12111 \\
+        --latency default=lognormal:0.08,0.4 \\
+        --latency "GET /v1/customers/search=uniform:0.2,0.6" \\
+        --rate-limit 0.02 --error-rate 0.01 --search-lag 1.0
+    STRIPE_API_BASE=http://127.0.0.1:12111 STRIPE_SECRET_KEY=sk_test_fake uvicorn src.app:app
+"""
+import argparse
+import asyncio
+import random
+from collections import defaultdict
+from collections.abc import Callable
+from dataclasses import dataclass, field
+
+from starlette.applications import Starlette
+from starlette.requests import ClientDisconnect, Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+from benchmarks.fake_stripe import FakeStripe, decode_params, route_key
+
+DISTRIBUTIONS: dict[str, Callable[..., Callable[[random.Random], float]]] = {
+    "constant": lambda value: lambda rng: value,
+    "uniform": lambda low, high: lambda rng: rng.uniform(low, high),
+    "normal": lambda mean, stddev: lambda rng: rng.gauss(mean, stddev),
+    "lognormal": lambda median, sigma: lambda rng: median * rng.lognormvariate(0.0, sigma),
+    "exponential": lambda mean: lambda rng: rng.expovariate(1 / mean) if mean else 0.0,
+}
+
+
+def parse_distribution(spec: str) -> Callable[[random.Random], float]:
+    """
+    Parse a latency distribution such as ``uniform:0.01,0.05``.
+
+    Args:
+        spec (str): ``name:arg[,arg]`` with arguments in seconds; a bare
+            number means a constant delay.
+
+    Returns:
+        Callable[[random.Random], float]: Draws one delay, never negative.
+    """
+    name, _, args = spec.partition(":")
+    if not args:
+        name, args = "constant", name
+    if name not in DISTRIBUTIONS:
+        raise ValueError(f"Unknown latency distribution: {name}")
+    draw = DISTRIBUTIONS[name](*(float(arg) for arg in args.split(",")))
+    return lambda rng: max(0.0, draw(rng))
+
+
+@dataclass
+class Faults:
+    """
+    What the fake server injects into its responses.
+
+    Attributes:
+        latency (dict[str, Callable]): Delay distribution per endpoint key,
+            with ``"default"`` applying to the others.
+        rate_limit (float): Fraction of requests answered with a 429.
+        error_rate (float): Fraction of requests answered with a 5xx.
+        retry_after (int | None): ``Retry-After`` seconds sent with 429s, if any.
+        seed (int): Seed of the random generator drawing delays and faults.
+    """
+
+    latency: dict[str, Callable[[random.Random], float]] = field(default_factory=dict)
+    rate_limit: float = 0.0
+    error_rate: float = 0.0
+    retry_after: int | None = None
+    seed: int = 0
+
+    def delay(self, endpoint: str, rng: random.Random) -> float:
+        draw = self.latency.get(endpoint) or self.latency.get("default")
+        return draw(rng) if draw else 0.0
+
+
+def create_app(backend: FakeStripe | None = None, faults: Faults | None = None) -> Starlette:
+    """
+    Build the ASGI app serving ``backend`` under ``/v1``.
+
+    Args:
+        backend (FakeStripe | None): The objects store, a new one by default.
+        faults (Faults | None): Injected latency and failures, none by default.
+
+    Returns:
+        Starlette: The app; ``app.state.backend`` and ``app.state.faults``
+        hold its configuration.
+    """
+    backend = backend or FakeStripe()
+    faults = faults or Faults()
+    rng = random.Random(faults.seed)
+    injected: dict[str, dict[str, int]] = defaultdict(lambda: defaultdict(int))
+
+    async def api(request: Request) -> Response:
+        endpoint = route_key(request.method, request.url.path)
+        try:
+            body = await request.body()
+        except ClientDisconnect:
+            # The app cancelled the call, e.g. a losing duplicate check.
+            return Response(status_code=499)
+        # Draw every random value up front so the sequence does not depend on
+        # which branch a request takes.
+        delay, fault = faults.delay(endpoint, rng), rng.random()
+        await asyncio.sleep(delay)
+
+        if fault < faults.rate_limit:
+            injected[endpoint]["429"] += 1
+            headers = {"Retry-After": str(faults.retry_after)} if faults.retry_after is not None else {}
+            return JSONResponse(
+                {"error": {"type": "invalid_request_error", "code": "rate_limit",
+                           "message": "Too many requests hit the API too quickly."}},
+                status_code=429,
+                headers=headers,
+            )
+        if fault < faults.rate_limit + faults.error_rate:
+            status = (500, 502, 503)[int(fault * 1000) % 3]
+            injected[endpoint][str(status)] += 1
+            return JSONResponse(
+                {"error": {"type": "api_error", "message": "Injected server error."}},
+                status_code=status,
+            )
+
+        params = decode_params(request.url.query)
+        if body:
+            params.update(decode_params(body.decode()))
+        status, payload = backend.handle(request.method, request.url.path, params)
+        return JSONResponse(payload, status_code=status, headers={"Request-Id": f"req_fake_{rng.getrandbits(48):x}"})
+
+    async def stats(request: Request) -> Response:
+        return JSONResponse({
+            "calls": dict(backend.calls),
+            "injected": {endpoint: dict(counts) for endpoint, counts in injected.items()},
+        })
+
+    async def reset(request: Request) -> Response:
+        backend.objects.clear()
+        backend.calls.clear()
+        injected.clear()
+        return Response(status_code=204)
+
+    async def root(request: Request) -> Response:
+        return Response(status_code=200)
+
+    app = Starlette(routes=[
+        Route("/v1/{path:path}", api, methods=["GET", "POST", "DELETE"]),
+        Route("/_fake/stats", stats, methods=["GET"]),
+        Route("/_fake/reset", reset, methods=["POST"]),
+        Route("/", root, methods=["GET", "HEAD"]),
+    ])
+    app.state.backend = backend
+    app.state.faults = faults
+    return app
+
+
+def parse_latency(values: list[str]) -> dict[str, Callable[[random.Random], float]]:
+    """Parse ``ENDPOINT=DIST`` options into a latency table."""
+    latency = {}
+    for value in values:
+        endpoint, _, spec = value.rpartition("=")
+        latency[endpoint or "default"] = parse_distribution(spec)
+    return latency
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=12111)
+    parser.add_argument("--latency", action="append", default=[], metavar="ENDPOINT=DIST",
+                        help="delay distribution, e.g. default=uniform:0.02,0.08")
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="fraction of requests answered with 429")
+    parser.add_argument("--retry-after", type=int, help="Retry-After seconds sent with injected 429s")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with 5xx")
+    parser.add_argument("--search-lag", type=float, default=0.0, help="seconds before new objects are searchable")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    faults = Faults(
+        latency=parse_latency(args.latency),
+        rate_limit=args.rate_limit,
+        error_rate=args.error_rate,
+        retry_after=args.retry_after,
+        seed=args.seed,
+    )
+    app = create_app(FakeStripe(search_lag=args.search_lag), faults)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
@@ -0,0 +1,125 @@
+"""
+Cold import time of the app, checked against a stored budget.
+
+Imports each target (``src.app``, what every worker loads, and ``main``) in
+a fresh interpreter with ``-X importtime``, ``--repeat`` times keeping the
+fastest run, and reports the total and the slowest modules by self time.
+
+Also checks that the modules deferred until the first request that needs
+them, the Stripe SDK and its HTTP stack, are not loaded by the import.
+
+``--save`` stores a budget per target in
+``benchmarks/baselines/import_time.json``: the measured time plus
+``--tolerance`` (at least ``--slack-ms``). Later runs exit with status 1
+when a target takes longer than its budget or loads a deferred module.
+Timings are machine specific: record budgets on the host that checks them.
+
+Usage:
+    python -m benchmarks.import_time
+    python -m benchmarks.import_time --top 20
+    python -m benchmarks.import_time --save
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+BUDGETS = Path(__file__).parent / "baselines" / "import_time.json"
+TARGETS = ("src.app", "main")
+DEFERRED = ("stripe", "httpx")
+
+
+@dataclass
+class Result:
+    total_ms: float
+    slowest: list[tuple[str, float]]
+    loaded_deferred: list[str]
+
+
+def import_once(target: str) -> Result:
+    """
+    Import ``target`` in a new interpreter and parse its ``-X importtime`` log.
+
+    Args:
+        target (str): The module to import.
+
+    Returns:
+        Result: The cumulative import time of ``target``, every module's self
+        time, slowest first, and the deferred modules that got loaded.
+    """
+    code = (
+        f"import sys, json, {target}; "
+        f"print(json.dumps([m for m in {DEFERRED!r} if m in sys.modules]))"
+    )
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT,
+        env={**os.environ, "PYTHONPATH": str(ROOT)},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    total_us, self_us = 0, {}
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        own, cumulative, name = (part.strip() for part in line.removeprefix("import time:").split("|"))
+        self_us[name] = int(own)
+        if name == target:
+            total_us = int(cumulative)
+    slowest = sorted(((name, us / 1000) for name, us in self_us.items()), key=lambda item: -item[1])
+    return Result(total_us / 1000, slowest, json.loads(process.stdout))
+
+
+def measure(target: str, repeat: int) -> Result:
+    runs = [import_once(target) for _ in range(repeat)]
+    fastest = min(runs, key=lambda r: r.total_ms)
+    loaded = sorted({module for r in runs for module in r.loaded_deferred})
+    return Result(fastest.total_ms, fastest.slowest, loaded)
+
+
+def main(args: argparse.Namespace) -> int:
+    budgets = json.loads(BUDGETS.read_text()) if BUDGETS.exists() else {}
+    failed = False
+    for target in TARGETS:
+        result = measure(target, args.repeat)
+        budget = budgets.get(target)
+        limit = f" (budget {budget['budget_ms']:.0f} ms)" if budget else ""
+        print(f"{target}: {result.total_ms:.1f} ms{limit}")
+        for name, ms in result.slowest[:args.top]:
+            print(f"  {ms:>8.1f} ms  {name}")
+
+        if result.loaded_deferred:
+            failed = True
+            print(f"  REGRESSION loads {', '.join(result.loaded_deferred)} at import")
+        if args.save:
+            budgets[target] = {
+                "import_ms": round(result.total_ms, 1),
+                "budget_ms": round(max(result.total_ms * (1 + args.tolerance), result.total_ms + args.slack_ms), 1),
+            }
+        elif budget and result.total_ms > budget["budget_ms"]:
+            failed = True
+            print(f"  REGRESSION {budget['import_ms']:.1f} -> {result.total_ms:.1f} ms")
+
+    if args.save:
+        BUDGETS.parent.mkdir(parents=True, exist_ok=True)
+        BUDGETS.write_text(json.dumps(budgets, indent=2, sort_keys=True) + "\n")
+        print(f"Budgets saved to {BUDGETS}")
+    elif not budgets:
+        print("No budget recorded; run with --save to record one")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=5, help="imports per target, the fastest one counts")
+    parser.add_argument("--top", type=int, default=10, help="slowest modules listed")
+    parser.add_argument("--save", action="store_true", help="store the results as the budget")
+    parser.add_argument("--tolerance", type=float, default=0.3, help="allowed relative slowdown")
+    parser.add_argument("--slack-ms", type=float, default=50.0, help="allowed absolute slowdown, ms")
+    args = parser.parse_args()
+    sys.exit(main(args))
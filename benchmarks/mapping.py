@@ -0,0 +1,191 @@
+"""
+Cost of mapping Stripe objects to response models.
+
+Builds full-size ``Customer``, ``PaymentIntent`` and ``Subscription``
+objects shaped like real API responses and times ``ResponseMapper`` against
+a per-call ``Model.model_validate(obj, from_attributes=True)``, for a single
+object and for a 100-item page, plus
+``SubscriptionService.map_subscription_to_response``.
+
+Usage:
+    python -m benchmarks.mapping --number 20000
+"""
+import argparse
+import timeit
+
+import stripe
+
+from src.core import ResponseMapper
+from src.schemas import CustomerResponse, PaymentIntentResponse
+from src.services import SubscriptionService
+
+ADDRESS = {"city": "Recife", "country": "BR", "line1": "Rua da Aurora, 100", "line2": None, "postal_code": "50050-000", "state": "PE"}
+
+CUSTOMER = {
+    "id": "cus_NffrFeUfNV2Hib",
+    "object": "customer",
+    "address": ADDRESS,
+    "balance": 0,
+    "created": 1680893993,
+    "currency": None,
+    "default_source": None,
+    "delinquent": False,
+    "description": None,
+    "discount": None,
+    "email": "jenny.rosen@example.com",
+    "invoice_prefix": "0759376C",
+    "invoice_settings": {"custom_fields": None, "default_payment_method": None, "footer": None, "rendering_options": None},
+    "livemode": False,
+    "metadata": {"user_id": "user_123"},
+    "name": "Jenny Rosen",
+    "next_invoice_sequence": 1,
+    "phone": None,
+    "preferred_locales": [],
+    "shipping": {"address": ADDRESS, "name": "Jenny Rosen", "phone": None},
+    "tax_exempt": "none",
+    "test_clock": None,
+}
+
+PAYMENT_INTENT = {
+    "id": "pi_3MtwBwLkdIwHu7ix28a3tqPa",
+    "object": "payment_intent",
+    "amount": 2000,
+    "amount_capturable": 0,
+    "amount_details": {"tip": {}},
+    "amount_received": 0,
+    "application": None,
+    "application_fee_amount": None,
+    "automatic_payment_methods": {"allow_redirects": "always", "enabled": True},
+    "canceled_at": None,
+    "cancellation_reason": None,
+    "capture_method": "automatic",
+    "client_secret": "pi_3MtwBwLkdIwHu7ix28a3tqPa_secret_YrKJUKribcBjcG8HVhfZluoGH",
+    "confirmation_method": "automatic",
+    "created": 1680800504,
+    "currency": "brl",
+    "customer": None,
+    "description": None,
+    "last_payment_error": None,
+    "latest_charge": None,
+    "livemode": False,
+    "metadata": {"user_id": "user_123", "product_id": "prod_NWjs8kKbJWmuuc"},
+    "next_action": None,
+    "on_behalf_of": None,
+    "payment_method": None,
+    "payment_method_options": {"card": {"installments": None, "mandate_options": None, "network": None, "request_three_d_secure": "automatic"}},
+    "payment_method_types": ["card", "pix"],
+    "processing": None,
+    "receipt_email": None,
+    "setup_future_usage": None,
+    "shipping": None,
+    "statement_descriptor": None,
+    "status": "requires_payment_method",
+    "transfer_data": None,
+}
+
+PRICE = {
+    "id": "price_1MoBy5LkdIwHu7ixZhnattbh",
+    "object": "price",
+    "active": True,
+    "billing_scheme": "per_unit",
+    "created": 1679431181,
+    "currency": "brl",
+    "livemode": False,
+    "lookup_key": None,
+    "metadata": {},
+    "nickname": None,
+    "product": "prod_NZKdYqrwEYx6iK",
+    "recurring": {"aggregate_usage": None, "interval": "month", "interval_count": 1, "trial_period_days": None, "usage_type": "licensed"},
+    "tax_behavior": "unspecified",
+    "tiers_mode": None,
+    "transform_quantity": None,
+    "type": "recurring",
+    "unit_amount": 2990,
+    "unit_amount_decimal": "2990",
+}
+
+SUBSCRIPTION = {
+    "id": "sub_1MowQVLkdIwHu7ixeRlqHVzs",
+    "object": "subscription",
+    "application": None,
+    "automatic_tax": {"enabled": False, "liability": None},
+    "billing_cycle_anchor": 1679609767,
+    "cancel_at": None,
+    "cancel_at_period_end": False,
+    "canceled_at": None,
+    "collection_method": "charge_automatically",
+    "created": 1679609767,
+    "currency": "brl",
+    "customer": "cus_NffrFeUfNV2Hib",
+    "default_payment_method": None,
+    "discount": None,
+    "ended_at": None,
+    "items": {
+        "object": "list",
+        "data": [
+            {
+                "id": "si_Na6dzxczY5fwHx",
+                "object": "subscription_item",
+                "created": 1679609768,
+                "metadata": {},
+                "price": PRICE,
+                "quantity": 1,
+                "subscription": "sub_1MowQVLkdIwHu7ixeRlqHVzs",
+                "tax_rates": [],
+            }
+        ],
+        "has_more": False,
+        "url": "/v1/subscription_items?subscription=sub_1MowQVLkdIwHu7ixeRlqHVzs",
+    },
+    "latest_invoice": "in_1MowQWLkdIwHu7ixuzkSPfKd",
+    "livemode": False,
+    "metadata": {"user_id": "user_123"},
+    "start_date": 1679609767,
+    "status": "active",
+    "trial_end": None,
+    "trial_start": None,
+}
+
+
+def per_call_us(function, number: int) -> float:
+    """Return the mean duration of ``function()`` in microseconds."""
+    return min(timeit.repeat(function, number=number, repeat=3)) / number * 1e6
+
+
+def main(number: int) -> None:
+    customer = stripe.Customer.construct_from(CUSTOMER, "sk_test_benchmark")
+    intent = stripe.PaymentIntent.construct_from(PAYMENT_INTENT, "sk_test_benchmark")
+    subscription = stripe.Subscription.construct_from(SUBSCRIPTION, "sk_test_benchmark")
+    page = [intent] * 100
+    customers = ResponseMapper(CustomerResponse)
+    intents = ResponseMapper(PaymentIntentResponse)
+
+    rows = {
+        "CustomerResponse": (
+            lambda: CustomerResponse.model_validate(customer, from_attributes=True),
+            lambda: customers.map(customer),
+        ),
+        "PaymentIntentResponse": (
+            lambda: PaymentIntentResponse.model_validate(intent, from_attributes=True),
+            lambda: intents.map(intent),
+        ),
+        "PaymentIntentResponse x100": (
+            lambda: [PaymentIntentResponse.model_validate(item, from_attributes=True) for item in page],
+            lambda: intents.map_many(page),
+        ),
+    }
+
+    print(f"{'case':<28}{'model_validate':>16}{'ResponseMapper':>16}   (µs per call)")
+    for case, (validate, mapper) in rows.items():
+        runs = number // 100 if case.endswith("x100") else number
+        print(f"{case:<28}{per_call_us(validate, runs):>16.2f}{per_call_us(mapper, runs):>16.2f}")
+
+    mapped = per_call_us(lambda: SubscriptionService.map_subscription_to_response(subscription), number)
+    print(f"{'SubscriptionResponse':<28}{'':>16}{mapped:>16.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--number", type=int, default=20000, help="calls timed per case")
+    args = parser.parse_args()
+    main(args.number)
@@ -0,0 +1,386 @@
+"""
+Throughput and latency of every API route, with stored baselines.
+
+Drives each endpoint of the customer, payment-intents, products,
+subscriptions and webhooks routers in-process through ASGI against the
+deterministic ``FakeStripe`` backend, ``--requests`` times with at most
+``--concurrency`` requests in flight, ``--repeat`` times keeping the best
+run. Reports requests per second, p50/p95/p99 latency, non-2xx responses
+and Stripe calls per request.
+
+Objects a request consumes (a customer to delete, a subscription to cancel)
+are seeded beforehand, one per request, so every request does the same work;
+objects a request creates are unique to each run. Every request is expected
+to succeed: an endpoint answering any non-2xx fails the run, and is never
+saved as a baseline. Local SQLite stores live in a temporary directory and
+are discarded.
+
+``--save`` writes the results as the baseline for the current parameters to
+``benchmarks/baselines/routes.json``; later runs with the same parameters
+are compared against it and exit with status 1 when an endpoint's p95 or
+throughput is more than ``--tolerance`` worse (p95 also by ``--slack-ms``),
+or when it makes more Stripe calls than before.
+Timings are machine specific: record baselines on the host that checks them.
+
+Usage:
+    python -m benchmarks.routes --requests 200 --concurrency 20
+    python -m benchmarks.routes --only customer --latency 0.02
+    python -m benchmarks.routes --save
+"""
+import argparse
+import asyncio
+import hashlib
+import hmac
+import itertools
+import json
+import re
+import statistics
+import sys
+import tempfile
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+import httpx
+
+from benchmarks.fake_stripe import FakeStripe, FakeStripeHTTPClient
+from src.core import StripeScheduler, configure_stripe_client, settings
+
+BASELINES = Path(__file__).parent / "baselines" / "routes.json"
+
+WEBHOOK_SECRET = "whsec_benchmark"
+
+ADDRESS = {"city": "Recife", "country": "BR", "line1": "Rua da Aurora, 100", "postal_code": "50050-000", "state": "PE"}
+
+Request = Callable[[httpx.AsyncClient, int], Awaitable[httpx.Response]]
+
+
+@dataclass
+class Result:
+    """Measurements of one endpoint."""
+
+    rps: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    errors: int
+    stripe_calls: float
+
+
+def customer_body(user_id: str) -> dict:
+    return {
+        "email": f"{user_id}@example.com",
+        "name": f"Customer {user_id}",
+        "address": ADDRESS,
+        "shipping": {"name": f"Customer {user_id}", "address": ADDRESS},
+        "metadata": {"user_id": user_id},
+    }
+
+
+def sign(payload: bytes) -> str:
+    """Build a ``Stripe-Signature`` header for ``payload``."""
+    timestamp = int(time.time())
+    digest = hmac.new(
+        WEBHOOK_SECRET.encode(), f"{timestamp}.".encode() + payload, hashlib.sha256
+    ).hexdigest()
+    return f"t={timestamp},v1={digest}"
+
+
+class Fixtures:
+    """
+    Objects shared by the read endpoints, created through the API so local
+    indexes and mirrors are populated as they would be in production.
+    """
+
+    async def create(self, client: httpx.AsyncClient, backend: FakeStripe, requests: int) -> None:
+        self.backend = backend
+        self.requests = requests
+        self.runs = itertools.count()
+        customer = (await client.post("/customer/", json=customer_body("bench-user"))).json()
+        self.customer_id = customer["id"]
+        product = (await client.post("/products/", json={"name": "Plan", "description": "Bench plan"})).json()
+        self.product_id = product["id"]
+        price = (await client.post("/products/prices", json={
+            "product_id": self.product_id,
+            "unit_amount": 2990,
+            "currency": "brl",
+            "recurring": {"interval": "month"},
+        })).json()
+        self.price_id = price["id"]
+        for _ in range(10):
+            intent = (await client.post("/payment-intents/", json={
+                "amount": 2990, "currency": "brl", "metadata": {"user_id": "bench-user", "product_id": self.product_id},
+            })).json()
+        self.payment_intent_id = intent["id"]
+        await client.post("/subscriptions/", json={
+            "customer_id": self.customer_id, "price_id": self.price_id, "metadata": {"user_id": "bench-user"},
+        })
+
+    def seed_many(self, resource: str, **fields) -> list[str]:
+        """Seed one object per request directly in the backend and return their ids."""
+        return [self.backend.seed(resource, **fields)["id"] for _ in range(self.requests)]
+
+    def seed_customers(self, prefix: str) -> list[str]:
+        return [
+            self.backend.seed("customers", **customer_body(f"{prefix}-{i}"))["metadata"]["user_id"]
+            for i in range(self.requests)
+        ]
+
+
+def endpoints(fx: Fixtures) -> dict[str, Callable[[], Request]]:
+    """
+    Map each endpoint to a factory that seeds what it needs and returns the
+    request to time. Factories run right before their endpoint is measured.
+    """
+
+    def post_customer() -> Request:
+        run = next(fx.runs)
+        return lambda c, i: c.post("/customer/", json=customer_body(f"create-{run}-{i}"))
+
+    def post_customer_bulk() -> Request:
+        run = next(fx.runs)
+
+        def request(c, i):
+            lines = (json.dumps(customer_body(f"bulk-{run}-{i}-{n}")) for n in range(10))
+            return c.post("/customer/bulk", content="\n".join(lines) + "\n")
+        return request
+
+    def get_customer() -> Request:
+        return lambda c, i: c.get(f"/customer/{fx.customer_id}")
+
+    def get_customer_by_user() -> Request:
+        return lambda c, i: c.get("/customer/user/bench-user")
+
+    def put_customer() -> Request:
+        return lambda c, i: c.put(f"/customer/{fx.customer_id}", json=customer_body("bench-user"))
+
+    def delete_customer() -> Request:
+        ids = fx.seed_many("customers", email="gone@example.com", name="Gone", metadata={"user_id": "gone"})
+        return lambda c, i: c.delete(f"/customer/{ids[i]}")
+
+    def delete_customer_by_user() -> Request:
+        users = fx.seed_customers("delete-user")
+        return lambda c, i: c.delete(f"/customer/user/{users[i]}")
+
+    def post_payment_intent() -> Request:
+        body = {"amount": 2990, "currency": "brl", "metadata": {"user_id": "bench-user", "product_id": fx.product_id}}
+        return lambda c, i: c.post("/payment-intents/", json=body)
+
+    def get_payment_intent() -> Request:
+        return lambda c, i: c.get(f"/payment-intents/{fx.payment_intent_id}")
+
+    def get_payment_intents_by_user() -> Request:
+        return lambda c, i: c.get("/payment-intents/user/bench-user?limit=10")
+
+    def stream_payment_intents_by_user() -> Request:
+        return lambda c, i: c.get("/payment-intents/user/bench-user/stream")
+
+    def cancel_payment_intent() -> Request:
+        ids = fx.seed_many("payment_intents", amount=2990, currency="brl", metadata={"user_id": "bench-user"})
+        return lambda c, i: c.post(f"/payment-intents/{ids[i]}/cancel")
+
+    def post_product() -> Request:
+        return lambda c, i: c.post("/products/", json={"name": f"Plan {i}", "description": "Bench plan"})
+
+    def get_products() -> Request:
+        return lambda c, i: c.get("/products/")
+
+    def delete_product() -> Request:
+        ids = fx.seed_many("products", name="Archived plan", description="Bench plan")
+        return lambda c, i: c.delete(f"/products/{ids[i]}")
+
+    def post_price() -> Request:
+        body = {"product_id": fx.product_id, "unit_amount": 990, "currency": "brl", "recurring": {"interval": "month"}}
+        return lambda c, i: c.post("/products/prices", json=body)
+
+    def delete_price() -> Request:
+        ids = fx.seed_many("prices", product=fx.product_id, unit_amount=990, currency="brl")
+        return lambda c, i: c.delete(f"/products/prices/{ids[i]}")
+
+    def post_subscription() -> Request:
+        body = {"customer_id": fx.customer_id, "price_id": fx.price_id, "metadata": {"user_id": "bench-sub"}}
+        return lambda c, i: c.post("/subscriptions/", json=body)
+
+    def get_subscriptions_by_user() -> Request:
+        return lambda c, i: c.get("/subscriptions/users/bench-user")
+
+    def cancel_subscription() -> Request:
+        ids = fx.seed_many(
+            "subscriptions", customer=fx.customer_id, items=[{"price": fx.price_id}], metadata={"user_id": "bench-cancel"},
+        )
+        return lambda c, i: c.post(f"/subscriptions/{ids[i]}/cancel")
+
+    def post_webhook() -> Request:
+        def request(c, i):
+            payload = json.dumps({
+                "id": f"evt_bench_{i}", "object": "event", "type": "product.updated", "created": 1_700_000_000,
+                "data": {"object": {"id": fx.product_id, "object": "product"}},
+            }).encode()
+            return c.post("/webhooks/stripe", content=payload, headers={"Stripe-Signature": sign(payload)})
+        return request
+
+    return {
+        "POST /customer/": post_customer,
+        "POST /customer/bulk": post_customer_bulk,
+        "GET /customer/{customer_id}": get_customer,
+        "GET /customer/user/{user_id}": get_customer_by_user,
+        "PUT /customer/{customer_id}": put_customer,
+        "DELETE /customer/{customer_id}": delete_customer,
+        "DELETE /customer/user/{user_id}": delete_customer_by_user,
+        "POST /payment-intents/": post_payment_intent,
+        "GET /payment-intents/{payment_intent_id}": get_payment_intent,
+        "GET /payment-intents/user/{user_id}": get_payment_intents_by_user,
+        "GET /payment-intents/user/{user_id}/stream": stream_payment_intents_by_user,
+        "POST /payment-intents/{payment_intent_id}/cancel": cancel_payment_intent,
+        "POST /products/": post_product,
+        "GET /products/": get_products,
+        "DELETE /products/{product_id}": delete_product,
+        "POST /products/prices": post_price,
+        "DELETE /products/prices/{price_id}": delete_price,
+        "POST /subscriptions/": post_subscription,
+        "GET /subscriptions/users/{user_id}": get_subscriptions_by_user,
+        "POST /subscriptions/{subscription_id}/cancel": cancel_subscription,
+        "POST /webhooks/stripe": post_webhook,
+    }
+
+
+async def measure(
+    client: httpx.AsyncClient, backend: FakeStripe, request: Request, requests: int, concurrency: int
+) -> Result:
+    """Send ``requests`` requests with at most ``concurrency`` in flight."""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+    errors = 0
+
+    async def one(index: int) -> None:
+        nonlocal errors
+        async with semaphore:
+            started = time.perf_counter()
+            response = await request(client, index)
+            latencies.append(time.perf_counter() - started)
+            if response.status_code >= 300:
+                errors += 1
+
+    calls_before = sum(backend.calls.values())
+    started = time.perf_counter()
+    await asyncio.gather(*(one(index) for index in range(requests)))
+    elapsed = time.perf_counter() - started
+
+    cuts = statistics.quantiles(latencies, n=100, method="inclusive")
+    return Result(
+        rps=requests / elapsed,
+        p50_ms=cuts[49] * 1000,
+        p95_ms=cuts[94] * 1000,
+        p99_ms=cuts[98] * 1000,
+        errors=errors,
+        stripe_calls=(sum(backend.calls.values()) - calls_before) / requests,
+    )
+
+
+def regressions(result: Result, baseline: dict, tolerance: float, slack_ms: float) -> list[str]:
+    """
+    Return what got worse than ``baseline``.
+
+    Latency must exceed the baseline by both ``tolerance`` and ``slack_ms``,
+    so scheduler jitter on millisecond-fast endpoints is not reported.
+    """
+    found = []
+    if result.p95_ms > max(baseline["p95_ms"] * (1 + tolerance), baseline["p95_ms"] + slack_ms):
+        found.append(f"p95 {baseline['p95_ms']:.2f} -> {result.p95_ms:.2f} ms")
+    if result.rps < baseline["rps"] * (1 - tolerance):
+        found.append(f"throughput {baseline['rps']:.0f} -> {result.rps:.0f} req/s")
+    if result.stripe_calls > baseline["stripe_calls"] + 1e-9:
+        found.append(f"Stripe calls {baseline['stripe_calls']:.2f} -> {result.stripe_calls:.2f}")
+    return found
+
+
+def best(runs: list[Result]) -> Result:
+    """Combine repeated runs: the best timing and the worst errors and call counts."""
+    return Result(
+        rps=max(r.rps for r in runs),
+        p50_ms=min(r.p50_ms for r in runs),
+        p95_ms=min(r.p95_ms for r in runs),
+        p99_ms=min(r.p99_ms for r in runs),
+        errors=max(r.errors for r in runs),
+        stripe_calls=max(r.stripe_calls for r in runs),
+    )
+
+
+async def run(requests: int, concurrency: int, latency: float, repeat: int, only: str | None) -> dict[str, Result]:
+    from src.app import app
+
+    backend = FakeStripe()
+    # Lift Stripe's rate limits: this measures the routes, not the scheduler.
+    unthrottled = StripeScheduler(search_rate=1e9, read_rate=1e9, write_rate=1e9, deadline=60.0)
+    configure_stripe_client(FakeStripeHTTPClient(backend, latency=latency), unthrottled)
+    settings.STRIPE_WEBHOOK_SECRET = WEBHOOK_SECRET
+
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    results = {}
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        fixtures = Fixtures()
+        await fixtures.create(client, backend, requests)
+        for name, factory in endpoints(fixtures).items():
+            if only and not re.search(only, name):
+                continue
+            results[name] = best([
+                await measure(client, backend, factory(), requests, concurrency) for _ in range(repeat)
+            ])
+    return results
+
+
+def main(args: argparse.Namespace) -> int:
+    requests, concurrency, latency = args.requests, args.concurrency, args.latency
+    profile = f"requests={requests},concurrency={concurrency},latency={latency}"
+    stored = json.loads(BASELINES.read_text()) if BASELINES.exists() else {}
+    baseline = stored.get(profile, {})
+
+    with tempfile.TemporaryDirectory() as directory:
+        settings.LOCAL_DB_PATH = str(Path(directory) / "bench.db")
+        settings.CACHE_SQLITE_PATH = str(Path(directory) / "cache.db")
+        results = asyncio.run(run(requests, concurrency, latency, args.repeat, args.only))
+
+    print(f"{requests} requests per endpoint, concurrency {concurrency}, Stripe latency {latency * 1000:.0f} ms")
+    print(f"{'endpoint':<46} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>6} {'stripe':>6}")
+    failed = False
+    for name, result in results.items():
+        print(
+            f"{name:<46} {result.rps:>8.0f} {result.p50_ms:>8.2f} {result.p95_ms:>8.2f} "
+            f"{result.p99_ms:>8.2f} {result.errors:>6} {result.stripe_calls:>6.2f}"
+        )
+        if result.errors:
+            failed = True
+            print(f"  FAILED {result.errors} of {requests} requests answered with a non-2xx status")
+        if not args.save and name in baseline:
+            for regression in regressions(result, baseline[name], args.tolerance, args.slack_ms):
+                failed = True
+                print(f"  REGRESSION {regression}")
+
+    if args.save and failed:
+        print("Baseline not saved: fix the failing endpoints first")
+    elif args.save:
+        stored[profile] = {**baseline, **{
+            name: {key: round(value, 3) for key, value in asdict(result).items()}
+            for name, result in results.items()
+        }}
+        BASELINES.parent.mkdir(parents=True, exist_ok=True)
+        BASELINES.write_text(json.dumps(stored, indent=2, sort_keys=True) + "\n")
+        print(f"Baseline saved to {BASELINES} ({profile})")
+    elif not baseline:
+        print(f"No baseline for {profile}; run with --save to record one")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=200, help="requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.0, help="simulated Stripe round trip, seconds")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per endpoint, the best one counts")
+    parser.add_argument("--only", help="regular expression selecting endpoints, e.g. 'customer'")
+    parser.add_argument("--save", action="store_true", help="store the results as the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="allowed relative slowdown")
+    parser.add_argument("--slack-ms", type=float, default=10.0, help="allowed absolute p95 slowdown, ms")
+    args = parser.parse_args()
+    sys.exit(main(args))
@@ -0,0 +1,122 @@
+"""
+Serialization time and peak memory of list responses, per encoder.
+
+Encodes lists of ``ProductResponse`` with nested ``PriceResponse`` items,
+as ``GET /products`` returns them, three ways:
+
+* ``json.dumps``: ``jsonable_encoder`` to plain dicts, then the standard
+  library encoder, the path FastAPI took before 0.130.
+* ``dump_json``: the whole list dumped to bytes by pydantic-core, what
+  FastAPI now does for response models and ``json_list_response`` sends for
+  short lists.
+* ``streamed``: ``encode_json_array``, the chunks ``json_list_response``
+  streams for long lists, each discarded once "sent".
+
+Time is the best of ``--repeat`` runs; peak memory is measured with
+``tracemalloc`` on top of the already built models.
+
+Usage:
+    python -m benchmarks.serialization --sizes 100 1000 10000 --prices 3
+"""
+import argparse
+import json
+import time
+import tracemalloc
+from collections.abc import Callable
+from typing import Any
+
+from fastapi.encoders import jsonable_encoder
+
+from src.core import settings
+from src.schemas import ProductResponse
+from src.utils import encode_json_array
+from src.utils.json_list import list_adapter
+
+
+def build_products(count: int, prices: int) -> list[ProductResponse]:
+    return [
+        ProductResponse(
+            id=f"prod_{index:014d}",
+            name=f"Plano {index}",
+            description="Acesso completo à plataforma, com suporte prioritário.",
+            metadata={"tier": "pro", "sku": f"SKU-{index}"},
+            created=1679431181 + index,
+            prices=[
+                {
+                    "id": f"price_{index:010d}_{n}",
+                    "product_id": f"prod_{index:014d}",
+                    "name": f"Plano {index}",
+                    "unit_amount": 2990 + n * 1000,
+                    "currency": "brl",
+                    "created": 1679431181 + index,
+                    "recurring": {"interval": "month", "interval_count": 1 + n, "trial_period_days": None},
+                }
+                for n in range(prices)
+            ],
+        )
+        for index in range(count)
+    ]
+
+
+def with_json_dumps(products: list[ProductResponse]) -> int:
+    body = json.dumps(jsonable_encoder(products), ensure_ascii=False, separators=(",", ":")).encode()
+    return len(body)
+
+
+def with_dump_json(products: list[ProductResponse]) -> int:
+    return len(list_adapter(ProductResponse).dump_json(products))
+
+
+def streamed(products: list[ProductResponse]) -> int:
+    chunks = encode_json_array(products, ProductResponse, settings.JSON_STREAM_BATCH_SIZE)
+    size = 0
+    # The generator never awaits, so it can be driven without an event loop.
+    while True:
+        try:
+            chunks.__anext__().send(None)
+        except StopIteration as step:
+            size += len(step.value)
+        except StopAsyncIteration:
+            return size
+
+
+ENCODERS: dict[str, Callable[[list[ProductResponse]], int]] = {
+    "json.dumps": with_json_dumps,
+    "dump_json": with_dump_json,
+    "streamed": streamed,
+}
+
+
+def measure(encode: Callable[[list[ProductResponse]], int], products: list[Any], repeat: int) -> tuple[float, float, int]:
+    """
+    Return the best time in ms, the peak traced memory in MiB and the body size.
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        size = encode(products)
+        best = min(best, time.perf_counter() - started)
+    tracemalloc.start()
+    encode(products)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best * 1000, peak / 2**20, size
+
+
+def main(sizes: list[int], prices: int, repeat: int) -> None:
+    print(f"ProductResponse with {prices} prices each, stream batches of {settings.JSON_STREAM_BATCH_SIZE}")
+    print(f"{'items':>7} {'encoder':<12} {'ms':>9} {'peak MiB':>9} {'body KiB':>9}")
+    for count in sizes:
+        products = build_products(count, prices)
+        for name, encode in ENCODERS.items():
+            ms, peak, size = measure(encode, products, repeat)
+            print(f"{count:>7} {name:<12} {ms:>9.2f} {peak:>9.2f} {size / 1024:>9.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000], help="products per list")
+    parser.add_argument("--prices", type=int, default=3, help="prices per product")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per case, the fastest one counts")
+    args = parser.parse_args()
+    main(args.sizes, args.prices, args.repeat)
@@ -1,10 +1,84 @@
+import importlib.util
+import logging
+import os
+import shutil
+from pathlib import Path
+
 import uvicorn
-from src.app import app
+from src.core import settings
+
+logger = logging.getLogger(__name__)
+
+
+def resolve_workers() -> int:
+    """Number of worker processes: ``SERVER_WORKERS``, or one per CPU if it is 0."""
+    return settings.SERVER_WORKERS or os.cpu_count() or 1
+
+
+def prepare_metrics_dir(workers: int) -> None:
+    """
+    Let the workers' Prometheus metrics be aggregated into one scrape.
+
+    Each worker is a separate process with its own counters, so with more
+    than one, the ``PROMETHEUS_MULTIPROC_DIR`` environment variable is set to
+    the (emptied) directory of the setting of the same name before they
+    start; ``/metrics`` then reports the sum over all workers.
+    """
+    if workers < 2 or "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        return
+    path = Path(settings.PROMETHEUS_MULTIPROC_DIR)
+    shutil.rmtree(path, ignore_errors=True)
+    path.mkdir(parents=True)
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = str(path.resolve())
+
+
+def share_rate_limits(workers: int) -> None:
+    """
+    Split the ``STRIPE_RATE_LIMIT_*`` budgets among the workers.
+
+    Each worker runs its own ``stripe_scheduler``; the
+    ``STRIPE_RATE_LIMIT_PROCESSES`` environment variable, unless already
+    set (e.g. to cover several hosts), tells it how many share the limits.
+    """
+    os.environ.setdefault("STRIPE_RATE_LIMIT_PROCESSES", str(workers))
+
+
+def serve() -> None:
+    """
+    Run the API with the ``SERVER_*`` settings.
+
+    Each worker imports ``src.app:app`` and runs its own lifespan (Stripe
+    connection pool, webhook workers). On SIGTERM or SIGINT the workers stop
+    accepting connections and wait up to ``SERVER_GRACEFUL_SHUTDOWN_TIMEOUT``
+    seconds for in-flight requests, and their Stripe calls, to finish before
+    the lifespan shutdown closes the pool.
+    """
+    workers = resolve_workers()
+    loop, http = settings.SERVER_LOOP, settings.SERVER_HTTP
+    if loop == "uvloop" and importlib.util.find_spec("uvloop") is None:
+        logger.warning("uvloop is not installed, falling back to the asyncio event loop")
+        loop = "asyncio"
+    if http == "httptools" and importlib.util.find_spec("httptools") is None:
+        logger.warning("httptools is not installed, falling back to h11")
+        http = "h11"
+    prepare_metrics_dir(workers)
+    share_rate_limits(workers)
+
+    print(f"Starting Stripe Integration API with {workers} worker(s)...")
+    uvicorn.run(
+        "src.app:app",
+        host=settings.SERVER_HOST,
+        port=settings.SERVER_PORT,
+        workers=workers,
+        loop=loop,
+        http=http,
+        backlog=settings.SERVER_BACKLOG,
+        timeout_keep_alive=settings.SERVER_KEEPALIVE_TIMEOUT,
+        timeout_graceful_shutdown=settings.SERVER_GRACEFUL_SHUTDOWN_TIMEOUT,
+        limit_concurrency=settings.SERVER_LIMIT_CONCURRENCY,
+        access_log=settings.SERVER_ACCESS_LOG,
+    )
 
 
-print("Starting Stripe Integration API...")
-uvicorn.run(
-    app,
-    host="0.0.0.0",
-    port=4242
-)
+if __name__ == "__main__":
+    serve()
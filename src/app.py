@@ -1,16 +1,51 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
+from src.core import (
+    close_stripe_client,
+    get_cache_backend,
+    mark_worker_stopped,
+    settings,
+    warm_up_stripe_client,
+)
 from src.routes import (
     customer_router,
+    debug_router,
+    metrics_router,
     payment_router, 
-    subscription_router
+    product_router,
+    subscription_router,
+    webhook_router
 )
+from src.services.metrics import stats_publisher
+from src.services.webhook_queue import webhook_workers
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Own the shared Stripe connection pool and the webhook workers.
+
+    Runs once per server worker process. The cache backend is created first,
+    so a misconfigured ``CACHE_BACKEND`` stops the worker at startup.
+    """
+    get_cache_backend()
+    await warm_up_stripe_client()
+    webhook_workers.start()
+    stats_publisher.start()
+    yield
+    await webhook_workers.stop()
+    await stats_publisher.stop()
+    await close_stripe_client()
+    mark_worker_stopped()
+
 
 app = FastAPI(
     title="Stripe Integration API",
     description="API para integração com Stripe",
-    version="0.1.0"
+    version="0.1.0",
+    lifespan=lifespan,
 )
 
 ORIGINS = [
@@ -39,7 +74,13 @@ app.add_middleware(
 
 app.include_router(customer_router)
 app.include_router(payment_router)
+app.include_router(product_router)
 app.include_router(subscription_router)
+app.include_router(webhook_router)
+app.include_router(metrics_router)
+if settings.DEBUG_ROUTES:
+    # Unauthenticated: traced calls carry request ids and Stripe paths.
+    app.include_router(debug_router)
 
 
 @app.get("/")
@@ -1,9 +1,64 @@
 from .base import BaseEnum, BaseSchema
+from .cache import (
+    Cache,
+    CacheBackend,
+    Codec,
+    MemoryCacheBackend,
+    RedisCacheBackend,
+    SQLiteCacheBackend,
+    TTLCache,
+    get_cache_backend,
+    make_etag,
+    model_codec,
+)
+from .mapping import ResponseMapper
+from .metrics import InstrumentedRoute, mark_worker_stopped
+from .scheduler import StripeScheduler, stripe_scheduler
 from .settings import settings
-
+from .singleflight import SingleFlight, stripe_reads
+from .stripe_client import (
+    close_stripe_client,
+    configure_stripe_client,
+    get_stripe_client,
+    warm_up_stripe_client,
+)
+from .tracing import StripeCallTracer, stripe_tracer
 
 __all__ = [
     "BaseEnum",
     "BaseSchema",
+    "Cache",
+    "CacheBackend",
+    "Codec",
+    "InstrumentedRoute",
+    "MemoryCacheBackend",
+    "RedisCacheBackend",
+    "ResponseMapper",
+    "SQLiteCacheBackend",
+    "SingleFlight",
+    "StripeCallTracer",
+    "StripeQueueTimeout",
+    "StripeScheduler",
+    "TTLCache",
+    "close_stripe_client",
+    "configure_stripe_client",
+    "get_cache_backend",
+    "get_stripe_client",
+    "make_etag",
+    "mark_worker_stopped",
+    "model_codec",
     "settings",
-]
\ No newline at end of file
+    "stripe_reads",
+    "stripe_scheduler",
+    "stripe_tracer",
+    "warm_up_stripe_client",
+]
+
+
+def __getattr__(name: str):
+    # Subclasses a Stripe SDK error, so it is only loaded, with the SDK, on use.
+    if name == "StripeQueueTimeout":
+        from .stripe_http import StripeQueueTimeout
+
+        return StripeQueueTimeout
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
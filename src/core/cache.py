@@ -0,0 +1,648 @@
+import asyncio
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from collections.abc import AsyncIterator, Awaitable, Callable, Hashable
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from functools import cached_property
+from typing import Any, NamedTuple
+
+from pydantic import TypeAdapter
+
+from .database import connect
+from .settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+class TTLCache:
+    """
+    Size-bounded LRU mapping whose entries expire after a fixed time-to-live.
+
+    Lookups refresh an entry's recency but not its age, so a hot entry still
+    expires ``ttl`` seconds after it was written. When ``maxsize`` is reached
+    the least recently used entry is evicted.
+
+    Attributes:
+        maxsize (int): Maximum number of entries kept.
+        ttl (float): Seconds an entry stays valid after being written.
+        hits (int): Lookups answered from the cache.
+        misses (int): Lookups for missing or expired entries.
+        evictions (int): Entries dropped to make room for new ones.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, clock: Callable[[], float] = time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._clock = clock
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Return the value stored under ``key``, or ``default`` if it is missing or expired.
+        """
+        entry = self._data.get(key)
+        if entry is None or entry[0] <= self._clock():
+            if entry is not None:
+                del self._data[key]
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key: Hashable, value: Any, ttl: float | None = None) -> None:
+        """
+        Store ``value`` under ``key``, evicting the least recently used entry if full.
+
+        Args:
+            key (Hashable): The entry's key.
+            value (Any): The value to store.
+            ttl (float | None): Seconds the entry stays valid, ``self.ttl`` if None.
+        """
+        self._data[key] = (self._clock() + (self.ttl if ttl is None else ttl), value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def pop(self, key: Hashable) -> Any:
+        """Remove ``key`` and return its value, or None if it was not cached."""
+        entry = self._data.pop(key, None)
+        return entry[1] if entry else None
+
+    def keys(self) -> list[Hashable]:
+        """Return the stored keys, expired ones included, least recently used first."""
+        return list(self._data)
+
+    def clear(self) -> None:
+        """Drop every entry; counters are kept."""
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict[str, int]:
+        """
+        Return the cache counters.
+
+        Returns:
+            dict[str, int]: ``size``, ``hits``, ``misses`` and ``evictions``.
+        """
+        return {
+            "size": len(self._data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+class CacheBackend(ABC):
+    """
+    Key-value store behind the app's ``Cache`` instances.
+
+    Keys are strings already prefixed with the cache namespace. Backends that
+    live outside the process (``serializes = True``) store bytes; the others
+    keep the values as they are given. The methods are synchronous; ``Cache``
+    runs those of ``blocking`` backends in worker threads, so a slow disk or
+    server never stalls the event loop. Writes all go through the backend's
+    single ``writer`` thread, which applies them in the order they were made.
+
+    Attributes:
+        name (str): The backend's setting value, e.g. ``"sqlite"``.
+        serializes (bool): Whether values must be encoded to bytes.
+        blocking (bool): Whether calls wait on I/O.
+    """
+
+    name: str
+    serializes: bool = True
+    blocking: bool = True
+
+    @abstractmethod
+    def get(self, key: str) -> Any:
+        """Return the value stored under ``key``, or None if it is missing or expired."""
+
+    @abstractmethod
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        """Store ``value`` under ``key`` for ``ttl`` seconds."""
+
+    def set_many(self, items: dict[str, Any], ttl: float) -> None:
+        """Store every item for ``ttl`` seconds, so that readers see all of them or none."""
+        for key, value in items.items():
+            self.set(key, value, ttl)
+
+    def add_many(self, items: dict[str, Any], ttl: float) -> None:
+        """Store the items whose key holds no live value for ``ttl`` seconds, keeping the others."""
+        for key, value in items.items():
+            if self.get(key) is None:
+                self.set(key, value, ttl)
+
+    @abstractmethod
+    def delete(self, *keys: str) -> None:
+        """Remove ``keys``; missing ones are ignored."""
+
+    @abstractmethod
+    def clear(self, prefix: str) -> None:
+        """Remove every key starting with ``prefix``."""
+
+    def stats(self) -> dict[str, int]:
+        """Return the backend's ``size`` and ``evictions``, when it can count them cheaply."""
+        return {}
+
+    @cached_property
+    def writer(self) -> ThreadPoolExecutor:
+        """The thread running this backend's writes, one at a time."""
+        return ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"cache-{self.name}")
+
+
+class MemoryCacheBackend(CacheBackend):
+    """
+    Process-local LRU, a ``TTLCache`` shared by every namespace.
+
+    Fastest, but each uvicorn worker holds, and warms, its own copy, and an
+    invalidation only reaches the worker that made it.
+    """
+
+    name = "memory"
+    serializes = False
+    blocking = False
+
+    def __init__(self, maxsize: int):
+        self._entries = TTLCache(maxsize=maxsize, ttl=0)
+
+    def get(self, key: str) -> Any:
+        return self._entries.get(key)
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        self._entries.set(key, value, ttl)
+
+    def delete(self, *keys: str) -> None:
+        for key in keys:
+            self._entries.pop(key)
+
+    def clear(self, prefix: str) -> None:
+        for key in [key for key in self._entries.keys() if key.startswith(prefix)]:
+            self._entries.pop(key)
+
+    def stats(self) -> dict[str, int]:
+        stats = self._entries.stats()
+        return {"size": stats["size"], "evictions": stats["evictions"]}
+
+
+class SQLiteCacheBackend(CacheBackend):
+    """
+    Cache table in a SQLite file in WAL mode, shared by every worker on the host.
+
+    Reads do not block each other nor the writer, so a value cached by one
+    worker is a hit for all of them. Expired rows are skipped on read and
+    deleted every ``prune_every`` writes of a process, which also evicts the
+    rows closest to expiring while the table holds more than ``maxsize``.
+    Pointing ``CACHE_SQLITE_PATH`` at a tmpfs such as ``/dev/shm`` keeps the
+    file in shared memory.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, maxsize: int, path: str | None = None, prune_every: int = 256):
+        self.maxsize = maxsize
+        self.prune_every = prune_every
+        self.evictions = 0
+        self._path = path
+        self._connection: sqlite3.Connection | None = None
+        self._lock = threading.RLock()
+        self._writes = 0
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        if self._connection is None:
+            with self._lock:
+                if self._connection is None:
+                    connection = connect(self._path or settings.CACHE_SQLITE_PATH)
+                    connection.executescript(
+                        """
+                        CREATE TABLE IF NOT EXISTS cache_entries (
+                            key TEXT PRIMARY KEY,
+                            value BLOB NOT NULL,
+                            expires_at REAL NOT NULL
+                        );
+                        CREATE INDEX IF NOT EXISTS cache_entries_expires_at
+                            ON cache_entries (expires_at);
+                        """
+                    )
+                    self._connection = connection
+        return self._connection
+
+    def get(self, key: str) -> bytes | None:
+        with self._lock:
+            row = self.connection.execute(
+                "SELECT value FROM cache_entries WHERE key = ? AND expires_at > ?",
+                (key, time.time()),
+            ).fetchone()
+        return row[0] if row else None
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        self.set_many({key: value}, ttl)
+
+    def set_many(self, items: dict[str, bytes], ttl: float) -> None:
+        expires_at = time.time() + ttl
+        self._write(
+            "INSERT OR REPLACE INTO cache_entries (key, value, expires_at) VALUES (?, ?, ?)",
+            [(key, value, expires_at) for key, value in items.items()],
+        )
+
+    def add_many(self, items: dict[str, bytes], ttl: float) -> None:
+        now = time.time()
+        # Rows expired but not yet pruned count as missing.
+        self._write(
+            """
+            INSERT INTO cache_entries (key, value, expires_at) VALUES (?, ?, ?)
+            ON CONFLICT (key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at
+            WHERE cache_entries.expires_at <= ?
+            """,
+            [(key, value, now + ttl, now) for key, value in items.items()],
+        )
+
+    def delete(self, *keys: str) -> None:
+        with self._lock:
+            self.connection.execute(
+                f"DELETE FROM cache_entries WHERE key IN ({', '.join('?' * len(keys))})", keys
+            )
+
+    def clear(self, prefix: str) -> None:
+        with self._lock:
+            self.connection.execute(
+                "DELETE FROM cache_entries WHERE substr(key, 1, ?) = ?", (len(prefix), prefix)
+            )
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            size = self.connection.execute("SELECT count(*) FROM cache_entries").fetchone()[0]
+        return {"size": size, "evictions": self.evictions}
+
+    def _write(self, statement: str, rows: list[tuple]) -> None:
+        with self._lock:
+            # One transaction, so the rows are committed together.
+            with self.connection:
+                self.connection.executemany(statement, rows)
+            self._writes += 1
+            if self._writes % self.prune_every == 0:
+                self._prune()
+
+    def _prune(self) -> None:
+        with self.connection:
+            self.connection.execute("DELETE FROM cache_entries WHERE expires_at <= ?", (time.time(),))
+            excess = self.connection.execute(
+                "SELECT count(*) - ? FROM cache_entries", (self.maxsize,)
+            ).fetchone()[0]
+            if excess > 0:
+                self.connection.execute(
+                    "DELETE FROM cache_entries WHERE key IN "
+                    "(SELECT key FROM cache_entries ORDER BY expires_at LIMIT ?)",
+                    (excess,),
+                )
+                self.evictions += excess
+
+
+class RedisCacheBackend(CacheBackend):
+    """
+    Any server speaking the Redis protocol (Redis, Valkey, KeyDB, Dragonfly).
+
+    Shared across hosts, with expiry and eviction left to the server (e.g.
+    ``maxmemory-policy allkeys-lru``). Needs the ``redis`` extra. The client
+    uses ``CACHE_REDIS_TIMEOUT`` as its connect and socket timeout, so an
+    unreachable server costs a worker thread at most that per lookup.
+    """
+
+    name = "redis"
+
+    def __init__(self, url: str, timeout: float):
+        try:
+            import redis
+        except ImportError as e:
+            raise ImportError("CACHE_BACKEND=redis needs the redis package, install the 'redis' extra") from e
+
+        self._client = redis.Redis.from_url(
+            url, socket_timeout=timeout, socket_connect_timeout=timeout
+        )
+
+    def get(self, key: str) -> bytes | None:
+        return self._client.get(key)
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        self._client.set(key, value, px=max(int(ttl * 1000), 1))
+
+    def set_many(self, items: dict[str, bytes], ttl: float) -> None:
+        self._write(items, ttl, nx=False)
+
+    def add_many(self, items: dict[str, bytes], ttl: float) -> None:
+        self._write(items, ttl, nx=True)
+
+    def _write(self, items: dict[str, bytes], ttl: float, nx: bool) -> None:
+        with self._client.pipeline(transaction=True) as pipeline:
+            for key, value in items.items():
+                pipeline.set(key, value, px=max(int(ttl * 1000), 1), nx=nx)
+            pipeline.execute()
+
+    def delete(self, *keys: str) -> None:
+        self._client.delete(*keys)
+
+    def clear(self, prefix: str) -> None:
+        batch = []
+        for key in self._client.scan_iter(match=f"{prefix}*", count=500):
+            batch.append(key)
+            if len(batch) == 500:
+                self._client.delete(*batch)
+                batch.clear()
+        if batch:
+            self._client.delete(*batch)
+
+
+_backend: CacheBackend | None = None
+
+
+def get_cache_backend() -> CacheBackend:
+    """
+    Return the process-wide backend selected by ``CACHE_BACKEND``, creating it on first use.
+    """
+    global _backend
+    if _backend is None:
+        if settings.CACHE_BACKEND == "redis":
+            _backend = RedisCacheBackend(settings.CACHE_REDIS_URL, settings.CACHE_REDIS_TIMEOUT)
+        elif settings.CACHE_BACKEND == "sqlite":
+            _backend = SQLiteCacheBackend(settings.CACHE_MAXSIZE)
+        else:
+            _backend = MemoryCacheBackend(settings.CACHE_MAXSIZE)
+    return _backend
+
+
+def make_etag(data: bytes) -> str:
+    """Return a strong ETag, quoted, identifying ``data`` byte for byte."""
+    return f'"{hashlib.blake2b(data, digest_size=16).hexdigest()}"'
+
+
+class Codec(NamedTuple):
+    """How a ``Cache`` turns its values into bytes and back."""
+
+    dumps: Callable[[Any], bytes]
+    loads: Callable[[bytes], Any]
+
+
+def model_codec(value_type: Any) -> Codec:
+    """Return a JSON codec for a pydantic model, or any type pydantic can validate."""
+    adapter = TypeAdapter(value_type)
+    return Codec(adapter.dump_json, adapter.validate_json)
+
+
+class Cache:
+    """
+    One namespace of the cache backend, with its own TTL and codec.
+
+    Keys are stored as ``{CACHE_KEY_PREFIX}:{namespace}:{key}``. Values are
+    encoded with ``codec`` only for backends that keep bytes, so the memory
+    backend hands back the very object that was stored. The methods are
+    coroutines: for a ``blocking`` backend the call, encoding included, runs
+    in a worker thread. A failing backend never fails the request: errors
+    are logged and counted, a lookup becomes a miss and a write is dropped.
+
+    A value read from the source of truth after a miss may already be stale
+    when it is stored, if the key was written meanwhile. Read-through code
+    stores it through ``filling``, which counts this process' writes to the
+    key and drops the value when there was one, and which only adds the
+    value if the key is still missing, so it never replaces a value another
+    worker wrote during the read.
+
+    With ``etags``, each value is stored together with the strong ETag of
+    its encoding, as a version stamp that a conditional request can check
+    without reading or decoding the value. Both are written in one backend
+    operation and deleted together, so a stamp is never left behind by a
+    value that changed.
+
+    Methods:
+        get(key: Hashable) -> Any:
+            Return a cached value, or None.
+        get_encoded(key: Hashable) -> bytes | None:
+            Return a cached value as ``codec`` encodes it, or None.
+        get_etag(key: Hashable) -> str | None:
+            Return the ETag of a cached value, or None.
+        set(key: Hashable, value: Any) -> None:
+            Cache a value for ``ttl`` seconds.
+        set_many(items: dict[Hashable, Any]) -> None:
+            Cache several values in one backend write.
+        delete(*keys: Hashable) -> None:
+            Forget values.
+        filling(key: Hashable) -> AsyncIterator[Callable[[Any], Awaitable[None]]]:
+            Guard a read-through fill against concurrent writes.
+        clear() -> None:
+            Forget every value of the namespace.
+        stats() -> dict[str, int]:
+            Return this process' hit, miss and error counters.
+
+    Attributes:
+        namespace (str): Prefix separating these keys from other caches'.
+        ttl (float): Seconds an entry stays valid after being written.
+        etags (bool): Whether values are stored with their ETag.
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        ttl: float,
+        codec: Codec,
+        backend: CacheBackend | None = None,
+        etags: bool = False,
+    ):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.etags = etags
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self._codec = codec
+        self._backend = backend
+        # Per key with a fill in progress: [fills, writes since the first began].
+        self._fills: dict[Hashable, list[int]] = {}
+
+    @property
+    def backend(self) -> CacheBackend:
+        return self._backend or get_cache_backend()
+
+    async def get(self, key: Hashable) -> Any:
+        return await self._run(self._get, key)
+
+    async def get_encoded(self, key: Hashable) -> bytes | None:
+        """
+        Return the value under ``key`` encoded by ``codec``.
+
+        Backends that keep bytes hand them back as stored, skipping the
+        decode and re-encode of a value only read to be sent on.
+
+        Returns:
+            bytes | None: The encoded value, or None if it is not cached.
+        """
+        return await self._run(self._get_encoded, key)
+
+    async def get_etag(self, key: Hashable) -> str | None:
+        """
+        Return the ETag stored with the value under ``key``.
+
+        Returns:
+            str | None: The quoted ETag, or None if the value is not cached or
+            the cache does not keep ETags.
+        """
+        if not self.etags:
+            return None
+        return await self._run(self._get_etag, key)
+
+    async def set(self, key: Hashable, value: Any) -> None:
+        self._written(key)
+        await self._run(self._set_many, {key: value}, write=True)
+
+    async def set_many(self, items: dict[Hashable, Any]) -> None:
+        """Cache every item for ``ttl`` seconds in a single backend write."""
+        if items:
+            self._written(*items)
+            await self._run(self._set_many, items, write=True)
+
+    async def delete(self, *keys: Hashable) -> None:
+        if keys:
+            self._written(*keys)
+            await self._run(self._delete, keys, write=True)
+
+    async def clear(self) -> None:
+        self._written(*self._fills)
+        await self._run(self._clear, write=True)
+
+    @asynccontextmanager
+    async def filling(self, key: Hashable) -> AsyncIterator[Callable[[Any], Awaitable[None]]]:
+        """
+        Fill ``key`` with a value read while it was missing.
+
+        Wrap the read in the block and store its result with the function
+        it yields. The value is dropped if ``key`` was set or deleted in this
+        process since the block began, since the read may predate that write,
+        and it is only added if ``key`` holds no value by then: a value set by
+        another worker is newer than the read.
+
+        Yields:
+            Callable[[Any], Awaitable[None]]: Stores the value read.
+        """
+        state = self._fills.setdefault(key, [0, 0])
+        state[0] += 1
+        started = state[1]
+
+        async def store(value: Any) -> None:
+            if state[1] == started:
+                await self._run(self._set_many, {key: value}, True, write=True)
+
+        try:
+            yield store
+        finally:
+            state[0] -= 1
+            if not state[0]:
+                del self._fills[key]
+
+    def stats(self) -> dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "errors": self.errors}
+
+    async def _run(self, operation: Callable[..., Any], *args: Any, write: bool = False) -> Any:
+        backend = self.backend
+        if not backend.blocking:
+            return operation(*args)
+        if write:
+            return await asyncio.get_running_loop().run_in_executor(backend.writer, operation, *args)
+        return await asyncio.to_thread(operation, *args)
+
+    def _written(self, *keys: Hashable) -> None:
+        for key in keys:
+            if key in self._fills:
+                self._fills[key][1] += 1
+
+    def _get(self, key: Hashable) -> Any:
+        backend = self.backend
+        try:
+            value = backend.get(self._key(key))
+            if value is not None and backend.serializes:
+                value = self._codec.loads(value)
+        except Exception as e:
+            self._failed("get", e)
+            value = None
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return value
+
+    def _get_encoded(self, key: Hashable) -> bytes | None:
+        backend = self.backend
+        try:
+            value = backend.get(self._key(key))
+            if value is not None and not backend.serializes:
+                value = self._codec.dumps(value)
+        except Exception as e:
+            self._failed("get", e)
+            value = None
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return value
+
+    def _get_etag(self, key: Hashable) -> str | None:
+        try:
+            etag = self.backend.get(self._etag_key(key))
+        except Exception as e:
+            self._failed("get_etag", e)
+            return None
+        return etag.decode() if isinstance(etag, bytes) else etag
+
+    def _set_many(self, items: dict[Hashable, Any], add: bool = False) -> None:
+        backend = self.backend
+        try:
+            stored = {}
+            for key, value in items.items():
+                data = self._codec.dumps(value) if backend.serializes or self.etags else None
+                stored[self._key(key)] = data if backend.serializes else value
+                if self.etags:
+                    etag = make_etag(data)
+                    stored[self._etag_key(key)] = etag.encode() if backend.serializes else etag
+            if add:
+                backend.add_many(stored, self.ttl)
+            elif len(stored) == 1:
+                backend.set(*stored.popitem(), self.ttl)
+            else:
+                backend.set_many(stored, self.ttl)
+        except Exception as e:
+            self._failed("set", e)
+
+    def _delete(self, keys: tuple[Hashable, ...]) -> None:
+        stored = [self._key(key) for key in keys]
+        if self.etags:
+            stored += [self._etag_key(key) for key in keys]
+        try:
+            self.backend.delete(*stored)
+        except Exception as e:
+            self._failed("delete", e)
+
+    def _clear(self) -> None:
+        try:
+            self.backend.clear(self._key(""))
+        except Exception as e:
+            self._failed("clear", e)
+
+    def _key(self, key: Hashable) -> str:
+        return f"{settings.CACHE_KEY_PREFIX}:{self.namespace}:{key}"
+
+    def _etag_key(self, key: Hashable) -> str:
+        return f"{self._key(key)}#etag"
+
+    def _failed(self, operation: str, error: Exception) -> None:
+        self.errors += 1
+        logger.warning("Cache %s on %s failed: %s", operation, self.namespace, error)
@@ -0,0 +1,29 @@
+import sqlite3
+from pathlib import Path
+
+from src.core.settings import settings
+
+
+def connect(path: str | None = None) -> sqlite3.Connection:
+    """
+    Open a connection to the local SQLite database in WAL mode.
+
+    WAL lets readers proceed while a writer commits, and several uvicorn
+    workers on the same host can share the file. Connections are opened in
+    autocommit mode; wrap multi-statement writes in ``with connection:``.
+
+    Args:
+        path (str | None): Database file, defaults to ``settings.LOCAL_DB_PATH``.
+
+    Returns:
+        sqlite3.Connection: A connection usable from any thread.
+    """
+    path = path or settings.LOCAL_DB_PATH
+    if path != ":memory:":
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+
+    connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    connection.execute("PRAGMA busy_timeout=5000")
+    return connection
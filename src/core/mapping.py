@@ -0,0 +1,34 @@
+from collections.abc import Iterable
+from typing import Any
+
+from pydantic import BaseModel, TypeAdapter
+
+class ResponseMapper[M: BaseModel]:
+    """
+    Turns Stripe objects into a response model.
+
+    Objects are validated reading their fields through attribute access
+    (``from_attributes``), by the model's core validator directly. A list
+    goes through a precompiled ``TypeAdapter(list[model])`` so a whole page
+    is validated in one call.
+
+    Attributes:
+        model (type[BaseModel]): The response model.
+    """
+
+    def __init__(self, model: type[M]):
+        self.model = model
+        self._validator = model.__pydantic_validator__
+        self._list_adapter = TypeAdapter(list[model])
+
+    def map(self, obj: Any) -> M:
+        """Map one Stripe object."""
+        return self._validator.validate_python(obj, from_attributes=True)
+
+    def map_many(self, objs: Iterable[Any]) -> list[M]:
+        """Map a sequence of Stripe objects, e.g. a list or search page's ``data``."""
+        return self._list_adapter.validate_python(list(objs), from_attributes=True)
+
+    def build(self, **fields: Any) -> M:
+        """Create the model from already extracted field values."""
+        return self._validator.validate_python(fields)
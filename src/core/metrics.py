@@ -0,0 +1,156 @@
+import os
+import time
+from collections.abc import AsyncIterable, AsyncIterator, Callable, Coroutine
+from contextvars import ContextVar
+from typing import Any
+from urllib.parse import urlsplit
+
+from fastapi import Request, Response
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import StreamingResponse
+from fastapi.routing import APIRoute
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, multiprocess
+
+from src.core.tracing import stripe_tracer
+
+registry = CollectorRegistry()
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Time to serve an API request, until the last body chunk is sent.",
+    ["method", "route", "status"],
+    registry=registry,
+)
+HTTP_REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight",
+    "API requests currently being served.",
+    ["method", "route"],
+    registry=registry,
+    multiprocess_mode="livesum",
+)
+
+STRIPE_REQUEST_DURATION = Histogram(
+    "stripe_request_duration_seconds",
+    "Round trip of one Stripe API attempt, excluding rate-limit queueing.",
+    ["operation"],
+    registry=registry,
+)
+STRIPE_REQUESTS = Counter(
+    "stripe_requests",
+    "Stripe API attempts by response status.",
+    ["operation", "status"],
+    registry=registry,
+)
+STRIPE_ERRORS = Counter(
+    "stripe_errors",
+    "Failed Stripe API attempts: an HTTP status >= 400, connection_error or queue_timeout.",
+    ["operation", "reason"],
+    registry=registry,
+)
+STRIPE_RETRIES = Counter(
+    "stripe_retries",
+    "Stripe API attempts repeated, by the status or error that caused the retry.",
+    ["operation", "reason"],
+    registry=registry,
+)
+
+current_stripe_operation: ContextVar[str] = ContextVar("current_stripe_operation", default="unknown")
+
+
+def stripe_operation(method: str, url: str) -> str:
+    """
+    Name the Stripe operation a request performs, e.g. ``Customer.search``.
+
+    Args:
+        method (str): The HTTP method.
+        url (str): The request URL.
+
+    Returns:
+        str: ``Resource.operation``, where operation is ``list``, ``create``,
+        ``retrieve``, ``update``, ``delete``, ``search`` or the action name
+        such as ``cancel``.
+    """
+    parts = urlsplit(url).path.strip("/").split("/")[1:]
+    if not parts:
+        return "unknown"
+    resource = parts[0].removesuffix("s")
+    resource = "".join(word.capitalize() for word in resource.split("_"))
+    method = method.upper()
+    if len(parts) == 1:
+        operation = "list" if method == "GET" else "create"
+    elif parts[1] == "search":
+        operation = "search"
+    elif len(parts) == 2:
+        operation = {"GET": "retrieve", "POST": "update", "DELETE": "delete"}.get(method, method.lower())
+    else:
+        operation = parts[-1]
+    return f"{resource}.{operation}"
+
+
+def mark_worker_stopped() -> None:
+    """
+    Drop this process's live gauges from the multi-worker aggregation.
+
+    Does nothing unless ``PROMETHEUS_MULTIPROC_DIR`` is set, i.e. when
+    ``main.py`` runs several workers.
+    """
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        multiprocess.mark_process_dead(os.getpid())
+
+
+class InstrumentedRoute(APIRoute):
+    """
+    ``APIRoute`` recording latency and in-flight requests under its path.
+
+    It also samples the request for ``stripe_tracer``; a traced request's id
+    (the client's ``X-Request-ID`` or a generated one) is echoed in the
+    ``X-Request-ID`` response header.
+
+    Series are labelled with the route template (``/customer/{customer_id}``)
+    rather than the raw path, so ids do not create new series. Streaming
+    responses are timed, and counted in flight, until their last chunk.
+    Routers opt in with ``APIRouter(route_class=InstrumentedRoute)``.
+    """
+
+    def get_route_handler(self) -> Callable[[Request], Coroutine[Any, Any, Response]]:
+        handler = super().get_route_handler()
+        route = self.path
+
+        async def instrumented(request: Request) -> Response:
+            method = request.method
+            in_flight = HTTP_REQUESTS_IN_FLIGHT.labels(method, route)
+            in_flight.inc()
+            started = time.perf_counter()
+            inbound = stripe_tracer.start_request(method, route, request.headers.get("x-request-id"))
+
+            def finish(status: int) -> None:
+                in_flight.dec()
+                HTTP_REQUEST_DURATION.labels(method, route, str(status)).observe(
+                    time.perf_counter() - started
+                )
+
+            try:
+                response = await handler(request)
+            except Exception as e:
+                finish(422 if isinstance(e, RequestValidationError) else getattr(e, "status_code", 500))
+                raise
+
+            if inbound is not None:
+                response.headers.setdefault("X-Request-ID", inbound.id)
+            if isinstance(response, StreamingResponse):
+                response.body_iterator = _finish_after(response.body_iterator, finish, response.status_code)
+            else:
+                finish(response.status_code)
+            return response
+
+        return instrumented
+
+
+async def _finish_after(
+    chunks: AsyncIterable, finish: Callable[[int], None], status: int
+) -> AsyncIterator:
+    try:
+        async for chunk in chunks:
+            yield chunk
+    finally:
+        finish(status)
@@ -0,0 +1,170 @@
+import asyncio
+import time
+from collections.abc import Callable
+from urllib.parse import urlsplit
+
+from src.core.settings import settings
+
+KINDS = ("search", "read", "write")
+
+
+class TokenBucket:
+    """
+    Token bucket that hands out future slots instead of rejecting callers.
+
+    ``reserve`` always takes a token, letting the balance go negative, and
+    returns how long the caller must wait for it; callers are therefore
+    served in arrival order at no more than ``rate`` per second once the
+    ``burst`` is spent.
+
+    Attributes:
+        rate (float): Tokens added per second.
+        burst (float): Maximum tokens accumulated while idle.
+    """
+
+    def __init__(self, rate: float, burst: float, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self._clock = clock
+        self._tokens = burst
+        self._updated = clock()
+
+    def reserve(self, max_wait: float) -> float | None:
+        """
+        Take a token.
+
+        Args:
+            max_wait (float): Longest acceptable wait, in seconds.
+
+        Returns:
+            float | None: Seconds to wait before using the token, or None if
+            that would exceed ``max_wait``, in which case no token is taken.
+        """
+        self._refill()
+        wait = max(0.0, (1 - self._tokens) / self.rate)
+        if wait > max_wait:
+            return None
+        self._tokens -= 1
+        return wait
+
+    def pause(self, seconds: float) -> None:
+        """Hand out no new slot for the next ``seconds``."""
+        self._refill()
+        self._tokens = min(self._tokens, 1 - seconds * self.rate)
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+
+class StripeScheduler:
+    """
+    Shared outbound scheduler for every Stripe API call made by the app.
+
+    Stripe enforces separate per-second limits for Search, other reads and
+    writes. Each kind gets its own token bucket, so a burst of searches
+    cannot starve writes. Callers wait for a slot up to ``deadline`` seconds
+    and then fail with ``StripeQueueTimeout`` instead of piling up; a 429
+    pauses the bucket of that kind for ``Retry-After`` seconds.
+
+    The rates are the account's total. Every process has its own scheduler,
+    so with ``processes`` of them each bucket refills at its share of the
+    rate.
+
+    Methods:
+        classify(method: str, url: str) -> str:
+            Return the bucket a request is drawn from.
+        acquire(kind: str, timeout: float | None) -> None:
+            Wait for a slot in the ``kind`` bucket.
+        backoff(kind: str, seconds: float) -> None:
+            Pause the ``kind`` bucket after a 429.
+        stats() -> dict[str, dict[str, float]]:
+            Return queue depth and throttling counters per kind.
+    """
+
+    def __init__(
+        self,
+        search_rate: float,
+        read_rate: float,
+        write_rate: float,
+        deadline: float,
+        processes: int = 1,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.deadline = deadline
+        self.processes = processes
+        self._clock = clock
+        self._buckets = {
+            kind: TokenBucket(rate / processes, max(rate / processes, 1.0), clock)
+            for kind, rate in (("search", search_rate), ("read", read_rate), ("write", write_rate))
+        }
+        self._stats = {
+            kind: {"queued": 0, "max_queued": 0, "acquired": 0, "waited": 0, "timeouts": 0, "throttled": 0}
+            for kind in KINDS
+        }
+
+    @staticmethod
+    def classify(method: str, url: str) -> str:
+        path = urlsplit(url).path
+        if path.endswith("/search"):
+            return "search"
+        return "read" if method.lower() == "get" else "write"
+
+    async def acquire(self, kind: str, timeout: float | None = None) -> None:
+        """
+        Wait until a request of ``kind`` may be sent.
+
+        Args:
+            kind (str): ``search``, ``read`` or ``write``.
+            timeout (float | None): Seconds to wait at most, defaults to
+                ``deadline``.
+
+        Raises:
+            StripeQueueTimeout: If no slot is available in time.
+        """
+        timeout = self.deadline if timeout is None else timeout
+        stats = self._stats[kind]
+        wait = self._buckets[kind].reserve(timeout)
+        if wait is None:
+            from src.core.stripe_http import StripeQueueTimeout
+
+            stats["timeouts"] += 1
+            raise StripeQueueTimeout(
+                f"No Stripe {kind} rate-limit slot available within {timeout:.1f}s"
+            )
+
+        stats["acquired"] += 1
+        if wait > 0:
+            stats["waited"] += 1
+            stats["queued"] += 1
+            stats["max_queued"] = max(stats["max_queued"], stats["queued"])
+            try:
+                await asyncio.sleep(wait)
+            finally:
+                stats["queued"] -= 1
+
+    def backoff(self, kind: str, seconds: float) -> None:
+        self._stats[kind]["throttled"] += 1
+        self._buckets[kind].pause(seconds)
+
+    def stats(self) -> dict[str, dict[str, float]]:
+        """
+        Return the scheduler counters.
+
+        Returns:
+            dict[str, dict[str, float]]: Per kind, the callers currently
+            ``queued`` and the peak ``max_queued``, plus totals of
+            ``acquired`` slots, requests that ``waited``, ``timeouts`` and
+            ``throttled`` (429) responses.
+        """
+        return {kind: dict(counters) for kind, counters in self._stats.items()}
+
+
+stripe_scheduler = StripeScheduler(
+    search_rate=settings.STRIPE_RATE_LIMIT_SEARCH,
+    read_rate=settings.STRIPE_RATE_LIMIT_READ,
+    write_rate=settings.STRIPE_RATE_LIMIT_WRITE,
+    deadline=settings.STRIPE_QUEUE_DEADLINE,
+    processes=settings.STRIPE_RATE_LIMIT_PROCESSES,
+)
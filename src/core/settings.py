@@ -1,3 +1,5 @@
+from typing import Literal
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -8,8 +10,70 @@ class Settings(BaseSettings):
         extra="ignore",
     )
 
+    SERVER_HOST: str = "0.0.0.0"
+    SERVER_PORT: int = 4242
+    SERVER_WORKERS: int = 0
+    SERVER_LOOP: Literal["auto", "asyncio", "uvloop"] = "uvloop"
+    SERVER_HTTP: Literal["auto", "h11", "httptools"] = "httptools"
+    SERVER_BACKLOG: int = 2048
+    SERVER_KEEPALIVE_TIMEOUT: int = 75
+    SERVER_GRACEFUL_SHUTDOWN_TIMEOUT: int = 30
+    SERVER_LIMIT_CONCURRENCY: int | None = None
+    SERVER_ACCESS_LOG: bool = True
+    PROMETHEUS_MULTIPROC_DIR: str = "data/prometheus"
+    METRICS_PUBLISH_INTERVAL: float = 5.0
+
     STRIPE_PUBLIC_KEY: str = ""
     STRIPE_SECRET_KEY: str = ""
+    STRIPE_WEBHOOK_SECRET: str = ""
+    STRIPE_API_BASE: str = "https://api.stripe.com"
+
+    STRIPE_MAX_CONNECTIONS: int = 100
+    STRIPE_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    STRIPE_KEEPALIVE_EXPIRY: float = 30.0
+    STRIPE_CONNECT_TIMEOUT: float = 5.0
+    STRIPE_READ_TIMEOUT: float = 30.0
+    STRIPE_HTTP2: bool = False
+    STRIPE_WARMUP_CONNECTIONS: int = 4
+
+    STRIPE_RATE_LIMIT_READ: float = 100.0
+    STRIPE_RATE_LIMIT_WRITE: float = 100.0
+    STRIPE_RATE_LIMIT_SEARCH: float = 20.0
+    STRIPE_QUEUE_DEADLINE: float = 10.0
+    STRIPE_RATE_LIMIT_RETRIES: int = 3
+    STRIPE_RATE_LIMIT_PROCESSES: int = 1
+
+    STRIPE_TRACE_SAMPLE_RATE: float = 0.0
+    STRIPE_TRACE_BUFFER_SIZE: int = 1000
+    DEBUG_ROUTES: bool = False
+    STRIPE_COALESCE_READS: bool = True
+
+    LOCAL_DB_PATH: str = "data/local.db"
+    CUSTOMER_INDEX_FALLBACK_TO_SEARCH: bool = True
+    CUSTOMER_BULK_CONCURRENCY: int = 16
+    SUBSCRIPTION_MIRROR_FALLBACK_TO_SEARCH: bool = True
+
+    CACHE_BACKEND: Literal["memory", "sqlite", "redis"] = "sqlite"
+    CACHE_MAXSIZE: int = 10_000
+    CACHE_SQLITE_PATH: str = "data/cache.db"
+    CACHE_REDIS_URL: str = "redis://localhost:6379/0"
+    CACHE_REDIS_TIMEOUT: float = 0.25
+    CACHE_KEY_PREFIX: str = "stripe-api"
+    CATALOG_CACHE_TTL: float = 300.0
+    CUSTOMER_CACHE_TTL: float = 60.0
+    SUBSCRIPTION_CACHE_TTL: float = 60.0
+
+    JSON_STREAM_MIN_ITEMS: int = 200
+    JSON_STREAM_BATCH_SIZE: int = 100
+
+    IDEMPOTENCY_CACHE_TTL: float = 24 * 3600
+
+    WEBHOOK_WORKERS: int = 4
+    WEBHOOK_POLL_INTERVAL: float = 1.0
+    WEBHOOK_LEASE_SECONDS: float = 60.0
+    WEBHOOK_MAX_ATTEMPTS: int = 5
+    WEBHOOK_DEDUP_MAXSIZE: int = 10_000
+    WEBHOOK_DEDUP_RETENTION: float = 7 * 24 * 3600
 
 
 settings = Settings()
\ No newline at end of file
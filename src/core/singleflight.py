@@ -0,0 +1,94 @@
+import asyncio
+from collections import defaultdict
+from collections.abc import Awaitable, Callable, Hashable
+from typing import TypeVar
+
+from src.core.settings import settings
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    Coalesces identical concurrent reads into one call.
+
+    The first caller for a key starts the call in its own task; callers
+    arriving with the same key while it runs await that task instead of
+    starting another, and all receive its result or exception. The key is
+    released as soon as the call finishes, so nothing is cached: a read that
+    starts after the call completed goes to Stripe again.
+
+    The call runs in a task so that a caller which is cancelled (e.g. its
+    client disconnected) does not cancel it for the others waiting on it.
+
+    Methods:
+        do(namespace: str, key: Hashable, call: Callable[[], Awaitable[T]]) -> T:
+            Run ``call`` unless an identical one is in flight, and return its result.
+        forget(namespace: str, key: Hashable) -> None:
+            Stop sharing an in-flight call, e.g. after a write to that object.
+        stats() -> dict[str, dict[str, int]]:
+            Return the calls made and shared per namespace.
+
+    Attributes:
+        enabled (bool): If False, ``do`` always runs ``call`` directly.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._in_flight: dict[tuple[str, Hashable], asyncio.Task] = {}
+        self._counts: dict[str, dict[str, int]] = defaultdict(lambda: {"calls": 0, "shared": 0})
+
+    async def do(self, namespace: str, key: Hashable, call: Callable[[], Awaitable[T]]) -> T:
+        """
+        Run ``call``, or join an identical call already in flight.
+
+        Args:
+            namespace (str): The kind of read, e.g. ``customer``.
+            key (Hashable): Identifies the read within ``namespace``.
+            call (Callable[[], Awaitable[T]]): Performs the read.
+
+        Returns:
+            T: The result of the shared call.
+        """
+        if not self.enabled:
+            return await call()
+        counts = self._counts[namespace]
+        flight = (namespace, key)
+        task = self._in_flight.get(flight)
+        if task is None:
+            counts["calls"] += 1
+            task = asyncio.ensure_future(call())
+            self._in_flight[flight] = task
+            task.add_done_callback(lambda done: self._release(flight, done))
+        else:
+            counts["shared"] += 1
+        return await asyncio.shield(task)
+
+    def forget(self, namespace: str, key: Hashable) -> None:
+        """
+        Stop handing out the in-flight call for a key.
+
+        Callers already waiting still get its result; later callers start a
+        new call, so they cannot receive data read before a write.
+        """
+        self._in_flight.pop((namespace, key), None)
+
+    def _release(self, flight: tuple[str, Hashable], task: asyncio.Task) -> None:
+        if self._in_flight.get(flight) is task:
+            del self._in_flight[flight]
+        if not task.cancelled():
+            # Mark the exception as retrieved when every caller went away.
+            task.exception()
+
+    def stats(self) -> dict[str, dict[str, int]]:
+        """
+        Return the coalescing counters.
+
+        Returns:
+            dict[str, dict[str, int]]: Per namespace, ``calls`` actually made
+            and ``shared`` reads answered by another caller's call.
+        """
+        return {namespace: dict(counts) for namespace, counts in self._counts.items()}
+
+
+stripe_reads = SingleFlight(enabled=settings.STRIPE_COALESCE_READS)
@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import TYPE_CHECKING
+
+from src.core.scheduler import StripeScheduler, stripe_scheduler
+from src.core.settings import settings
+
+if TYPE_CHECKING:
+    import stripe
+
+logger = logging.getLogger(__name__)
+
+_http_client: stripe.HTTPClient | None = None
+_stripe_client: stripe.StripeClient | None = None
+
+
+def configure_stripe_client(
+    http_client: stripe.HTTPClient | None = None,
+    scheduler: StripeScheduler | None = None,
+) -> stripe.StripeClient:
+    """
+    Build the process-wide ``StripeClient`` and make it the shared instance.
+
+    Every request goes through the rate-limit scheduler, whatever the transport,
+    and is sent to ``settings.STRIPE_API_BASE``, e.g. a local fake Stripe.
+
+    The Stripe SDK is imported here rather than at module level: loading it
+    takes most of the app's import time, so it is deferred until a client is
+    first needed.
+
+    Args:
+        http_client (stripe.HTTPClient | None): Transport to use instead of the
+            pooled client built from ``Settings``, e.g. a fake for benchmarks.
+        scheduler (StripeScheduler | None): Scheduler to use instead of the
+            shared ``stripe_scheduler``.
+
+    Returns:
+        stripe.StripeClient: The shared client.
+    """
+    global _http_client, _stripe_client
+    import stripe
+
+    from src.core.stripe_http import PooledHTTPXClient, ScheduledHTTPClient
+
+    _http_client = http_client or PooledHTTPXClient(
+        max_connections=settings.STRIPE_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.STRIPE_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=settings.STRIPE_KEEPALIVE_EXPIRY,
+        connect_timeout=settings.STRIPE_CONNECT_TIMEOUT,
+        read_timeout=settings.STRIPE_READ_TIMEOUT,
+        http2=settings.STRIPE_HTTP2,
+    )
+    _stripe_client = stripe.StripeClient(
+        settings.STRIPE_SECRET_KEY,
+        base_addresses={"api": settings.STRIPE_API_BASE},
+        http_client=ScheduledHTTPClient(
+            _http_client,
+            scheduler or stripe_scheduler,
+            max_retries=settings.STRIPE_RATE_LIMIT_RETRIES,
+        ),
+    )
+    return _stripe_client
+
+
+def get_stripe_client() -> stripe.StripeClient:
+    """
+    Return the shared ``StripeClient``, building it on first use.
+
+    The app lifespan normally builds it at startup; the lazy path keeps
+    scripts and in-process ASGI callers, which skip the lifespan, working.
+    """
+    if _stripe_client is None:
+        return configure_stripe_client()
+    return _stripe_client
+
+
+async def warm_up_stripe_client() -> None:
+    """
+    Open ``STRIPE_WARMUP_CONNECTIONS`` connections to the Stripe API.
+
+    Paying the TCP and TLS handshakes at startup means the first requests
+    after a deploy reuse warm keep-alive connections. Failures are logged and
+    ignored: an unreachable Stripe must not prevent the app from starting.
+
+    With ``STRIPE_WARMUP_CONNECTIONS`` set to 0 nothing is done, not even
+    loading the SDK, and the first request that calls Stripe builds the client.
+    """
+    if settings.STRIPE_WARMUP_CONNECTIONS <= 0:
+        return
+    from src.core.stripe_http import PooledHTTPXClient
+
+    get_stripe_client()
+    if not isinstance(_http_client, PooledHTTPXClient):
+        return
+
+    results = await asyncio.gather(
+        *(
+            _http_client.pool.head(settings.STRIPE_API_BASE, timeout=_http_client._timeout)
+            for _ in range(settings.STRIPE_WARMUP_CONNECTIONS)
+        ),
+        return_exceptions=True,
+    )
+    failures = [r for r in results if isinstance(r, Exception)]
+    if failures:
+        logger.warning("Stripe warm-up: %d of %d connections failed (%s)", len(failures), len(results), failures[0])
+
+
+async def close_stripe_client() -> None:
+    """Close the pooled connections and forget the shared client."""
+    global _http_client, _stripe_client
+
+    if _http_client is not None:
+        await _http_client.close_async()
+    _http_client = None
+    _stripe_client = None
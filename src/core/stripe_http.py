@@ -0,0 +1,210 @@
+import logging
+import ssl
+import time
+from urllib.parse import urlsplit
+
+import anyio
+import httpx
+import stripe
+
+from src.core.metrics import (
+    STRIPE_ERRORS,
+    STRIPE_REQUEST_DURATION,
+    STRIPE_REQUESTS,
+    STRIPE_RETRIES,
+    current_stripe_operation,
+    stripe_operation,
+)
+from src.core.scheduler import StripeScheduler
+from src.core.tracing import StripeCall, current_inbound_request, current_stripe_call, stripe_tracer
+
+logger = logging.getLogger(__name__)
+
+
+class StripeQueueTimeout(stripe.StripeError):
+    """A Stripe call could not get a rate-limit slot before its deadline."""
+
+
+class PooledHTTPXClient(stripe.HTTPXClient):
+    """
+    Stripe HTTP client backed by a single, tunable ``httpx.AsyncClient``.
+
+    The SDK's own ``HTTPXClient`` builds its pool with httpx defaults; this
+    subclass exposes the pool size, keep-alive, HTTP/2 and timeouts so they
+    can be sized from ``Settings``.
+
+    Attributes:
+        pool (httpx.AsyncClient): The connection pool shared by every call.
+    """
+
+    name = "httpx-pooled"
+
+    def __init__(
+        self,
+        max_connections: int,
+        max_keepalive_connections: int,
+        keepalive_expiry: float,
+        connect_timeout: float,
+        read_timeout: float,
+        http2: bool = False,
+        transport: httpx.AsyncBaseTransport | None = None,
+    ):
+        stripe.HTTPClient.__init__(self)
+        self.httpx = httpx
+        self.anyio = anyio
+        self._client = None
+        self._timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        self._client_async = httpx.AsyncClient(
+            verify=ssl.create_default_context(cafile=stripe.ca_bundle_path),
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive_connections,
+                keepalive_expiry=keepalive_expiry,
+            ),
+            http2=http2,
+            transport=transport,
+        )
+
+    @property
+    def pool(self) -> httpx.AsyncClient:
+        return self._client_async
+
+
+class ScheduledHTTPClient(stripe.HTTPClient):
+    """
+    Stripe HTTP client that sends every async request through a ``StripeScheduler``.
+
+    Wraps the transport actually used (the pooled httpx client, or a fake in
+    benchmarks). A 429 response pauses the request's bucket for the
+    ``Retry-After`` it carries, or an exponential backoff without one, and
+    the request is retried up to ``max_retries`` times while its deadline
+    allows; only then is the 429 handed back to the SDK, which does not
+    retry it again (``_should_retry``).
+
+    Every attempt is recorded in the ``stripe_*`` metrics under its
+    operation name, including the SDK's own network retries. Calls made
+    while serving a sampled API request are also kept by ``stripe_tracer``.
+    """
+
+    name = "scheduled"
+
+    def __init__(self, inner: stripe.HTTPClient, scheduler: StripeScheduler, max_retries: int):
+        super().__init__()
+        self.inner = inner
+        self.scheduler = scheduler
+        self.max_retries = max_retries
+
+    async def request_async(self, method, url, headers, post_data=None):
+        return await self._scheduled(self.inner.request_async, method, url, headers, post_data)
+
+    async def request_stream_async(self, method, url, headers, post_data=None):
+        return await self._scheduled(self.inner.request_stream_async, method, url, headers, post_data)
+
+    def request(self, method, url, headers, post_data=None):
+        return self.inner.request(method, url, headers, post_data)
+
+    def request_stream(self, method, url, headers, post_data=None):
+        return self.inner.request_stream(method, url, headers, post_data)
+
+    def close(self):
+        self.inner.close()
+
+    async def close_async(self):
+        await self.inner.close_async()
+
+    def sleep_async(self, secs: float):
+        return self.inner.sleep_async(secs)
+
+    async def request_with_retries_async(
+        self, method, url, headers, post_data=None, max_network_retries=None, *, _usage=None
+    ):
+        inbound = current_inbound_request.get()
+        if inbound is None:
+            return await super().request_with_retries_async(
+                method, url, headers, post_data, max_network_retries, _usage=_usage
+            )
+
+        call = StripeCall(
+            operation=stripe_operation(method, url),
+            method=method.upper(),
+            path=urlsplit(url).path,
+            started_at=time.time(),
+            inbound=inbound,
+        )
+        current_stripe_call.set(call)
+        try:
+            response = await super().request_with_retries_async(
+                method, url, headers, post_data, max_network_retries, _usage=_usage
+            )
+        except Exception as e:
+            call.error = type(e).__name__
+            raise
+        else:
+            body, call.status, response_headers = response
+            call.bytes_received = len(body)
+            call.request_id = response_headers.get("request-id") if response_headers else None
+            return response
+        finally:
+            current_stripe_call.set(None)
+            stripe_tracer.record(call)
+
+    def _should_retry(self, response, api_connection_error, num_retries, max_network_retries):
+        # 429s were already retried by _scheduled, which honours Retry-After.
+        if response is not None and response[1] == 429:
+            return False
+        retry = super()._should_retry(response, api_connection_error, num_retries, max_network_retries)
+        if retry:
+            reason = "connection_error" if response is None else str(response[1])
+            STRIPE_RETRIES.labels(current_stripe_operation.get(), reason).inc()
+            self._count_retry()
+        return retry
+
+    @staticmethod
+    def _count_retry() -> None:
+        call = current_stripe_call.get()
+        if call is not None:
+            call.retries += 1
+
+    async def _scheduled(self, send, method, url, headers, post_data):
+        kind = self.scheduler.classify(method, url)
+        operation = stripe_operation(method, url)
+        # Read by _should_retry, which the SDK calls in this same task.
+        current_stripe_operation.set(operation)
+        deadline = time.monotonic() + self.scheduler.deadline
+        attempt = 0
+        while True:
+            try:
+                await self.scheduler.acquire(kind, max(0.0, deadline - time.monotonic()))
+            except StripeQueueTimeout:
+                STRIPE_ERRORS.labels(operation, "queue_timeout").inc()
+                raise
+            response = await self._timed(operation, send, method, url, headers, post_data)
+            if response[1] != 429 or attempt >= self.max_retries:
+                return response
+
+            attempt += 1
+            STRIPE_RETRIES.labels(operation, "429").inc()
+            self._count_retry()
+            delay = self._retry_after_header(response) or min(
+                self.INITIAL_DELAY * 2 ** (attempt - 1), self.MAX_DELAY
+            )
+            logger.warning("Stripe 429 on %s %s, pausing %s calls for %.2fs", method, url, kind, delay)
+            self.scheduler.backoff(kind, delay)
+
+    @staticmethod
+    async def _timed(operation, send, method, url, headers, post_data):
+        started = time.perf_counter()
+        try:
+            response = await send(method, url, headers, post_data)
+        except stripe.APIConnectionError:
+            STRIPE_REQUESTS.labels(operation, "connection_error").inc()
+            STRIPE_ERRORS.labels(operation, "connection_error").inc()
+            raise
+        finally:
+            STRIPE_REQUEST_DURATION.labels(operation).observe(time.perf_counter() - started)
+
+        status = response[1]
+        STRIPE_REQUESTS.labels(operation, str(status)).inc()
+        if status >= 400:
+            STRIPE_ERRORS.labels(operation, str(status)).inc()
+        return response
@@ -0,0 +1,142 @@
+import heapq
+import random
+import time
+import uuid
+from collections import deque
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field
+from typing import Any
+
+from src.core.settings import settings
+
+
+@dataclass
+class InboundRequest:
+    """The API request a traced Stripe call was made for."""
+
+    id: str
+    method: str
+    route: str
+
+
+@dataclass
+class StripeCall:
+    """
+    One outbound Stripe call, including its retries.
+
+    Attributes:
+        operation (str): E.g. ``Customer.search``.
+        method (str): The HTTP method.
+        path (str): The request path, without the query string.
+        status (int | None): The final HTTP status, None if no response came back.
+        error (str | None): The exception raised instead of a response.
+        duration_ms (float): Wall time including rate-limit queueing and retries.
+        retries (int): Attempts after the first one.
+        bytes_received (int): Size of the final response body.
+        request_id (str | None): Stripe's ``Request-Id`` of the final attempt.
+        started_at (float): Unix time the call started.
+        inbound (InboundRequest | None): The API request it belongs to.
+    """
+
+    operation: str
+    method: str
+    path: str
+    started_at: float
+    inbound: InboundRequest | None
+    status: int | None = None
+    error: str | None = None
+    duration_ms: float = 0.0
+    retries: int = 0
+    bytes_received: int = 0
+    request_id: str | None = None
+    _started: float = field(default_factory=time.perf_counter, repr=False)
+
+    def to_dict(self) -> dict[str, Any]:
+        data = asdict(self)
+        del data["_started"]
+        return data
+
+
+current_inbound_request: ContextVar[InboundRequest | None] = ContextVar("current_inbound_request", default=None)
+current_stripe_call: ContextVar[StripeCall | None] = ContextVar("current_stripe_call", default=None)
+
+
+class StripeCallTracer:
+    """
+    Keeps the most recent traced Stripe calls in a fixed-size ring buffer.
+
+    Sampling is decided once per inbound API request: a sampled request has
+    every Stripe call it makes recorded and tied to it, an unsampled one
+    costs a single context variable lookup per call.
+
+    Methods:
+        start_request(method: str, route: str, request_id: str | None) -> InboundRequest | None:
+            Decide whether to trace an inbound request.
+        record(call: StripeCall) -> None:
+            Store a finished call, dropping the oldest when full.
+        slowest(limit: int, ...) -> list[StripeCall]:
+            Return the slowest buffered calls.
+
+    Attributes:
+        sample_rate (float): Fraction of inbound requests traced, 0 disables tracing.
+        capacity (int): Calls kept in the buffer.
+    """
+
+    def __init__(self, capacity: int, sample_rate: float):
+        self.capacity = capacity
+        self.sample_rate = sample_rate
+        self.recorded = 0
+        self._calls: deque[StripeCall] = deque(maxlen=capacity)
+
+    def start_request(self, method: str, route: str, request_id: str | None = None) -> InboundRequest | None:
+        """
+        Sample an inbound request and make the outcome current for its Stripe calls.
+
+        Args:
+            method (str): The HTTP method.
+            route (str): The route template.
+            request_id (str | None): The client's ``X-Request-ID``, if any.
+
+        Returns:
+            InboundRequest | None: The traced request, or None if not sampled.
+        """
+        inbound = None
+        if self.sample_rate and random.random() < self.sample_rate:
+            inbound = InboundRequest(id=request_id or uuid.uuid4().hex[:16], method=method, route=route)
+        current_inbound_request.set(inbound)
+        return inbound
+
+    def record(self, call: StripeCall) -> None:
+        call.duration_ms = (time.perf_counter() - call._started) * 1000
+        self._calls.append(call)
+        self.recorded += 1
+
+    def slowest(
+        self,
+        limit: int = 20,
+        operation: str | None = None,
+        request_id: str | None = None,
+    ) -> list[StripeCall]:
+        """
+        Return the slowest buffered calls, slowest first.
+
+        Args:
+            limit (int): Maximum number of calls returned.
+            operation (str | None): Only calls of this operation.
+            request_id (str | None): Only calls made by this inbound request.
+        """
+        calls = [
+            call for call in list(self._calls)
+            if (operation is None or call.operation == operation)
+            and (request_id is None or (call.inbound is not None and call.inbound.id == request_id))
+        ]
+        return heapq.nlargest(limit, calls, key=lambda call: call.duration_ms)
+
+    def clear(self) -> None:
+        self._calls.clear()
+
+
+stripe_tracer = StripeCallTracer(
+    capacity=settings.STRIPE_TRACE_BUFFER_SIZE,
+    sample_rate=settings.STRIPE_TRACE_SAMPLE_RATE,
+)
@@ -1,12 +1,18 @@
 from .customer import router as customer_router
+from .debug import router as debug_router
+from .metrics import router as metrics_router
 from .payment import router as payment_router
 from .product import router as product_router
 from .subscription import router as subscription_router
+from .webhook import router as webhook_router
 
 
 __all__ = [
     "customer_router",
+    "debug_router",
+    "metrics_router",
     "payment_router",
     "product_router",
-    "subscription_router"
+    "subscription_router",
+    "webhook_router"
 ]
\ No newline at end of file
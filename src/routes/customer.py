@@ -1,36 +1,93 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Header, HTTPException, Request, Response
 
+from src.core import InstrumentedRoute
 from src.schemas import CustomerCreate, CustomerResponse
 from src.services import CustomerService
+from src.services.idempotency import idempotency_cache
+from src.services.response_cache import customer_cache
+from src.utils import (
+    DuplexNDJSONResponse,
+    encode_ndjson,
+    etag_matches,
+    etag_model_response,
+    not_modified,
+    server_timing
+)
 
-router = APIRouter(prefix="/customer", tags=["Customer"])
+router = APIRouter(prefix="/customer", tags=["Customer"], route_class=InstrumentedRoute)
 
 @router.post("/")
-async def create_customer(data: CustomerCreate) -> CustomerResponse:
-    """Create a new customer."""
-    return CustomerService.create_customer(data)
+async def create_customer(
+    data: CustomerCreate,
+    response: Response,
+    idempotency_key: str | None = Header(None, alias="Idempotency-Key")
+) -> CustomerResponse:
+    """Create a new customer.
 
-@router.get("/{customer_id}")
-async def retrieve_customer(customer_id: str) -> CustomerResponse:
-    """Retrieve a customer by ID."""
-    return CustomerService.retrieve_customer(customer_id)
+    The ``Server-Timing`` header reports how long each creation phase took.
+    Retries with the same ``Idempotency-Key`` replay the first response.
+    """
+    replay = await idempotency_cache.replay("customer", idempotency_key, data)
+    if replay is not None:
+        return replay
+    timings: dict[str, float] = {}
+    try:
+        customer = await CustomerService.create_customer_async(data, timings, idempotency_key)
+    except HTTPException as e:
+        e.headers = {**(e.headers or {}), "Server-Timing": server_timing(timings)}
+        raise
+    response.headers["Server-Timing"] = server_timing(timings)
+    await idempotency_cache.store("customer", idempotency_key, data, customer)
+    return customer
+
+@router.post("/bulk")
+async def bulk_create_customers(
+    request: Request,
+    idempotency_key: str | None = Header(None, alias="Idempotency-Key")
+) -> DuplexNDJSONResponse:
+    """Create customers from an NDJSON body, one ``CustomerCreate`` per line.
+
+    Each record's result or error is streamed back as an NDJSON line as
+    soon as it completes.
+    """
+    results = CustomerService.bulk_create_customers_async(
+        request.stream(), idempotency_key=idempotency_key
+    )
+    return DuplexNDJSONResponse(encode_ndjson(results))
+
+@router.get("/{customer_id}", response_model=CustomerResponse, responses={304: {"description": "Not Modified"}})
+async def retrieve_customer(
+    customer_id: str,
+    if_none_match: str | None = Header(None, alias="If-None-Match")
+) -> Response:
+    """Retrieve a customer by ID.
+
+    Sent with a strong ``ETag``. If ``If-None-Match`` holds the ETag of the
+    cached customer, the answer is ``304`` without calling Stripe.
+    """
+    if if_none_match:
+        etag = await customer_cache.get_etag(customer_id)
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+    customer = await CustomerService.retrieve_customer_async(customer_id)
+    return etag_model_response(customer, CustomerResponse, if_none_match)
 
 @router.get("/user/{user_id}")
 async def get_customer_by_user_id(user_id: str) -> CustomerResponse:
     """Retrieve a customer by user ID."""
-    return CustomerService.get_customer_by_user_id(user_id)
+    return await CustomerService.get_customer_by_user_id_async(user_id)
 
 @router.put("/{customer_id}")
 async def update_customer(customer_id: str, data: CustomerCreate) -> CustomerResponse:
     """Update a customer."""
-    return CustomerService.update_customer(customer_id, data)
+    return await CustomerService.update_customer_async(customer_id, data)
 
 @router.delete("/{customer_id}")
 async def delete_customer(customer_id: str) -> dict:
     """Delete a customer."""
-    return CustomerService.delete_customer(customer_id)
+    return await CustomerService.delete_customer_async(customer_id)
 
 @router.delete("/user/{user_id}")
 async def delete_customer_by_user_id(user_id: str) -> dict:
     """Delete a customer by user ID."""
-    return CustomerService.delete_by_user_id(user_id)
\ No newline at end of file
+    return await CustomerService.delete_by_user_id_async(user_id)
\ No newline at end of file
@@ -0,0 +1,24 @@
+from fastapi import APIRouter, Query
+
+from src.core import stripe_tracer
+
+router = APIRouter(prefix="/debug", tags=["Debug"])
+
+@router.get("/stripe-calls")
+async def slowest_stripe_calls(
+    limit: int = Query(20, ge=1, le=1000, description="Number of calls returned"),
+    operation: str | None = Query(None, description="Only this operation, e.g. Customer.search"),
+    request_id: str | None = Query(None, description="Only calls made by this X-Request-ID"),
+) -> dict:
+    """List the slowest recently traced Stripe calls, slowest first.
+
+    Calls are traced for a ``STRIPE_TRACE_SAMPLE_RATE`` fraction of API
+    requests and kept in a ring buffer of ``STRIPE_TRACE_BUFFER_SIZE`` calls.
+    """
+    calls = stripe_tracer.slowest(limit, operation=operation, request_id=request_id)
+    return {
+        "sample_rate": stripe_tracer.sample_rate,
+        "capacity": stripe_tracer.capacity,
+        "recorded": stripe_tracer.recorded,
+        "calls": [call.to_dict() for call in calls],
+    }
@@ -0,0 +1,28 @@
+import asyncio
+
+from fastapi import APIRouter, Response
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    generate_latest,
+    multiprocess,
+)
+
+from src.services.metrics import registry, stats_publisher
+
+router = APIRouter(tags=["Metrics"])
+
+if stats_publisher.enabled:
+    # Several workers: sum their metrics from the shared directory, where
+    # each one also publishes its cache, scheduler and webhook stats.
+    scrape_registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(scrape_registry)
+else:
+    scrape_registry = registry
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics() -> Response:
+    """Prometheus metrics for routes, Stripe calls, caches and webhooks."""
+    if stats_publisher.enabled:
+        await asyncio.to_thread(stats_publisher.publish)
+    return Response(content=generate_latest(scrape_registry), media_type=CONTENT_TYPE_LATEST)
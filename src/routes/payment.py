@@ -1,42 +1,78 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Header, HTTPException, Response
+from fastapi.responses import StreamingResponse
 
+from src.core import InstrumentedRoute
 from src.schemas import CancelPaymentIntentResponse, PaymentIntentCreate, PaymentIntentResponse
 from src.services import PaymentService
+from src.services.idempotency import idempotency_cache
+from src.utils import NDJSON_MEDIA_TYPE, encode_ndjson, json_list_response
 
-router = APIRouter(prefix="/payment-intents", tags=["Payment Intents"])
+router = APIRouter(prefix="/payment-intents", tags=["Payment Intents"], route_class=InstrumentedRoute)
 
 @router.post("/")
-async def create_payment_intent(data: PaymentIntentCreate) -> PaymentIntentResponse:
-    """Create a payment intent."""
+async def create_payment_intent(
+    data: PaymentIntentCreate,
+    idempotency_key: str | None = Header(None, alias="Idempotency-Key")
+) -> PaymentIntentResponse:
+    """Create a payment intent.
+
+    Retries with the same ``Idempotency-Key`` replay the first response.
+    """
+    replay = await idempotency_cache.replay("payment_intent", idempotency_key, data)
+    if replay is not None:
+        return replay
     try:
-        result = PaymentService.create_payment_intent(data)
-        return result
+        result = await PaymentService.create_payment_intent_async(data, idempotency_key)
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
+    await idempotency_cache.store("payment_intent", idempotency_key, data, result)
+    return result
 
 @router.get("/{payment_intent_id}")
 async def get_payment_intent(payment_intent_id: str) -> PaymentIntentResponse:
     """Retrieve a payment intent."""
     try:
-        result = PaymentService.retrieve_payment_intent(payment_intent_id)
+        result = await PaymentService.retrieve_payment_intent_async(payment_intent_id)
         return result
     except Exception as e:
         raise HTTPException(status_code=404, detail=str(e))
     
-@router.get("/user/{user_id}")
-async def get_payment_intent_by_user_id(user_id: str, limit: int = 1) -> list[PaymentIntentResponse]:
+@router.get("/user/{user_id}", response_model=list[PaymentIntentResponse])
+async def get_payment_intent_by_user_id(user_id: str, limit: int = 1) -> Response:
     """Retrieve payment intents by user ID."""
     try:
-        result = PaymentService.get_payment_intent_by_user_id(user_id, limit)
-        return result
+        result = await PaymentService.get_payment_intent_by_user_id_async(user_id, limit)
+        return json_list_response(result, PaymentIntentResponse)
+    except Exception as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+@router.get("/user/{user_id}/stream")
+async def stream_payment_intents_by_user_id(user_id: str) -> StreamingResponse:
+    """Stream every payment intent of a user as NDJSON, one per line.
+
+    The first search page is fetched before responding, so a failing query
+    still returns a 404; later pages are fetched as the client reads.
+    """
+    intents = PaymentService.stream_payment_intents_by_user_id_async(user_id)
+    try:
+        first = await anext(intents, None)
     except Exception as e:
         raise HTTPException(status_code=404, detail=str(e))
 
+    async def body():
+        if first is None:
+            return
+        yield first
+        async for intent in intents:
+            yield intent
+
+    return StreamingResponse(encode_ndjson(body()), media_type=NDJSON_MEDIA_TYPE)
+
 @router.post("/{payment_intent_id}/cancel")
 async def cancel_payment_intent(payment_intent_id: str) -> CancelPaymentIntentResponse:
     """Cancel a payment intent."""
     try:
-        result = PaymentService.cancel_payment_intent(payment_intent_id)
+        result = await PaymentService.cancel_payment_intent_async(payment_intent_id)
         return result
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
\ No newline at end of file
@@ -1,4 +1,5 @@
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, Header, HTTPException, Query, Response
+from src.core import InstrumentedRoute
 from src.schemas import (
     ProductCreate, 
     PriceCreate, 
@@ -6,34 +7,49 @@ from src.schemas import (
 )
 from src.schemas.product import PriceResponse
 from src.services import ProductService
+from src.services.catalog import catalog_cache
+from src.utils import etag_json_response, etag_list_response, etag_matches, not_modified
 
-router = APIRouter(prefix="/products", tags=["products"])
+router = APIRouter(prefix="/products", tags=["products"], route_class=InstrumentedRoute)
 
 @router.post("/")
 async def create_product(data: ProductCreate) -> ProductResponse:
     """Create a new product."""
     try:
-        return ProductService.create_product(data)
+        return await ProductService.create_product_async(data)
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
     
 
-@router.get("/")
+@router.get("/", response_model=list[ProductResponse], responses={304: {"description": "Not Modified"}})
 async def list_products(
-    include_archived: bool = Query(False, description="Include archived products")
-    ) -> list[ProductResponse]:
-    """List all products."""
+    include_archived: bool = Query(False, description="Include archived products"),
+    if_none_match: str | None = Header(None, alias="If-None-Match")
+    ) -> Response:
+    """List all products, streamed when the catalog is large.
+
+    Sent with a strong ``ETag``. If ``If-None-Match`` holds the ETag of the
+    cached listing, the answer is ``304`` without reading the listing;
+    otherwise a cached listing is sent as the JSON it is stored as.
+    """
     try:
-        return ProductService.list_products(include_archived)
+        etag = await catalog_cache.get_listing_etag(include_archived)
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+        body = await catalog_cache.get_listing_body(include_archived)
+        if body is not None:
+            return etag_json_response(body, if_none_match)
+        products = await ProductService.list_products_async(include_archived)
+        return etag_list_response(products, ProductResponse, if_none_match, etag)
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
     
     
 @router.delete("/{product_id}")
-async def delete_product(product_id: str) -> ProductResponse:
+async def delete_product(product_id: str) -> dict:
     """Deactivate a product."""
     try:
-        return ProductService.delete_product(product_id)
+        return await ProductService.delete_product_async(product_id)
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -41,7 +57,7 @@ async def delete_product(product_id: str) -> ProductResponse:
 async def create_price(data: PriceCreate) -> PriceResponse:
     """Create a new price for a product."""
     try:
-        return ProductService.create_price(data)
+        return await ProductService.create_price_async(data)
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
     
@@ -49,6 +65,6 @@ async def create_price(data: PriceCreate) -> PriceResponse:
 async def delete_price(price_id: str) -> dict:
     """Deactivate a price."""
     try:
-        return ProductService.delete_price(price_id)
+        return await ProductService.delete_price_async(price_id)
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
\ No newline at end of file
@@ -1,24 +1,49 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Header, HTTPException, Response
+from src.core import InstrumentedRoute
+from src.services.idempotency import idempotency_cache
+from src.services.response_cache import subscription_cache
 from src.services.subscription import SubscriptionService
 from src.schemas import (
     SubscriptionCreate, 
     SubscriptionResponse,
     CancelSubscriptionResponse
 )
+from src.utils import etag_list_response, etag_matches, not_modified
 
-router = APIRouter(prefix="/subscriptions", tags=["subscriptions"])
+router = APIRouter(prefix="/subscriptions", tags=["subscriptions"], route_class=InstrumentedRoute)
 
 @router.post("/")
-async def create_subscription(data: SubscriptionCreate) -> SubscriptionResponse:
-    """Create a new subscription."""
-    return SubscriptionService.create_subscription(data)
+async def create_subscription(
+    data: SubscriptionCreate,
+    idempotency_key: str | None = Header(None, alias="Idempotency-Key")
+) -> SubscriptionResponse:
+    """Create a new subscription.
 
-@router.get("/users/{user_id}")
-async def get_user_subscriptions(user_id: str) -> list[SubscriptionResponse]:
-    """Get all subscriptions for a user."""
+    Retries with the same ``Idempotency-Key`` replay the first response.
+    """
+    replay = await idempotency_cache.replay("subscription", idempotency_key, data)
+    if replay is not None:
+        return replay
+    result = await SubscriptionService.create_subscription_async(data, idempotency_key)
+    await idempotency_cache.store("subscription", idempotency_key, data, result)
+    return result
+
+@router.get("/users/{user_id}", response_model=list[SubscriptionResponse], responses={304: {"description": "Not Modified"}})
+async def get_user_subscriptions(
+    user_id: str,
+    if_none_match: str | None = Header(None, alias="If-None-Match")
+) -> Response:
+    """Get all subscriptions for a user.
+
+    Sent with a strong ``ETag``. If ``If-None-Match`` holds the ETag of the
+    user's cached subscriptions, the answer is ``304`` without reading them.
+    """
     try:
-        subscriptions = SubscriptionService.get_user_subscriptions(user_id)
-        return subscriptions
+        etag = await subscription_cache.get_etag(user_id)
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+        subscriptions = await SubscriptionService.get_user_subscriptions_async(user_id)
+        return etag_list_response(subscriptions, SubscriptionResponse, if_none_match, etag)
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -29,6 +54,6 @@ async def cancel_subscription(
 ) -> CancelSubscriptionResponse:
     """Deactivate a subscription."""
     try:
-        return SubscriptionService.cancel_subscription(subscription_id, at_period_end)
+        return await SubscriptionService.cancel_subscription_async(subscription_id, at_period_end)
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
\ No newline at end of file
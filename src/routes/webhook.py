@@ -0,0 +1,41 @@
+from fastapi import APIRouter, Header, HTTPException, Request
+
+from src.core import InstrumentedRoute, settings
+from src.services import WebhookService
+from src.services.webhook_dedup import webhook_dedup
+from src.services.webhook_queue import webhook_queue, webhook_workers
+
+router = APIRouter(prefix="/webhooks", tags=["Webhooks"], route_class=InstrumentedRoute)
+
+@router.post("/stripe")
+async def receive_stripe_webhook(
+    request: Request,
+    stripe_signature: str = Header(None, alias="stripe-signature")
+) -> dict:
+    """Verify a Stripe webhook and queue it for the background workers.
+
+    Only the signature check and a local insert happen before the response,
+    so Stripe is acknowledged quickly even during a burst of deliveries.
+    Redeliveries of an already accepted event are acknowledged and dropped.
+    Without ``STRIPE_WEBHOOK_SECRET`` no signature can be trusted, so every
+    delivery is refused with 503.
+    """
+    if not settings.STRIPE_WEBHOOK_SECRET:
+        raise HTTPException(status_code=503, detail="Webhook endpoint is not configured.")
+
+    payload = await request.body()
+    try:
+        event = WebhookService.verify_webhook_signature(payload, stripe_signature)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if not webhook_dedup.accept(event["id"]):
+        return {"received": True, "id": event["id"], "duplicate": True}
+
+    try:
+        webhook_queue.put(event, payload.decode("utf-8"))
+    except Exception:
+        webhook_dedup.forget(event["id"])
+        raise
+    webhook_workers.notify()
+    return {"received": True, "id": event["id"]}
@@ -2,11 +2,13 @@ from .customer import CustomerService
 from .payment import PaymentService
 from .product import ProductService
 from .subscription import SubscriptionService
+from .webhook import WebhookService
 
 
 __all__ = [
     "CustomerService",
     "PaymentService",
     "ProductService",
-    "SubscriptionService"
+    "SubscriptionService",
+    "WebhookService"
 ]
\ No newline at end of file
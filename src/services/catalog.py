@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import json
+from collections.abc import Iterable
+from contextlib import AbstractAsyncContextManager
+from typing import TYPE_CHECKING
+
+from src.core import Cache, Codec, model_codec, settings
+from src.schemas import ProductResponse
+
+if TYPE_CHECKING:
+    import stripe
+
+
+def stripe_object_codec(object_type: str) -> Codec:
+    """
+    Return a codec storing Stripe objects as their JSON payload.
+
+    Args:
+        object_type (str): The SDK class rebuilt on load, e.g. ``"Product"``.
+    """
+    def loads(data: bytes) -> stripe.StripeObject:
+        import stripe
+
+        return getattr(stripe, object_type).construct_from(json.loads(data), settings.STRIPE_SECRET_KEY)
+
+    return Codec(lambda obj: json.dumps(obj).encode(), loads)
+
+
+class CatalogCache:
+    """Cache of Stripe products, prices and catalog listings.
+
+    Stored in the ``CACHE_BACKEND`` shared by every worker, for
+    ``CATALOG_CACHE_TTL`` seconds. Products and prices are keyed by their
+    Stripe id; full listings are keyed by the ``include_archived`` flag. Any
+    change to a product or price, whether made through this API or reported
+    by a ``product.*``/``price.*`` webhook, drops that object and every
+    cached listing.
+
+    All methods are coroutines, see ``Cache``.
+
+    Methods:
+        get_product(product_id: str) -> stripe.Product | None:
+            Return a cached product.
+        put_product(product: stripe.Product) -> None:
+            Cache a product.
+        get_price(price_id: str) -> stripe.Price | None:
+            Return a cached price.
+        put_price(price: stripe.Price) -> None:
+            Cache a price.
+        put_objects(products: Iterable[stripe.Product], prices: Iterable[stripe.Price]) -> None:
+            Cache many products and prices, one backend write for each kind.
+        get_listing(include_archived: bool) -> list[ProductResponse] | None:
+            Return a cached catalog listing.
+        get_listing_body(include_archived: bool) -> bytes | None:
+            Return a cached catalog listing as JSON.
+        get_listing_etag(include_archived: bool) -> str | None:
+            Return the ETag of a cached catalog listing.
+        filling_listing(include_archived: bool) -> AbstractAsyncContextManager:
+            Guard the fill of a listing being read from Stripe, see ``Cache.filling``.
+        invalidate_product(product_id: str) -> None:
+            Forget a product and every listing.
+        invalidate_price(price_id: str) -> None:
+            Forget a price and every listing.
+        invalidate_listings() -> None:
+            Forget every listing.
+    """
+
+    def __init__(self, ttl: float):
+        self._products = Cache("catalog.product", ttl, stripe_object_codec("Product"))
+        self._prices = Cache("catalog.price", ttl, stripe_object_codec("Price"))
+        self._listings = Cache("catalog.listing", ttl, model_codec(list[ProductResponse]), etags=True)
+
+    async def get_product(self, product_id: str) -> stripe.Product | None:
+        return await self._products.get(product_id)
+
+    async def put_product(self, product: stripe.Product) -> None:
+        await self._products.set(product.id, product)
+
+    async def get_price(self, price_id: str) -> stripe.Price | None:
+        return await self._prices.get(price_id)
+
+    async def put_price(self, price: stripe.Price) -> None:
+        await self._prices.set(price.id, price)
+
+    async def put_objects(
+        self,
+        products: Iterable[stripe.Product] = (),
+        prices: Iterable[stripe.Price] = (),
+    ) -> None:
+        await self._products.set_many({product.id: product for product in products})
+        await self._prices.set_many({price.id: price for price in prices})
+
+    async def get_listing(self, include_archived: bool) -> list[ProductResponse] | None:
+        return await self._listings.get(include_archived)
+
+    async def get_listing_body(self, include_archived: bool) -> bytes | None:
+        return await self._listings.get_encoded(include_archived)
+
+    async def get_listing_etag(self, include_archived: bool) -> str | None:
+        return await self._listings.get_etag(include_archived)
+
+    def filling_listing(self, include_archived: bool) -> AbstractAsyncContextManager:
+        return self._listings.filling(include_archived)
+
+    async def invalidate_product(self, product_id: str) -> None:
+        await self._products.delete(product_id)
+        await self.invalidate_listings()
+
+    async def invalidate_price(self, price_id: str) -> None:
+        await self._prices.delete(price_id)
+        await self.invalidate_listings()
+
+    async def clear(self) -> None:
+        for cache in (self._products, self._prices, self._listings):
+            await cache.clear()
+
+    def stats(self) -> dict[str, int]:
+        """Return hit, miss and error counters, summed over products, prices and listings."""
+        caches = (self._products, self._prices, self._listings)
+        return {
+            counter: sum(cache.stats()[counter] for cache in caches)
+            for counter in ("hits", "misses", "errors")
+        }
+
+    async def invalidate_listings(self) -> None:
+        await self._listings.delete(False, True)
+
+
+catalog_cache = CatalogCache(ttl=settings.CATALOG_CACHE_TTL)
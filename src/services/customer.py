@@ -1,62 +1,104 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections.abc import AsyncIterable, AsyncIterator
+from typing import TYPE_CHECKING
+
 from fastapi import HTTPException
-import stripe
-from src.core import settings
+from pydantic import ValidationError
+from src.core import ResponseMapper, get_stripe_client, settings, stripe_reads
 from src.schemas import (
     CustomerCreate,
     CustomerResponse
 )
+from src.services.customer_index import customer_index
+from src.services.response_cache import customer_cache
+from src.utils import iter_ndjson_lines, timed
+
+if TYPE_CHECKING:
+    import stripe
 
-stripe.api_key = settings.STRIPE_SECRET_KEY
+logger = logging.getLogger(__name__)
 
 class CustomerService:
     """Service for handling Stripe customer operations.
     
+    Every method is a coroutine that awaits the Stripe SDK's async API, so
+    a slow Stripe round trip never blocks the event loop. Lookups by user ID
+    go through the local ``customer_index`` first and only fall back to
+    Stripe Search on a miss (unless ``CUSTOMER_INDEX_FALLBACK_TO_SEARCH`` is off).
+    Retrieved customers are kept in ``customer_cache``, shared by every
+    worker, and concurrent retrievals of the same customer share one Stripe call.
+
     Methods:
-        create_customer(data: CustomerCreate) -> CustomerResponse:
+        create_customer_async(data: CustomerCreate) -> CustomerResponse:
             Create a customer in Stripe.
-        retrieve_customer(customer_id: str) -> CustomerResponse:
+        bulk_create_customers_async(lines: AsyncIterable[bytes]) -> AsyncIterator[dict]:
+            Create customers from an NDJSON stream.
+        retrieve_customer_async(customer_id: str) -> CustomerResponse:
             Retrieve a customer by ID.
-        get_customer_by_user_id(user_id: str) -> CustomerResponse:
+        get_customer_by_user_id_async(user_id: str) -> CustomerResponse:
             Retrieve a customer by user ID.
-        update_customer(customer_id: str, data: CustomerCreate) -> CustomerResponse:
+        update_customer_async(customer_id: str, data: CustomerCreate) -> CustomerResponse:
             Update a customer in Stripe.
-        delete_customer(customer_id: str) -> None:
+        delete_customer_async(customer_id: str) -> dict:
             Delete a customer in Stripe.
+        delete_by_user_id_async(user_id: str) -> dict:
+            Delete a customer by user ID.
+
+    Attributes:
+        mapper (ResponseMapper): Builds ``CustomerResponse`` from Stripe
+            objects.
     """
 
+    mapper = ResponseMapper(CustomerResponse)
+
     @staticmethod
-    def create_customer(data: CustomerCreate) -> CustomerResponse:
+    async def create_customer_async(
+        data: CustomerCreate,
+        timings: dict[str, float] | None = None,
+        idempotency_key: str | None = None
+    ) -> CustomerResponse:
         """Create a customer in Stripe.
 
+        A customer ``customer_index`` holds for the email or user ID is
+        retrieved from Stripe before it counts as a conflict. The email and
+        user ID duplicate checks against Stripe run concurrently and the first
+        conflict found cancels the other, so the happy path costs two Stripe
+        round trips instead of three.
+
         Args:
             data (CustomerCreate): The customer data to create.
+            timings (dict[str, float] | None): If given, receives the duration
+                in milliseconds of the ``index``, ``duplicate_check`` and
+                ``create`` phases.
+            idempotency_key (str | None): Forwarded to Stripe so a retried
+                request does not create a second customer.
 
         Returns:
             CustomerResponse: The created customer response.
         """
         try:
-            customers = stripe.Customer.list(
-                email=data.email,
-                limit=1
-            )
-            if customers.data:
-                raise HTTPException(
-                    status_code=409,
-                    detail="Customer with this email already exists."
-                )
+            with timed(timings, "index"):
+                conflict = await CustomerService._find_indexed_duplicate_async(data)
+            if conflict:
+                raise HTTPException(status_code=409, detail=conflict)
 
-            if data.metadata:
-                customers = stripe.Customer.search(
-                    query=f'metadata["user_id"]:"{data.metadata.user_id}"'
+            if settings.CUSTOMER_INDEX_FALLBACK_TO_SEARCH:
+                with timed(timings, "duplicate_check"):
+                    conflict = await CustomerService._find_duplicate_async(data)
+                if conflict:
+                    raise HTTPException(status_code=409, detail=conflict)
+
+            with timed(timings, "create"):
+                customer = await get_stripe_client().v1.customers.create_async(
+                    params=data.to_dict(),
+                    options={"idempotency_key": idempotency_key},
                 )
-                if customers.data:
-                    raise HTTPException(
-                        status_code=409,
-                        detail="Customer with this user ID already exists."
-                    )
-            customer = stripe.Customer.create(**data.to_dict())
-
-            return CustomerResponse.model_validate(customer, from_attributes=True)
+            customer_index.record(customer)
+
+            return CustomerService.mapper.map(customer)
         
         except HTTPException as http_exc:
             raise http_exc
@@ -67,28 +109,174 @@ class CustomerService:
                 status_code=500,
                 detail=f"Error creating customer: {str(e)}"
             )
+
+    @staticmethod
+    async def bulk_create_customers_async(
+        lines: AsyncIterable[bytes],
+        concurrency: int = settings.CUSTOMER_BULK_CONCURRENCY,
+        idempotency_key: str | None = None
+    ) -> AsyncIterator[dict]:
+        """Create customers from an NDJSON stream of ``CustomerCreate`` records.
+
+        At most ``concurrency`` records are in flight and the input is read
+        only as fast as they complete; the shared Stripe scheduler keeps the
+        calls within the rate limits. Results are yielded in completion order.
+
+        Records in flight together cannot see each other in Stripe or in the
+        local index, so a record sharing the email or ``metadata.user_id`` of
+        one still in flight is not dispatched and is reported as
+        ``duplicate``. Once a record finishes its keys are forgotten: a later
+        duplicate of it is found in the index and answered with a 409, so at
+        most ``concurrency`` records' keys are held.
+
+        Args:
+            lines (AsyncIterable[bytes]): The raw NDJSON stream.
+            concurrency (int): Maximum number of records created at once.
+            idempotency_key (str | None): If given, each record is created
+                with the key ``"{idempotency_key}:{line}"``.
+
+        Yields:
+            dict: Per record, its ``line`` and either ``status: "created"``
+            with the ``customer``, ``status: "duplicate"`` with the
+            ``duplicate_of`` line, or ``status: "error"`` with a
+            ``status_code`` and ``detail``.
+        """
+        in_flight_emails: dict[str, int] = {}
+        in_flight_user_ids: dict[str, int] = {}
+
+        async def create(line: int, data: CustomerCreate, user_id: str | None) -> dict:
+            try:
+                customer = await CustomerService.create_customer_async(
+                    data,
+                    idempotency_key=f"{idempotency_key}:{line}" if idempotency_key else None,
+                )
+                return {"line": line, "status": "created", "customer": customer.model_dump(mode="json")}
+            except HTTPException as e:
+                return {"line": line, "status": "error", "status_code": e.status_code, "detail": e.detail}
+            finally:
+                del in_flight_emails[data.email]
+                if user_id:
+                    del in_flight_user_ids[user_id]
+
+        pending: set[asyncio.Task] = set()
+        try:
+            async for line, raw in iter_ndjson_lines(lines):
+                try:
+                    data = CustomerCreate.model_validate_json(raw)
+                except ValidationError as e:
+                    detail = e.errors(include_url=False, include_context=False, include_input=False)
+                    yield {"line": line, "status": "error", "status_code": 422, "detail": detail}
+                    continue
+
+                user_id = data.metadata.user_id if data.metadata else None
+                first = in_flight_emails.get(data.email) or (in_flight_user_ids.get(user_id) if user_id else None)
+                if first is not None:
+                    yield {
+                        "line": line,
+                        "status": "duplicate",
+                        "duplicate_of": first,
+                        "detail": f"Same email or user ID as line {first}.",
+                    }
+                    continue
+                if len(pending) >= concurrency:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        yield task.result()
+                in_flight_emails[data.email] = line
+                if user_id:
+                    in_flight_user_ids[user_id] = line
+                pending.add(asyncio.create_task(create(line, data, user_id)))
+
+            for task in asyncio.as_completed(pending):
+                yield await task
+        finally:
+            for task in pending:
+                task.cancel()
+
+    @staticmethod
+    async def _find_duplicate_async(data: CustomerCreate) -> str | None:
+        """Check Stripe for an existing customer with the same email or user ID.
+
+        Both lookups run concurrently; as soon as one reports a conflict the
+        other is cancelled.
+
+        Args:
+            data (CustomerCreate): The customer about to be created.
+
+        Returns:
+            str | None: The conflict message, or None if there is no duplicate.
+        """
+        client = get_stripe_client()
+
+        async def email_taken() -> str | None:
+            customers = await client.v1.customers.list_async(
+                params={"email": data.email, "limit": 1}
+            )
+            if customers.data:
+                customer_index.record(customers.data[0])
+                return "Customer with this email already exists."
+            return None
+
+        async def user_id_taken() -> str | None:
+            customers = await client.v1.customers.search_async(
+                params={"query": f'metadata["user_id"]:"{data.metadata.user_id}"'}
+            )
+            if customers.data:
+                customer_index.record(customers.data[0])
+                return "Customer with this user ID already exists."
+            return None
+
+        checks = [asyncio.create_task(email_taken())]
+        if data.metadata:
+            checks.append(asyncio.create_task(user_id_taken()))
+        try:
+            for check in asyncio.as_completed(checks):
+                conflict = await check
+                if conflict:
+                    return conflict
+            return None
+        finally:
+            for check in checks:
+                check.cancel()
         
 
     @staticmethod
-    def retrieve_customer(customer_id: str) -> CustomerResponse:
+    async def retrieve_customer_async(customer_id: str) -> CustomerResponse:
         """Retrieve a customer by ID.
 
+        Answered from ``customer_cache`` when possible; on a miss, identical
+        concurrent retrievals are coalesced into one Stripe call through
+        ``stripe_reads``. The customer read is cached unless an update or
+        delete wrote the entry while it was in flight.
+
         Args:
             customer_id (str): The ID of the customer to retrieve.
 
         Returns:
             CustomerResponse: The retrieved customer response.
         """
+        async def retrieve() -> CustomerResponse:
+            async with customer_cache.filling(customer_id) as fill:
+                customer = await get_stripe_client().v1.customers.retrieve_async(customer_id)
+                response = CustomerService.mapper.map(customer)
+                await fill(response)
+            return response
+
         try:
-            customer = stripe.Customer.retrieve(customer_id)
-            return CustomerResponse.model_validate(customer, from_attributes=True)
+            cached = await customer_cache.get(customer_id)
+            if cached is not None:
+                return cached
+            return await stripe_reads.do("customer", customer_id, retrieve)
         except Exception as e:
             raise Exception(f"Error retrieving customer: {str(e)}")
         
     @staticmethod
-    def get_customer_by_user_id(user_id: str) -> CustomerResponse:
+    async def get_customer_by_user_id_async(user_id: str) -> CustomerResponse:
         """Retrieve a customer by user ID.
 
+        A user found in ``customer_index`` is answered from ``customer_cache``
+        when the customer is cached, and otherwise cached once retrieved.
+
         Args:
             user_id (str): The user ID to search for.
 
@@ -96,11 +284,22 @@ class CustomerService:
             CustomerResponse: The retrieved customer response.
         """
         try:
-            customers = stripe.Customer.search(
-                query=f'metadata["user_id"]:"{user_id}"'
-            )
-            if customers.data:
-                return CustomerResponse.model_validate(customers.data[0], from_attributes=True)
+            customer_id = customer_index.find_by_user_id(user_id)
+            if customer_id is None:
+                customer = await CustomerService._search_by_user_id_async(user_id)
+                if customer is not None:
+                    return CustomerService.mapper.map(customer)
+            else:
+                cached = await customer_cache.get(customer_id)
+                if cached is not None:
+                    return cached
+                async with customer_cache.filling(customer_id) as fill:
+                    customer = await CustomerService._find_by_user_id_async(user_id, customer_id)
+                    if customer is not None:
+                        response = CustomerService.mapper.map(customer)
+                        if customer.id == customer_id:
+                            await fill(response)
+                        return response
             raise HTTPException(
                 status_code=404,
                 detail="Customer not found for the provided user ID."
@@ -110,7 +309,7 @@ class CustomerService:
         
 
     @staticmethod
-    def update_customer(customer_id: str, data: CustomerCreate) -> CustomerResponse:
+    async def update_customer_async(customer_id: str, data: CustomerCreate) -> CustomerResponse:
         """Update a customer in Stripe.
 
         Args:
@@ -121,14 +320,20 @@ class CustomerService:
             CustomerResponse: The updated customer response.
         """
         try:
-            customer = stripe.Customer.modify(customer_id, **data.to_dict())
-            return CustomerResponse.model_validate(customer, from_attributes=True)
+            stripe_reads.forget("customer", customer_id)
+            customer = await get_stripe_client().v1.customers.update_async(
+                customer_id, params=data.to_dict()
+            )
+            customer_index.record(customer)
+            response = CustomerService.mapper.map(customer)
+            await customer_cache.set(customer_id, response)
+            return response
         except Exception as e:
             raise Exception(f"Error updating customer: {str(e)}")
         
 
     @staticmethod
-    def delete_customer(customer_id: str) -> dict:
+    async def delete_customer_async(customer_id: str) -> dict:
         """Delete a customer in Stripe.
 
         Args:
@@ -138,7 +343,10 @@ class CustomerService:
             None: If the deletion is successful.
         """
         try:
-            customer = stripe.Customer.delete(customer_id)
+            stripe_reads.forget("customer", customer_id)
+            customer = await get_stripe_client().v1.customers.delete_async(customer_id)
+            customer_index.forget(customer_id)
+            await customer_cache.delete(customer_id)
 
             return {
                 'id': customer.id,
@@ -147,14 +355,14 @@ class CustomerService:
             }
 
         except Exception as e:
-            print(f"Error deleting customer: {str(e)}")
+            logger.warning("Error deleting customer %s: %s", customer_id, e)
             raise HTTPException(
                 status_code=404,
                 detail="User not found"
             )
     
     @staticmethod
-    def delete_by_user_id(user_id: str) -> dict:
+    async def delete_by_user_id_async(user_id: str) -> dict:
         """Delete a customer by user ID.
 
         Args:
@@ -163,20 +371,34 @@ class CustomerService:
         Returns:
             dict: A dictionary containing the deletion status and message.
         """
+        import stripe
+
         try:
-            customers = stripe.Customer.search(
-                query=f'metadata["user_id"]:"{user_id}"'
-            )
-            if not customers.data:
+            customer_id = customer_index.find_by_user_id(user_id)
+            if customer_id is None:
+                customer = await CustomerService._search_by_user_id_async(user_id)
+                customer_id = customer.id if customer else None
+            if customer_id is None:
+                raise HTTPException(
+                    status_code=404,
+                    detail="Customer not found for the provided user ID."
+                )
+            try:
+                await get_stripe_client().v1.customers.delete_async(customer_id)
+            except stripe.InvalidRequestError as e:
+                if e.http_status != 404:
+                    raise
+                customer_index.forget(customer_id)
+                await customer_cache.delete(customer_id)
                 raise HTTPException(
                     status_code=404,
                     detail="Customer not found for the provided user ID."
                 )
-            customer = customers.data[0]
-            stripe.Customer.delete(customer.id)
+            customer_index.forget(customer_id)
+            await customer_cache.delete(customer_id)
 
             return {
-                'id': customer.id,
+                'id': customer_id,
                 'deleted': True,
                 'message': 'Customer successfully deleted'
             }
@@ -188,4 +410,96 @@ class CustomerService:
             raise HTTPException(
                 status_code=500,
                 detail=f"Error deleting customer by user ID: {str(e)}"
-            )
\ No newline at end of file
+            )
+
+    @staticmethod
+    async def _find_indexed_duplicate_async(data: CustomerCreate) -> str | None:
+        """Check ``customer_index`` for a customer holding ``data``'s email or user ID.
+
+        Indexed customers are retrieved from Stripe first: the entry of one
+        that no longer exists is dropped, and the entry of one whose email or
+        user ID changed since it was indexed is refreshed, so neither is
+        reported as a conflict.
+
+        Args:
+            data (CustomerCreate): The customer about to be created.
+
+        Returns:
+            str | None: The conflict, or None if the index holds none.
+        """
+        customer_id = customer_index.find_by_email(data.email)
+        if customer_id is not None:
+            customer = await CustomerService._retrieve_indexed_async(customer_id)
+            if customer is not None:
+                if customer.get("email") == data.email:
+                    return "Customer with this email already exists."
+                customer_index.record(customer)
+
+        if data.metadata:
+            customer_id = customer_index.find_by_user_id(data.metadata.user_id)
+            if customer_id is not None:
+                customer = await CustomerService._retrieve_indexed_async(customer_id)
+                if customer is not None:
+                    if (customer.get("metadata") or {}).get("user_id") == data.metadata.user_id:
+                        return "Customer with this user ID already exists."
+                    customer_index.record(customer)
+        return None
+
+    @staticmethod
+    async def _retrieve_indexed_async(customer_id: str) -> stripe.Customer | None:
+        """Retrieve a customer found in ``customer_index``.
+
+        Returns None for a customer that no longer exists, after dropping its
+        index entry and cached response.
+        """
+        import stripe
+
+        try:
+            customer = await get_stripe_client().v1.customers.retrieve_async(customer_id)
+        except stripe.InvalidRequestError as e:
+            if e.http_status != 404:
+                raise
+            customer = None
+        if customer is not None and not customer.get("deleted"):
+            return customer
+        customer_index.forget(customer_id)
+        await customer_cache.delete(customer_id)
+        return None
+
+    @staticmethod
+    async def _find_by_user_id_async(user_id: str, customer_id: str) -> stripe.Customer | None:
+        """Resolve a user's customer from its ``customer_index`` entry.
+
+        The indexed customer costs one ``Customer.retrieve``; an entry for a
+        customer that no longer exists is dropped and the user is searched.
+
+        Args:
+            user_id (str): The user ID to look up.
+            customer_id (str): The customer ID the index holds for the user.
+
+        Returns:
+            stripe.Customer | None: The customer, or None if there is none.
+        """
+        customer = await CustomerService._retrieve_indexed_async(customer_id)
+        if customer is not None:
+            return customer
+
+        return await CustomerService._search_by_user_id_async(user_id)
+
+    @staticmethod
+    async def _search_by_user_id_async(user_id: str) -> stripe.Customer | None:
+        """Find a user's customer through Stripe Search and index the result.
+
+        Returns None without calling Stripe when
+        ``CUSTOMER_INDEX_FALLBACK_TO_SEARCH`` is off.
+        """
+        if not settings.CUSTOMER_INDEX_FALLBACK_TO_SEARCH:
+            return None
+
+        customers = await get_stripe_client().v1.customers.search_async(
+            params={"query": f'metadata["user_id"]:"{user_id}"'}
+        )
+        if not customers.data:
+            return None
+        customer_index.record(customers.data[0])
+        return customers.data[0]
@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+import asyncio
+import sqlite3
+import threading
+import time
+from typing import TYPE_CHECKING
+
+from src.core import get_stripe_client, settings
+from src.core.database import connect
+
+if TYPE_CHECKING:
+    import stripe
+
+
+class CustomerIndex:
+    """Persistent local index from user_id and email to Stripe customer id.
+
+    Stripe Search is slow, rate limited and eventually consistent, so a
+    customer created a moment ago may not be found through it. The index is
+    written on every create, update and delete made through the API and on
+    ``customer.*`` webhooks, which lets lookups resolve with a single
+    ``Customer.retrieve`` or without calling Stripe at all.
+
+    Methods:
+        find_by_user_id(user_id: str) -> str | None:
+            Return the customer id recorded for a user.
+        find_by_email(email: str) -> str | None:
+            Return the customer id recorded for an email.
+        record(customer: stripe.Customer) -> None:
+            Insert or refresh a customer's entry.
+        forget(customer_id: str) -> None:
+            Remove a customer's entry.
+        stats() -> dict[str, int]:
+            Return lookup hit and miss counters.
+    """
+
+    def __init__(self, path: str | None = None):
+        self._path = path
+        self._connection: sqlite3.Connection | None = None
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        if self._connection is None:
+            with self._lock:
+                if self._connection is None:
+                    connection = connect(self._path)
+                    connection.executescript(
+                        """
+                        CREATE TABLE IF NOT EXISTS customer_index (
+                            customer_id TEXT PRIMARY KEY,
+                            user_id TEXT,
+                            email TEXT,
+                            updated_at REAL NOT NULL
+                        );
+                        CREATE INDEX IF NOT EXISTS customer_index_user_id
+                            ON customer_index (user_id);
+                        CREATE INDEX IF NOT EXISTS customer_index_email
+                            ON customer_index (email);
+                        """
+                    )
+                    self._connection = connection
+        return self._connection
+
+    def find_by_user_id(self, user_id: str) -> str | None:
+        return self._find("user_id", user_id)
+
+    def find_by_email(self, email: str) -> str | None:
+        return self._find("email", email)
+
+    def record(self, customer: stripe.Customer) -> None:
+        """
+        Insert or refresh the entry for ``customer``.
+
+        Args:
+            customer (stripe.Customer): A customer object or webhook payload.
+        """
+        metadata = customer.get("metadata") or {}
+        with self._lock:
+            self.connection.execute(
+                """
+                INSERT INTO customer_index (customer_id, user_id, email, updated_at)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT (customer_id) DO UPDATE SET
+                    user_id = excluded.user_id,
+                    email = excluded.email,
+                    updated_at = excluded.updated_at
+                """,
+                (customer["id"], metadata.get("user_id"), customer.get("email"), time.time()),
+            )
+
+    def forget(self, customer_id: str) -> None:
+        with self._lock:
+            self.connection.execute(
+                "DELETE FROM customer_index WHERE customer_id = ?", (customer_id,)
+            )
+
+    def _find(self, column: str, value: str) -> str | None:
+        with self._lock:
+            row = self.connection.execute(
+                f"SELECT customer_id FROM customer_index WHERE {column} = ? "
+                "ORDER BY updated_at DESC LIMIT 1",
+                (value,),
+            ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return row[0]
+
+    def stats(self) -> dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses}
+
+
+customer_index = CustomerIndex()
+
+
+async def backfill_customer_index(index: CustomerIndex = customer_index) -> int:
+    """
+    Record every existing Stripe customer in the index.
+
+    Run once before turning ``CUSTOMER_INDEX_FALLBACK_TO_SEARCH`` off, so
+    customers created before the index existed are found locally.
+
+    Returns:
+        int: The number of customers recorded.
+    """
+    page = await get_stripe_client().v1.customers.list_async(params={"limit": 100})
+    count = 0
+    async for customer in page.auto_paging_iter():
+        index.record(customer)
+        count += 1
+    return count
+
+
+if __name__ == "__main__":
+    recorded = asyncio.run(backfill_customer_index())
+    print(f"Indexed {recorded} customers into {settings.LOCAL_DB_PATH}")
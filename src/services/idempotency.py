@@ -0,0 +1,83 @@
+import hashlib
+
+from fastapi import HTTPException, Response
+from pydantic import BaseModel
+from src.core import Cache, model_codec, settings
+
+
+class IdempotencyCache:
+    """Replay cache for POST requests carrying an ``Idempotency-Key``.
+
+    The key is also forwarded to Stripe, which deduplicates the create call
+    on its side for 24 hours; this cache additionally lets a client retry be
+    answered with the stored JSON body without any Stripe round trip. Entries
+    are scoped per endpoint and remember a fingerprint of the request body so
+    a key reused with different parameters is rejected, as Stripe does.
+
+    Responses live in the shared ``CACHE_BACKEND``, so a retry is replayed
+    whichever worker it reaches, instead of going on to the duplicate checks
+    and answering 409 for the customer its first attempt created.
+
+    Methods:
+        replay(scope: str, key: str | None, request: BaseModel) -> Response | None:
+            Return the stored response for a retried request.
+        store(scope: str, key: str | None, request: BaseModel, response: BaseModel) -> None:
+            Remember the response to a request.
+    """
+
+    def __init__(self, ttl: float):
+        self._entries = Cache("idempotency", ttl=ttl, codec=model_codec(tuple[str, str]))
+
+    async def replay(self, scope: str, key: str | None, request: BaseModel) -> Response | None:
+        """
+        Look up a previous response for ``key``.
+
+        Args:
+            scope (str): The endpoint the key belongs to.
+            key (str | None): The client's idempotency key, if any.
+            request (BaseModel): The parsed request body.
+
+        Returns:
+            Response | None: The stored JSON response, or None if the request
+            has not been answered yet.
+
+        Raises:
+            HTTPException: 400 if the key was used with a different body.
+        """
+        if not key:
+            return None
+        entry = await self._entries.get(f"{scope}:{key}")
+        if entry is None:
+            return None
+
+        fingerprint, body = entry
+        if fingerprint != self._fingerprint(request):
+            raise HTTPException(
+                status_code=400,
+                detail="Keys for idempotent requests can only be used with the same parameters."
+            )
+        return Response(
+            content=body,
+            media_type="application/json",
+            headers={"Idempotent-Replayed": "true"},
+        )
+
+    async def store(self, scope: str, key: str | None, request: BaseModel, response: BaseModel) -> None:
+        if key:
+            await self._entries.set(
+                f"{scope}:{key}", (self._fingerprint(request), response.model_dump_json())
+            )
+
+    async def clear(self) -> None:
+        await self._entries.clear()
+
+    def stats(self) -> dict[str, int]:
+        """Return this process' hit, miss and error counters."""
+        return self._entries.stats()
+
+    @staticmethod
+    def _fingerprint(request: BaseModel) -> str:
+        return hashlib.sha256(request.model_dump_json().encode()).hexdigest()
+
+
+idempotency_cache = IdempotencyCache(ttl=settings.IDEMPOTENCY_CACHE_TTL)
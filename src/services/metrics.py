@@ -0,0 +1,216 @@
+import asyncio
+import logging
+import os
+import threading
+from collections.abc import Callable, Iterator
+
+from prometheus_client import Gauge
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily, Metric
+from prometheus_client.registry import Collector
+
+from src.core import get_cache_backend, settings, stripe_reads, stripe_scheduler
+from src.core.metrics import registry
+from src.services.catalog import catalog_cache
+from src.services.customer_index import customer_index
+from src.services.idempotency import idempotency_cache
+from src.services.response_cache import customer_cache, subscription_cache
+from src.services.subscription_mirror import subscription_mirror
+from src.services.webhook_dedup import webhook_dedup
+from src.services.webhook_queue import webhook_queue
+
+logger = logging.getLogger(__name__)
+
+CACHES: dict[str, Callable[[], dict[str, int]]] = {
+    "catalog": catalog_cache.stats,
+    "customer": customer_cache.stats,
+    "user_subscriptions": subscription_cache.stats,
+    "idempotency": idempotency_cache.stats,
+    "customer_index": customer_index.stats,
+    "subscription_mirror": subscription_mirror.stats,
+}
+
+
+class StatsCollector(Collector):
+    """Exposes the counters kept by the app's caches, queues and scheduler.
+
+    They already count in process, so instead of instrumenting every call
+    site their ``stats()`` are read when Prometheus scrapes.
+
+    Metrics:
+        cache_lookups_total{cache, result}: Hits and misses per cache.
+        cache_entries{cache}, cache_evictions_total{cache}: For in-memory caches.
+        cache_errors_total{cache}: Lookups and writes the cache backend failed.
+        cache_backend_entries{backend}, cache_backend_evictions_total{backend}:
+            For the shared cache backend, when it can count them.
+        stripe_scheduler_*{kind}: ``stripe_scheduler.stats()`` per bucket.
+        stripe_coalesced_reads_total{read, result}: Reads that made or shared a call.
+        webhook_events_received_total{result}: Accepted and duplicate deliveries.
+        webhook_queue_events{status}: Queued events per status.
+    """
+
+    def collect(self) -> Iterator[Metric]:
+        lookups = CounterMetricFamily(
+            "cache_lookups", "Cache lookups by result.", labels=["cache", "result"]
+        )
+        entries = GaugeMetricFamily("cache_entries", "Entries held by a cache.", labels=["cache"])
+        evictions = CounterMetricFamily(
+            "cache_evictions", "Entries evicted to make room.", labels=["cache"]
+        )
+        errors = CounterMetricFamily(
+            "cache_errors", "Cache operations the backend failed.", labels=["cache"]
+        )
+        for name, read in CACHES.items():
+            stats = read()
+            lookups.add_metric([name, "hit"], stats["hits"])
+            lookups.add_metric([name, "miss"], stats["misses"])
+            if "size" in stats:
+                entries.add_metric([name], stats["size"])
+                evictions.add_metric([name], stats["evictions"])
+            if "errors" in stats:
+                errors.add_metric([name], stats["errors"])
+        yield from (lookups, entries, evictions, errors)
+
+        backend = get_cache_backend()
+        backend_stats = backend.stats()
+        if backend_stats:
+            backend_entries = GaugeMetricFamily(
+                "cache_backend_entries", "Entries held by the cache backend.", labels=["backend"]
+            )
+            backend_entries.add_metric([backend.name], backend_stats["size"])
+            backend_evictions = CounterMetricFamily(
+                "cache_backend_evictions", "Entries the cache backend evicted to make room.", labels=["backend"]
+            )
+            backend_evictions.add_metric([backend.name], backend_stats["evictions"])
+            yield from (backend_entries, backend_evictions)
+
+        scheduler = stripe_scheduler.stats()
+        queued = GaugeMetricFamily(
+            "stripe_scheduler_queued", "Stripe calls waiting for a rate-limit slot.", labels=["kind"]
+        )
+        max_queued = GaugeMetricFamily(
+            "stripe_scheduler_max_queued", "Peak of stripe_scheduler_queued.", labels=["kind"]
+        )
+        for kind, counters in scheduler.items():
+            queued.add_metric([kind], counters["queued"])
+            max_queued.add_metric([kind], counters["max_queued"])
+        yield from (queued, max_queued)
+        for counter, help_text in (
+            ("acquired", "Rate-limit slots handed out."),
+            ("waited", "Stripe calls that had to wait for a slot."),
+            ("timeouts", "Stripe calls failed because no slot came up before the deadline."),
+            ("throttled", "429 responses that paused a bucket."),
+        ):
+            family = CounterMetricFamily(f"stripe_scheduler_{counter}", help_text, labels=["kind"])
+            for kind, counters in scheduler.items():
+                family.add_metric([kind], counters[counter])
+            yield family
+
+        coalesced = CounterMetricFamily(
+            "stripe_coalesced_reads",
+            "Reads that made a Stripe call (call) or joined an identical one in flight (shared).",
+            labels=["read", "result"],
+        )
+        for read, counts in stripe_reads.stats().items():
+            coalesced.add_metric([read, "call"], counts["calls"])
+            coalesced.add_metric([read, "shared"], counts["shared"])
+        yield coalesced
+
+        dedup = webhook_dedup.stats()
+        received = CounterMetricFamily(
+            "webhook_events_received", "Webhook deliveries by outcome.", labels=["result"]
+        )
+        received.add_metric(["accepted"], dedup["accepted"])
+        received.add_metric(["duplicate_in_memory"], dedup["duplicates_in_memory"])
+        received.add_metric(["duplicate_in_store"], dedup["duplicates_in_store"])
+        yield received
+
+        events = GaugeMetricFamily("webhook_queue_events", "Queued webhook events by status.", labels=["status"])
+        for status, count in webhook_queue.counts().items():
+            events.add_metric([status], count)
+        yield events
+
+
+class StatsPublisher:
+    """Copies a ``StatsCollector`` into gauges shared by every worker.
+
+    With several workers a scrape is answered by one of them, whose
+    collector only holds its own counters. When ``PROMETHEUS_MULTIPROC_DIR``
+    is set, each worker writes its samples to multiprocess gauges of the
+    same names every ``interval`` seconds, on the scrapes it answers and
+    when it stops, and ``MultiProcessCollector`` combines the workers'
+    files: counters are summed over every worker that ever ran, so they
+    never go back; per-worker gauges are summed over the live workers;
+    ``stripe_scheduler_max_queued`` is the highest peak; gauges read from
+    storage all workers share, such as the webhook queue, keep the most
+    recent reading.
+
+    Methods:
+        publish() -> None:
+            Write this worker's current samples.
+        start() -> None:
+            Publish every ``interval`` seconds, if enabled.
+        stop() -> None:
+            Stop publishing, after a last ``publish``.
+
+    Attributes:
+        enabled (bool): Whether the app runs with several workers.
+    """
+
+    def __init__(self, collector: Collector, interval: float = settings.METRICS_PUBLISH_INTERVAL):
+        self.collector = collector
+        self.interval = interval
+        self.enabled = "PROMETHEUS_MULTIPROC_DIR" in os.environ
+        self._gauges: dict[str, Gauge] = {}
+        self._lock = threading.Lock()
+        self._task: asyncio.Task | None = None
+
+    def publish(self) -> None:
+        with self._lock:
+            for family in self.collector.collect():
+                for sample in family.samples:
+                    gauge = self._gauge(family, sample.name, tuple(sample.labels))
+                    (gauge.labels(**sample.labels) if sample.labels else gauge).set(sample.value)
+
+    def start(self) -> None:
+        if self.enabled and self._task is None:
+            self._task = asyncio.create_task(self._run(), name="stats-publisher")
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        await asyncio.to_thread(self.publish)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await asyncio.to_thread(self.publish)
+            except Exception:
+                logger.exception("Error publishing stats metrics")
+
+    def _gauge(self, family: Metric, name: str, labels: tuple[str, ...]) -> Gauge:
+        gauge = self._gauges.get(name)
+        if gauge is None:
+            gauge = Gauge(name, family.documentation, labels, registry=None, multiprocess_mode=self._mode(family))
+            self._gauges[name] = gauge
+        return gauge
+
+    @staticmethod
+    def _mode(family: Metric) -> str:
+        if family.type == "counter":
+            return "sum"
+        if family.name == "stripe_scheduler_max_queued":
+            return "max"
+        if family.name == "webhook_queue_events" or (
+            family.name == "cache_backend_entries" and get_cache_backend().name != "memory"
+        ):
+            return "mostrecent"
+        return "livesum"
+
+
+stats_collector = StatsCollector()
+registry.register(stats_collector)
+stats_publisher = StatsPublisher(stats_collector)
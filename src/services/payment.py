@@ -1,68 +1,94 @@
-import stripe
+from __future__ import annotations
+
+from collections.abc import AsyncIterator
+
 from src.schemas.payment import (
     CancelPaymentIntentResponse, 
     PaymentIntentCreate, 
     PaymentIntentResponse
 )
-from src.core import settings
-
-# Configurar Stripe
-stripe.api_key = settings.STRIPE_SECRET_KEY
+from src.core import ResponseMapper, get_stripe_client, stripe_reads
 
 class PaymentService:
     """Service for handling Stripe payment operations.
+
+    All methods are coroutines backed by the Stripe SDK's async API.
+    Concurrent retrievals of the same payment intent share one Stripe call.
     
     Methods:
-        create_payment_intent(data: PaymentIntentCreate) -> PaymentIntentResponse:
+        create_payment_intent_async(data: PaymentIntentCreate) -> PaymentIntentResponse:
             Create a payment intent with Stripe.
         
-        retrieve_payment_intent(payment_intent_id: str) -> PaymentIntentResponse:
+        retrieve_payment_intent_async(payment_intent_id: str) -> PaymentIntentResponse:
             Retrieve a payment intent by ID.
         
-        get_payment_intent_by_user_id(user_id: str, limit: int = 1) -> PaymentIntentResponse:
+        get_payment_intent_by_user_id_async(user_id: str, limit: int = 1) -> PaymentIntentResponse:
             Retrieve a payment intent by user ID.
         
-        cancel_payment_intent(payment_intent_id: str) -> CancelPaymentIntentResponse:
+        stream_payment_intents_by_user_id_async(user_id: str) -> AsyncIterator[PaymentIntentResponse]:
+            Yield every payment intent of a user, page by page.
+        
+        cancel_payment_intent_async(payment_intent_id: str) -> CancelPaymentIntentResponse:
             Cancel a payment intent.
+
+    Attributes:
+        mapper (ResponseMapper): Builds ``PaymentIntentResponse`` from Stripe
+            objects.
     """
+
+    mapper = ResponseMapper(PaymentIntentResponse)
     
     @staticmethod
-    def create_payment_intent(data: PaymentIntentCreate) -> PaymentIntentResponse:
+    async def create_payment_intent_async(
+        data: PaymentIntentCreate,
+        idempotency_key: str | None = None
+    ) -> PaymentIntentResponse:
         """Create a payment intent with Stripe.
         
         Args:
             data (PaymentIntentCreate): The data for creating a payment intent.
+            idempotency_key (str | None): Forwarded to Stripe so a retried
+                request does not create a second payment intent.
 
         Returns:
             PaymentIntentResponse: The response object containing payment intent.
         """
         try:
-            intent = stripe.PaymentIntent.create(
-                **data.to_dict(),
+            intent = await get_stripe_client().v1.payment_intents.create_async(
+                params=data.to_dict(),
+                options={"idempotency_key": idempotency_key},
             )
             intent.created
-            return PaymentIntentResponse.model_validate(intent, from_attributes=True)
+            return PaymentService.mapper.map(intent)
         except Exception as e:
             # Non-Stripe error
             raise Exception(f"Unexpected error: {str(e)}")
     
     @staticmethod
-    def retrieve_payment_intent(payment_intent_id: str) -> PaymentIntentResponse:
+    async def retrieve_payment_intent_async(payment_intent_id: str) -> PaymentIntentResponse:
         """Retrieve a payment intent by ID.
+
+        Identical concurrent retrievals are coalesced into one Stripe call
+        through ``stripe_reads``.
         
         Args:
             payment_intent_id (str): The ID of the payment intent to retrieve.
         Returns:
             PaymentIntentResponse: The payment intent response object.
         """
+        async def retrieve() -> PaymentIntentResponse:
+            intent = await get_stripe_client().v1.payment_intents.retrieve_async(
+                payment_intent_id
+            )
+            return PaymentService.mapper.map(intent)
+
         try:
-            intent = stripe.PaymentIntent.retrieve(payment_intent_id)
-            return PaymentIntentResponse.model_validate(intent, from_attributes=True)
+            return await stripe_reads.do("payment_intent", payment_intent_id, retrieve)
         except Exception as e:
             raise Exception(f"Error retrieving payment intent: {str(e)}")
         
     @staticmethod
-    def get_payment_intent_by_user_id(
+    async def get_payment_intent_by_user_id_async(
             user_id: str, 
             limit: int = 1
         ) -> PaymentIntentResponse:
@@ -77,21 +103,47 @@ class PaymentService:
         """
         try:
             # Assuming metadata contains user_id
-            result = stripe.PaymentIntent.search(
-                limit=limit,
-                query=f'metadata["user_id"]:"{user_id}"',
+            result = await get_stripe_client().v1.payment_intents.search_async(
+                params={
+                    "limit": limit,
+                    "query": f'metadata["user_id"]:"{user_id}"',
+                }
             )
             
-            return [
-                PaymentIntentResponse.model_validate(intent, from_attributes=True)
-                for intent in result.data
-            ]
+            return PaymentService.mapper.map_many(result.data)
             
         except Exception as e:
             raise Exception(f"Error retrieving payment intent by user ID: {str(e)}")
     
     @staticmethod
-    def cancel_payment_intent(payment_intent_id: str) -> CancelPaymentIntentResponse:
+    async def stream_payment_intents_by_user_id_async(
+            user_id: str,
+            page_size: int = 100
+        ) -> AsyncIterator[PaymentIntentResponse]:
+        """Yield every payment intent of a user.
+
+        Search pages are requested lazily, following ``next_page`` only once
+        the previous page has been consumed, so the first result is available
+        after one round trip and at most one page is held in memory.
+
+        Args:
+            user_id (str): The ID of the user to filter payment intents.
+            page_size (int): Results requested per search page (max 100).
+
+        Yields:
+            PaymentIntentResponse: The user's payment intents, newest first.
+        """
+        page = await get_stripe_client().v1.payment_intents.search_async(
+            params={
+                "limit": page_size,
+                "query": f'metadata["user_id"]:"{user_id}"',
+            }
+        )
+        async for intent in page.auto_paging_iter():
+            yield PaymentService.mapper.map(intent)
+
+    @staticmethod
+    async def cancel_payment_intent_async(payment_intent_id: str) -> CancelPaymentIntentResponse:
         """Cancel a payment intent.
         
         Args:
@@ -100,8 +152,13 @@ class PaymentService:
         Returns:
             CancelPaymentIntentResponse: The response object containing cancellation details.
         """
+        import stripe
+
         try:
-            intent = stripe.PaymentIntent.cancel(payment_intent_id)
+            stripe_reads.forget("payment_intent", payment_intent_id)
+            intent = await get_stripe_client().v1.payment_intents.cancel_async(
+                payment_intent_id
+            )
             data = {
                 'id': intent.id,
                 'status': intent.status,
@@ -1,5 +1,10 @@
-import stripe
-from src.core import settings
+from __future__ import annotations
+
+import asyncio
+from collections import defaultdict
+from typing import TYPE_CHECKING
+
+from src.core import get_stripe_client
 from src.schemas import (
     ProductCreate,
     ProductResponse,
@@ -7,14 +12,18 @@ from src.schemas import (
     PriceResponse
 )
 from src.schemas.product import Recurring
+from src.services.catalog import catalog_cache
+
+if TYPE_CHECKING:
+    import stripe
 
-stripe.api_key = settings.STRIPE_SECRET_KEY
+CATALOG_PAGE_SIZE = 100
 
 
 class ProductService:
 
     @staticmethod
-    def create_product(data: ProductCreate) -> ProductResponse:
+    async def create_product_async(data: ProductCreate) -> ProductResponse:
         """Create a product in Stripe.
         
         Args:
@@ -24,17 +33,21 @@ class ProductService:
             ProductResponse: The created product response.
         """
         try:
-            product = stripe.Product.create(
-                name=data.name,
-                description=data.description,
-                metadata=data.metadata or {}
+            product = await get_stripe_client().v1.products.create_async(
+                params={
+                    "name": data.name,
+                    "description": data.description,
+                    "metadata": data.metadata or {},
+                }
             )
+            await catalog_cache.put_product(product)
+            await catalog_cache.invalidate_listings()
             return ProductResponse.model_validate(product, from_attributes=True)
         except Exception as e:
             raise Exception(f"Error creating product: {str(e)}")
         
     @staticmethod
-    def delete_product(product_id: str) -> None:
+    async def delete_product_async(product_id: str) -> None:
         """Delete a product by its ID.
         
         Args:
@@ -44,12 +57,19 @@ class ProductService:
             None
         """
         # Primeiro, arquivar todos os preços ativos do produto
-        prices = stripe.Price.list(product=product_id, active=True)
+        client = get_stripe_client()
+        prices = await client.v1.prices.list_async(
+            params={"product": product_id, "active": True}
+        )
         for price in prices.data:
-            stripe.Price.modify(price.id, active=False)
+            await client.v1.prices.update_async(price.id, params={"active": False})
+            await catalog_cache.invalidate_price(price.id)
         
         # Depois, arquivar o produto
-        product = stripe.Product.modify(product_id, active=False)
+        product = await client.v1.products.update_async(
+            product_id, params={"active": False}
+        )
+        await catalog_cache.invalidate_product(product_id)
         
         return {
             'id': product.id,
@@ -60,7 +80,7 @@ class ProductService:
         }
     
     @staticmethod
-    def create_price(data: PriceCreate) -> PriceResponse:
+    async def create_price_async(data: PriceCreate) -> PriceResponse:
         """Create a price for a product.
         
         Args:
@@ -70,20 +90,29 @@ class ProductService:
             PriceResponse: The created price response.
         """
         try:
-            price = stripe.Price.create(
-                product=data.product_id,
-                unit_amount=data.unit_amount,
-                currency=data.currency,
-                recurring=data.recurring.to_dict(),
-                expand=['product']
+            product = await catalog_cache.get_product(data.product_id)
+            price = await get_stripe_client().v1.prices.create_async(
+                params={
+                    "product": data.product_id,
+                    "unit_amount": data.unit_amount,
+                    "currency": data.currency,
+                    "recurring": data.recurring.to_dict(),
+                    # Only pay for the expanded product when it is not cached
+                    "expand": [] if product else ['product'],
+                }
             )
-            return ProductService.map_price_to_response(price)
+            if product is None:
+                product = price.product
+                await catalog_cache.put_product(product)
+            await catalog_cache.invalidate_listings()
+            await catalog_cache.put_price(price)
+            return ProductService.map_price_to_response(price, product)
             
         except Exception as e:
             raise Exception(f"Error creating price: {str(e)}")
         
     @staticmethod
-    def delete_price(price_id: str) -> dict:
+    async def delete_price_async(price_id: str) -> dict:
         """Delete a price by its ID.
         
         Args:
@@ -92,7 +121,10 @@ class ProductService:
         Returns:
             None
         """
-        price = stripe.Price.modify(price_id, active=False)
+        price = await get_stripe_client().v1.prices.update_async(
+            price_id, params={"active": False}
+        )
+        await catalog_cache.invalidate_price(price_id)
         
         return {
             'id': price.id,
@@ -103,20 +135,94 @@ class ProductService:
     
 
     @staticmethod
-    def map_price_to_response(price: stripe.Price) -> PriceResponse:
+    async def list_products_async(include_archived: bool = False) -> list[ProductResponse]:
+        """list all products with their prices.
+
+        The catalog is assembled from one auto-paginated ``Product.list`` and
+        one auto-paginated ``Price.list``, drained concurrently and grouped
+        locally, so the number of Stripe calls grows with the number of pages
+        rather than with the number of products. The result is served from
+        ``catalog_cache`` until its TTL expires or a product or price changes;
+        a listing read while one changed is returned but not cached.
+
+        Args:
+            include_archived (bool): Whether to include archived products.
+
+        Returns:
+            list[ProductResponse]: A list of products with their prices.
+        """
+        cached = await catalog_cache.get_listing(include_archived)
+        if cached is not None:
+            return cached
+
+        try:
+            client = get_stripe_client()
+            product_params = {"limit": CATALOG_PAGE_SIZE}
+            if not include_archived:
+                product_params["active"] = True
+
+            async with catalog_cache.filling_listing(include_archived) as fill:
+                products, prices = await asyncio.gather(
+                    ProductService._list_all(client.v1.products, product_params),
+                    ProductService._list_all(
+                        client.v1.prices,
+                        {"active": True, "limit": CATALOG_PAGE_SIZE},
+                    ),
+                )
+
+                prices_by_product: dict[str, list[stripe.Price]] = defaultdict(list)
+                for price in prices:
+                    prices_by_product[price.product].append(price)
+                await catalog_cache.put_objects(products, prices)
+
+                listing = [
+                    ProductResponse(
+                        id=product.id,
+                        name=product.name,
+                        description=product.description,
+                        metadata=dict(product.metadata) if product.metadata else None,
+                        created=product.created,
+                        prices=[
+                            ProductService.map_price_to_response(price, product)
+                            for price in prices_by_product.get(product.id, [])
+                        ]
+                    )
+                    for product in products
+                ]
+                await fill(listing)
+            return listing
+        except Exception as e:
+            raise Exception(f"Error listing products: {str(e)}")
+
+    @staticmethod
+    async def _list_all(service, params: dict) -> list:
+        """Drain every page of a Stripe list endpoint."""
+        page = await service.list_async(params=params)
+        return [item async for item in page.auto_paging_iter()]
+
+    @staticmethod
+    def map_price_to_response(
+        price: stripe.Price,
+        product: stripe.Product | None = None
+    ) -> PriceResponse:
         """
         Map a Stripe Price object to a PriceResponse schema.
 
         Args:
             price (stripe.Price): The Stripe Price object to map.
+            product (stripe.Product | None): The price's product, required
+                when the price was fetched without ``expand=['product']``.
 
         Returns:
             PriceResponse: The mapped PriceResponse schema.
         """
+        product = product or price.product
+        if isinstance(product, str):
+            raise ValueError(f"Product {product} is not expanded")
         return PriceResponse(
             id=price.id,
-            product_id=price.product.id,
-            name=price.product.name,
+            product_id=product.id,
+            name=product.name,
             unit_amount=price.unit_amount,
             currency=price.currency,
             created=price.created,
@@ -0,0 +1,31 @@
+from src.core import Cache, model_codec, settings
+from src.schemas import CustomerResponse, SubscriptionResponse
+
+# Both live in the shared CACHE_BACKEND, so a customer or subscription list
+# loaded by one worker is a hit for the others, and an invalidation made by
+# one worker reaches them all. Each entry keeps the ETag of its JSON, which
+# the routes compare with If-None-Match before calling the service.
+
+customer_cache = Cache(
+    "customer",
+    ttl=settings.CUSTOMER_CACHE_TTL,
+    codec=model_codec(CustomerResponse),
+    etags=True,
+)
+"""``CustomerResponse`` by Stripe customer id.
+
+Written by retrieves and updates; dropped on delete and on
+``customer.updated``/``customer.deleted`` webhooks.
+"""
+
+subscription_cache = Cache(
+    "user_subscriptions",
+    ttl=settings.SUBSCRIPTION_CACHE_TTL,
+    codec=model_codec(list[SubscriptionResponse]),
+    etags=True,
+)
+"""A user's ``list[SubscriptionResponse]`` by user id.
+
+Dropped whenever one of the user's subscriptions is written to the
+``subscription_mirror``.
+"""
@@ -1,26 +1,51 @@
-import stripe
-from src.core import settings
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Mapping
+from typing import TYPE_CHECKING
+
+from src.core import ResponseMapper, get_stripe_client, settings, stripe_reads
 from src.schemas import (
     ProductResponse,
     SubscriptionCreate, 
     SubscriptionResponse
 )
 from src.schemas.subscription import CancelSubscriptionResponse
+from src.services.catalog import catalog_cache
+from src.services.product import ProductService
+from src.services.response_cache import subscription_cache
+from src.services.subscription_mirror import stripe_time, subscription_mirror
 
-stripe.api_key = settings.STRIPE_SECRET_KEY
+if TYPE_CHECKING:
+    import stripe
 
 class SubscriptionService:
-    """Service for handling Stripe subscription operations."""
-    
+    """Service for handling Stripe subscription operations.
 
+    Every subscription created or canceled here is written to the local
+    ``subscription_mirror``, which ``get_user_subscriptions_async`` reads
+    instead of calling Stripe Search.
+
+    Attributes:
+        mapper (ResponseMapper): Builds ``SubscriptionResponse``.
+        cancel_mapper (ResponseMapper): Builds ``CancelSubscriptionResponse``.
+    """
+
+    mapper = ResponseMapper(SubscriptionResponse)
+    cancel_mapper = ResponseMapper(CancelSubscriptionResponse)
     
     @staticmethod
-    def create_subscription(data: SubscriptionCreate) -> SubscriptionResponse:
+    async def create_subscription_async(
+        data: SubscriptionCreate,
+        idempotency_key: str | None = None
+    ) -> SubscriptionResponse:
         """
         Create a subscription.
         
         Args:
             data (SubscriptionCreate): The subscription data to create.
+            idempotency_key (str | None): Forwarded to Stripe so a retried
+                request does not create a second subscription.
 
         Returns:
             SubscriptionResponse: The created subscription response.
@@ -28,21 +53,24 @@ class SubscriptionService:
 
         metadata = data.metadata.to_dict() if data.metadata else {}
             
-        subscription = stripe.Subscription.create(
-            customer=data.customer_id,
-            items=[{'price': data.price_id}],
-            trial_period_days=data.trial_period_days,
-            metadata=metadata,
-            payment_behavior='default_incomplete',
-            payment_settings={'save_default_payment_method': 'on_subscription'},
-            expand=['latest_invoice.payment_intent']
+        subscription = await get_stripe_client().v1.subscriptions.create_async(
+            params={
+                "customer": data.customer_id,
+                "items": [{'price': data.price_id}],
+                "trial_period_days": data.trial_period_days,
+                "metadata": metadata,
+                "payment_behavior": 'default_incomplete',
+                "payment_settings": {'save_default_payment_method': 'on_subscription'},
+                "expand": ['latest_invoice.payment_intent'],
+            },
+            options={"idempotency_key": idempotency_key},
         )
 
-        return SubscriptionService.map_subscription_to_response(subscription)
+        return await SubscriptionService.mirror_subscription_async(subscription)
     
 
     @staticmethod
-    def create_subscription_with_trial(data: SubscriptionCreate) -> SubscriptionResponse:
+    async def create_subscription_with_trial_async(data: SubscriptionCreate) -> SubscriptionResponse:
         """ Create a subscription with a trial period.
 
         Args:
@@ -54,21 +82,23 @@ class SubscriptionService:
 
         metadata = data.metadata.to_dict() if data.metadata else {}
             
-        subscription = stripe.Subscription.create(
-            customer=data.customer_id,
-            items=[{'price': data.price_id}],
-            trial_period_days=data.trial_period_days if data.trial_period_days else 7,
-            metadata=metadata,
-            payment_behavior='default_incomplete',
-            payment_settings={'save_default_payment_method': 'on_subscription'},
-            expand=['latest_invoice.payment_intent']
+        subscription = await get_stripe_client().v1.subscriptions.create_async(
+            params={
+                "customer": data.customer_id,
+                "items": [{'price': data.price_id}],
+                "trial_period_days": data.trial_period_days if data.trial_period_days else 7,
+                "metadata": metadata,
+                "payment_behavior": 'default_incomplete',
+                "payment_settings": {'save_default_payment_method': 'on_subscription'},
+                "expand": ['latest_invoice.payment_intent'],
+            }
         )
 
-        return SubscriptionService.map_subscription_to_response(subscription)
+        return await SubscriptionService.mirror_subscription_async(subscription)
     
 
     @staticmethod
-    def create_free_subscription(data: SubscriptionCreate) -> SubscriptionResponse:
+    async def create_free_subscription_async(data: SubscriptionCreate) -> SubscriptionResponse:
         """Create a free subscription (no invoice).
         
         Args:
@@ -79,30 +109,44 @@ class SubscriptionService:
         """
         try:
             # Primeiro, criar um preço gratuito
-            free_price = stripe.Price.create(
-                product=data.price_id,  # Usar como product_id
-                unit_amount=0,  # Gratuito
-                currency='brl',
-                recurring={'interval': 'month'}
+            client = get_stripe_client()
+            free_price = await client.v1.prices.create_async(
+                params={
+                    "product": data.price_id,  # Usar como product_id
+                    "unit_amount": 0,  # Gratuito
+                    "currency": 'brl',
+                    "recurring": {'interval': 'month'},
+                }
             )
             
             metadata = data.metadata.to_dict() if data.metadata else {}
             
-            subscription = stripe.Subscription.create(
-                customer=data.customer_id,
-                items=[{'price': free_price.id}],  # Usar preço gratuito
-                metadata=metadata,
-                expand=['latest_invoice.payment_intent']
+            subscription = await client.v1.subscriptions.create_async(
+                params={
+                    "customer": data.customer_id,
+                    "items": [{'price': free_price.id}],  # Usar preço gratuito
+                    "metadata": metadata,
+                    "expand": ['latest_invoice.payment_intent'],
+                }
             )
         
-            return SubscriptionService.map_subscription_to_response(subscription)
+            return await SubscriptionService.mirror_subscription_async(subscription)
             
         except Exception as e:
             raise Exception(f"Error creating free subscription: {str(e)}")
 
     @staticmethod
-    def get_user_subscriptions(user_id: str) -> list[SubscriptionResponse]:
+    async def get_user_subscriptions_async(user_id: str) -> list[SubscriptionResponse]:
         """Get all subscriptions for a user.
+
+        Answered from ``subscription_cache``, shared by every worker, or else
+        from ``subscription_mirror`` once the user is synced. The first lookup
+        of an unsynced user runs Stripe Search and loads the results into the
+        mirror, unless ``SUBSCRIPTION_MIRROR_FALLBACK_TO_SEARCH`` is off;
+        concurrent first lookups of the same user share that search. The list
+        read from the mirror is cached through ``subscription_cache.filling``,
+        so it is dropped if a mirror write forgot the user meanwhile. Mirror
+        queries run in a worker thread.
         
         Args:
             user_id (str): The unique identifier of the user.
@@ -111,20 +155,33 @@ class SubscriptionService:
             list[SubscriptionResponse]: A list of subscriptions for the user.
         """
         try:
-            subscriptions = stripe.Subscription.search(
-                query=f'metadata["user_id"]:"{user_id}"',
-                expand=['data.items.data.price']
-            )
-            
-            return [
-                SubscriptionService.map_subscription_to_response(sub)
-                for sub in subscriptions.data
-            ]
+            cached = await subscription_cache.get(user_id)
+            if cached is not None:
+                return cached
+
+            synced = await asyncio.to_thread(subscription_mirror.is_synced, user_id)
+            if not synced and settings.SUBSCRIPTION_MIRROR_FALLBACK_TO_SEARCH:
+                async def sync() -> None:
+                    subscriptions = await get_stripe_client().v1.subscriptions.search_async(
+                        params={"query": f'metadata["user_id"]:"{user_id}"'}
+                    )
+                    as_of = stripe_time(subscriptions)
+                    async for sub in subscriptions.auto_paging_iter():
+                        await SubscriptionService.mirror_subscription_async(sub, as_of)
+                    await asyncio.to_thread(subscription_mirror.mark_synced, user_id)
+
+                await stripe_reads.do("user_subscriptions", user_id, sync)
+
+            # Opened after the sync, whose mirror writes drop the entry.
+            async with subscription_cache.filling(user_id) as fill:
+                subscriptions = await asyncio.to_thread(subscription_mirror.find_by_user_id, user_id)
+                await fill(subscriptions)
+            return subscriptions
         except Exception as e:
             raise Exception(f"Error getting user subscriptions: {str(e)}")
     
     @staticmethod
-    def cancel_subscription(subscription_id: str, at_period_end: bool = True) -> CancelSubscriptionResponse:
+    async def cancel_subscription_async(subscription_id: str, at_period_end: bool = True) -> CancelSubscriptionResponse:
         """Cancel a subscription.
         
         Args:
@@ -137,90 +194,145 @@ class SubscriptionService:
         try:
             if at_period_end:
                 # Cancelar no final do período
-                subscription = stripe.Subscription.modify(
+                subscription = await get_stripe_client().v1.subscriptions.update_async(
                     subscription_id,
-                    cancel_at_period_end=True
+                    params={"cancel_at_period_end": True}
                 )
             else:
                 # Cancelar imediatamente
-                subscription = stripe.Subscription.cancel(subscription_id)
+                subscription = await get_stripe_client().v1.subscriptions.cancel_async(
+                    subscription_id
+                )
             
-            return CancelSubscriptionResponse.model_validate(
-                subscription, 
-                from_attributes=True
-            )
+            await SubscriptionService.mirror_subscription_async(subscription)
+            return SubscriptionService.cancel_mapper.map(subscription)
         except Exception as e:
             raise Exception(f"Error canceling subscription: {str(e)}")
     
     @staticmethod
-    def list_products(include_archived: bool = False) -> list[ProductResponse]:
+    async def list_products_async(include_archived: bool = False) -> list[ProductResponse]:
         """list all products with their prices.
-        
+
+        The catalog lives in ``ProductService``; this alias is kept for callers
+        that browse plans from the subscription side.
+
         Args:
             include_archived (bool): Whether to include archived products.
 
         Returns:
             list[ProductResponse]: A list of products with their prices.
         """
-        try:
-            products = stripe.Product.list(
-                active=not include_archived if not include_archived else None
+        return await ProductService.list_products_async(include_archived)
+
+    @staticmethod
+    async def mirror_subscription_async(
+        subscription: stripe.Subscription,
+        as_of: float | None = None
+    ) -> SubscriptionResponse:
+        """Map ``subscription``, write it to the local mirror and drop its user's cached list.
+
+        Writes are ordered on Stripe's clock. A state older than the mirrored
+        one is dropped. One from the same second cannot be ordered against
+        it, so the subscription is retrieved again and the current state is
+        written instead.
+
+        Args:
+            subscription (stripe.Subscription): The subscription as Stripe
+                returned or sent it.
+            as_of (float | None): When Stripe produced this state, e.g. the
+                webhook event's ``created``; defaults to ``stripe_time`` of
+                the response ``subscription`` came in.
+
+        Returns:
+            SubscriptionResponse: The mapped subscription.
+        """
+        if as_of is None:
+            as_of = stripe_time(subscription)
+        prices = await SubscriptionService._resolve_prices_async([subscription])
+        response = SubscriptionService.map_subscription_to_response(subscription, prices)
+        written = await asyncio.to_thread(subscription_mirror.record, response, as_of)
+        if not written and await asyncio.to_thread(subscription_mirror.as_of, response.id) == as_of:
+            subscription = await get_stripe_client().v1.subscriptions.retrieve_async(response.id)
+            prices = await SubscriptionService._resolve_prices_async([subscription])
+            response = SubscriptionService.map_subscription_to_response(subscription, prices)
+            await asyncio.to_thread(
+                subscription_mirror.record, response, stripe_time(subscription), force=True
             )
-            result = []
-            
-            for product in products.data:
-                print("Product: ", product)
-                prices = stripe.Price.list(
-                    product=product.id, 
-                    active=True,
-                    expand=['data.product']
-                )
-                print("PRICES: ", prices)
-                result.append(
-                    ProductResponse(
-                        id=product.id,
-                        name=product.name,
-                        description=product.description,
-                        metadata=dict(product.metadata) if product.metadata else None,
-                        created=product.created,
-                        prices=[
-                            SubscriptionService.map_price_to_response(price)
-                            for price in prices.data
-                        ]
-                    )
-                )
-            return result
-        except Exception as e:
-            raise Exception(f"Error listing products: {str(e)}")
-        
+        await SubscriptionService.forget_user_subscriptions(response)
+        return response
+
+    @staticmethod
+    async def forget_user_subscriptions(subscription: SubscriptionResponse) -> None:
+        """Drop the cached subscription list of the user ``subscription`` belongs to."""
+        user_id = (subscription.metadata or {}).get("user_id")
+        if user_id:
+            await subscription_cache.delete(user_id)
 
+    @staticmethod
+    async def _resolve_prices_async(subscriptions: list[stripe.Subscription]) -> dict[str, stripe.Price]:
+        """Return every item price of ``subscriptions``, by id.
+
+        Unexpanded prices come from ``catalog_cache``, or from Stripe when it
+        does not hold them; expanded and fetched prices are written to the
+        cache in one batch, so later payloads never need to expand them.
+
+        Args:
+            subscriptions (list[stripe.Subscription]): Subscriptions about to
+                be mapped.
+
+        Returns:
+            dict[str, stripe.Price]: The prices, to pass to
+            ``map_subscription_to_response``.
+        """
+        items = [item for subscription in subscriptions for item in subscription["items"]["data"]]
+        expanded = {item.price.id: item.price for item in items if not isinstance(item.price, str)}
+        ids = list({item.price for item in items if isinstance(item.price, str)} - expanded.keys())
+
+        cached = await asyncio.gather(*(catalog_cache.get_price(price_id) for price_id in ids))
+        prices = {price_id: price for price_id, price in zip(ids, cached) if price is not None}
+        client = get_stripe_client()
+        fetched = await asyncio.gather(
+            *(client.v1.prices.retrieve_async(price_id) for price_id in ids if price_id not in prices)
+        )
+        await catalog_cache.put_objects(prices=[*expanded.values(), *fetched])
+        return {**prices, **expanded, **{price.id: price for price in fetched}}
 
-    
     @staticmethod
-    def map_subscription_to_response(subscription: stripe.Subscription) -> SubscriptionResponse:
+    def map_subscription_to_response(
+        subscription: stripe.Subscription,
+        prices: Mapping[str, stripe.Price] | None = None
+    ) -> SubscriptionResponse:
         """
         Map a Stripe Subscription object to a SubscriptionResponse schema.
 
         Args:
             subscription (stripe.Subscription): The Stripe Subscription object to map.
+            prices (Mapping[str, stripe.Price] | None): Item prices by id, as
+                returned by ``_resolve_prices_async``; needed when the first
+                item's price is not expanded.
 
         Returns:
             SubscriptionResponse: The mapped SubscriptionResponse schema.
         """ 
         first_item = subscription["items"]["data"][0]
+        price = first_item.price
+        if isinstance(price, str):
+            price = (prices or {}).get(price)
+            if price is None:
+                raise ValueError(f"Price {first_item.price} is neither expanded nor resolved")
         
-        return SubscriptionResponse(
+        return SubscriptionService.mapper.build(
             id=subscription.id,
             status=subscription.status,
             customer=subscription.customer,
             start_date=subscription.start_date,
             ended_at=subscription.ended_at,
-            price_id=first_item.price.id,
-            amount=first_item.price.unit_amount,
-            currency=first_item.price.currency,
+            price_id=price.id,
+            amount=price.unit_amount,
+            currency=price.currency,
             interval=(
-                first_item.price.recurring.interval 
-                if first_item.price.recurring 
+                price.recurring.interval 
+                if price.recurring 
                 else None
             ),
             trial_start=subscription.trial_start,
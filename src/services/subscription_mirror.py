@@ -0,0 +1,230 @@
+import asyncio
+import sqlite3
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Any
+
+from src.core import get_stripe_client, settings
+from src.core.database import connect
+from src.schemas import SubscriptionResponse
+
+
+class SubscriptionMirror:
+    """Local SQLite copy of Stripe subscriptions, indexed by user_id and customer id.
+
+    Each row stores the subscription already mapped to ``SubscriptionResponse``,
+    so a read is one indexed query and no Stripe call. Rows are written from
+    create and cancel responses and from ``customer.subscription.*`` webhooks;
+    ``as_of``, a time on Stripe's clock (see ``stripe_time``), orders those
+    writes so a late, out-of-order webhook cannot overwrite a newer state.
+
+    A user becomes *synced* once their subscriptions were loaded from Stripe
+    Search (or by the backfill); from then on the mirror is authoritative for
+    them, including when they have no subscription at all.
+
+    Methods:
+        find_by_user_id(user_id: str) -> list[SubscriptionResponse]:
+            Return a user's mirrored subscriptions, newest first.
+        find_by_customer_id(customer_id: str) -> list[SubscriptionResponse]:
+            Return a customer's mirrored subscriptions, newest first.
+        record(subscription: SubscriptionResponse, as_of: float, force: bool) -> bool:
+            Insert or refresh a subscription if its state is newer.
+        as_of(subscription_id: str) -> float | None:
+            Return the Stripe time of a subscription's mirrored state.
+        is_synced(user_id: str) -> bool:
+            Whether the mirror holds every subscription of a user.
+        mark_synced(user_id: str) -> None:
+            Record that a user's subscriptions were loaded from Stripe.
+        stats() -> dict[str, int]:
+            Return how often a user was found synced (hits) or not (misses).
+    """
+
+    def __init__(self, path: str | None = None):
+        self._path = path
+        self._connection: sqlite3.Connection | None = None
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        if self._connection is None:
+            with self._lock:
+                if self._connection is None:
+                    connection = connect(self._path)
+                    connection.executescript(
+                        """
+                        CREATE TABLE IF NOT EXISTS subscription_mirror (
+                            subscription_id TEXT PRIMARY KEY,
+                            user_id TEXT,
+                            customer_id TEXT NOT NULL,
+                            status TEXT NOT NULL,
+                            start_date INTEGER NOT NULL,
+                            response TEXT NOT NULL,
+                            as_of REAL NOT NULL
+                        );
+                        CREATE INDEX IF NOT EXISTS subscription_mirror_user_id
+                            ON subscription_mirror (user_id, start_date);
+                        CREATE INDEX IF NOT EXISTS subscription_mirror_customer_id
+                            ON subscription_mirror (customer_id, start_date);
+                        CREATE TABLE IF NOT EXISTS subscription_mirror_users (
+                            user_id TEXT PRIMARY KEY,
+                            synced_at REAL NOT NULL
+                        );
+                        """
+                    )
+                    self._connection = connection
+        return self._connection
+
+    def find_by_user_id(self, user_id: str) -> list[SubscriptionResponse]:
+        return self._find("user_id", user_id)
+
+    def find_by_customer_id(self, customer_id: str) -> list[SubscriptionResponse]:
+        return self._find("customer_id", customer_id)
+
+    def record(self, subscription: SubscriptionResponse, as_of: float, force: bool = False) -> bool:
+        """
+        Insert or refresh the row for ``subscription``.
+
+        Args:
+            subscription (SubscriptionResponse): The subscription as mapped
+                for the API.
+            as_of (float): When Stripe produced this state: the webhook
+                event's ``created``, or ``stripe_time`` of the API response.
+            force (bool): Write even if the stored state is not older, for a
+                state just retrieved from Stripe. The stored ``as_of`` never
+                goes back.
+
+        Returns:
+            bool: Whether the row was written. Without ``force``, a state
+            that is not newer than the stored one is ignored.
+        """
+        metadata = subscription.metadata or {}
+        with self._lock:
+            cursor = self.connection.execute(
+                """
+                INSERT INTO subscription_mirror
+                    (subscription_id, user_id, customer_id, status, start_date, response, as_of)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (subscription_id) DO UPDATE SET
+                    user_id = excluded.user_id,
+                    customer_id = excluded.customer_id,
+                    status = excluded.status,
+                    start_date = excluded.start_date,
+                    response = excluded.response,
+                    as_of = max(excluded.as_of, subscription_mirror.as_of)
+                WHERE ? OR excluded.as_of > subscription_mirror.as_of
+                """,
+                (
+                    subscription.id,
+                    metadata.get("user_id"),
+                    subscription.customer,
+                    subscription.status,
+                    subscription.start_date,
+                    subscription.model_dump_json(),
+                    as_of,
+                    force,
+                ),
+            )
+        return cursor.rowcount > 0
+
+    def as_of(self, subscription_id: str) -> float | None:
+        with self._lock:
+            row = self.connection.execute(
+                "SELECT as_of FROM subscription_mirror WHERE subscription_id = ?", (subscription_id,)
+            ).fetchone()
+        return None if row is None else row[0]
+
+    def is_synced(self, user_id: str) -> bool:
+        with self._lock:
+            row = self.connection.execute(
+                "SELECT 1 FROM subscription_mirror_users WHERE user_id = ?", (user_id,)
+            ).fetchone()
+        if row is None:
+            self.misses += 1
+            return False
+        self.hits += 1
+        return True
+
+    def mark_synced(self, user_id: str) -> None:
+        with self._lock:
+            self.connection.execute(
+                """
+                INSERT INTO subscription_mirror_users (user_id, synced_at) VALUES (?, ?)
+                ON CONFLICT (user_id) DO UPDATE SET synced_at = excluded.synced_at
+                """,
+                (user_id, time.time()),
+            )
+
+    def stats(self) -> dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses}
+
+    def _find(self, column: str, value: str) -> list[SubscriptionResponse]:
+        with self._lock:
+            rows = self.connection.execute(
+                f"SELECT response FROM subscription_mirror WHERE {column} = ? "
+                "ORDER BY start_date DESC",
+                (value,),
+            ).fetchall()
+        return [SubscriptionResponse.model_validate_json(row[0]) for row in rows]
+
+
+def stripe_time(obj: Any) -> float:
+    """
+    When Stripe sent ``obj``: the ``Date`` header of the response it came in.
+
+    Event ``created`` timestamps are on the same clock, with the same
+    one-second resolution, so the two can be compared. Objects built without
+    a response fall back to the local clock.
+
+    Args:
+        obj (Any): A Stripe object returned by the API, e.g. a subscription or
+            a list page.
+
+    Returns:
+        float: A Unix timestamp.
+    """
+    response = getattr(obj, "last_response", None)
+    date = response.headers.get("Date") if response is not None else None
+    if not date:
+        return time.time()
+    return parsedate_to_datetime(date).timestamp()
+
+
+subscription_mirror = SubscriptionMirror()
+
+
+async def backfill_subscription_mirror(mirror: SubscriptionMirror = subscription_mirror) -> int:
+    """
+    Record every existing Stripe subscription in the mirror.
+
+    Run once before turning ``SUBSCRIPTION_MIRROR_FALLBACK_TO_SEARCH`` off,
+    so subscriptions created before the mirror existed are served locally.
+    Every user seen is marked as synced.
+
+    Returns:
+        int: The number of subscriptions recorded.
+    """
+    from src.services.subscription import SubscriptionService
+
+    page = await get_stripe_client().v1.subscriptions.list_async(
+        params={"status": "all", "limit": 100}
+    )
+    # Items of a page carry no response of their own. Later pages are read
+    # after the first, so its time is never newer than any item's state.
+    as_of = stripe_time(page)
+    count = 0
+    async for subscription in page.auto_paging_iter():
+        prices = await SubscriptionService._resolve_prices_async([subscription])
+        response = SubscriptionService.map_subscription_to_response(subscription, prices)
+        mirror.record(response, as_of)
+        if response.metadata and response.metadata.get("user_id"):
+            mirror.mark_synced(response.metadata["user_id"])
+        count += 1
+    return count
+
+
+if __name__ == "__main__":
+    recorded = asyncio.run(backfill_subscription_mirror())
+    print(f"Mirrored {recorded} subscriptions into {settings.LOCAL_DB_PATH}")
@@ -1,18 +1,36 @@
-import stripe
-from typing import Dict, Any
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any
+
 from src.core import settings
+from src.services.catalog import catalog_cache
+from src.services.customer_index import customer_index
+from src.services.response_cache import customer_cache
+from src.services.subscription import SubscriptionService
+
+if TYPE_CHECKING:
+    import stripe
 
 class WebhookService:
     """Service for handling Stripe webhooks."""
     
     @staticmethod
     def verify_webhook_signature(payload: bytes, sig_header: str) -> stripe.Event:
-        """Verify webhook signature and return event."""
+        """Verify webhook signature and return event.
+
+        Raises if ``STRIPE_WEBHOOK_SECRET`` is empty: Stripe's check accepts
+        a payload signed with an empty key.
+        """
+        import stripe
+
+        if not settings.STRIPE_WEBHOOK_SECRET:
+            raise Exception("Webhook secret is not configured")
+
         try:
             event = stripe.Webhook.construct_event(
                 payload, 
                 sig_header, 
-                settings.webhook_secret
+                settings.STRIPE_WEBHOOK_SECRET
             )
             return event
         except ValueError:
@@ -23,7 +41,7 @@ class WebhookService:
             raise Exception("Invalid signature")
     
     @staticmethod
-    def handle_webhook_event(event: stripe.Event) -> Dict[str, Any]:
+    async def handle_webhook_event_async(event: stripe.Event) -> dict[str, Any]:
         """Handle different types of webhook events."""
         
         if event['type'] == 'payment_intent.succeeded':
@@ -46,11 +64,59 @@ class WebhookService:
         
         elif event['type'] == 'customer.created':
             customer = event['data']['object']
+            customer_index.record(customer)
             return {
                 'event_type': 'customer_created',
                 'customer_id': customer['id'],
                 'email': customer['email']
             }
+
+        elif event['type'] == 'customer.updated':
+            customer = event['data']['object']
+            customer_index.record(customer)
+            await customer_cache.delete(customer['id'])
+            return {
+                'event_type': 'customer_updated',
+                'customer_id': customer['id'],
+                'email': customer['email']
+            }
+
+        elif event['type'] == 'customer.deleted':
+            customer = event['data']['object']
+            customer_index.forget(customer['id'])
+            await customer_cache.delete(customer['id'])
+            return {
+                'event_type': 'customer_deleted',
+                'customer_id': customer['id']
+            }
+        
+        elif event['type'].startswith('customer.subscription.'):
+            subscription = event['data']['object']
+            await SubscriptionService.mirror_subscription_async(subscription, as_of=event['created'])
+            return {
+                'event_type': 'subscription_mirrored',
+                'type': event['type'],
+                'subscription_id': subscription['id'],
+                'status': subscription['status']
+            }
+
+        elif event['type'].startswith('product.'):
+            product = event['data']['object']
+            await catalog_cache.invalidate_product(product['id'])
+            return {
+                'event_type': 'catalog_invalidated',
+                'type': event['type'],
+                'product_id': product['id']
+            }
+
+        elif event['type'].startswith('price.'):
+            price = event['data']['object']
+            await catalog_cache.invalidate_price(price['id'])
+            return {
+                'event_type': 'catalog_invalidated',
+                'type': event['type'],
+                'price_id': price['id']
+            }
         
         else:
             return {
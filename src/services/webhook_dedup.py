@@ -0,0 +1,133 @@
+import sqlite3
+import threading
+import time
+
+from src.core import TTLCache, settings
+from src.core.database import connect
+
+
+class WebhookDeduplicator:
+    """Remembers which Stripe event ids were already accepted.
+
+    Stripe delivers webhooks at least once and retries for days, so the same
+    ``event.id`` can arrive many times. Recent ids are answered from a bounded
+    in-memory LRU without touching the disk; older ones, and ids accepted by
+    another process sharing the database, from a SQLite table. Ids are kept
+    for ``retention`` seconds, after which they are purged.
+
+    Methods:
+        accept(event_id: str) -> bool:
+            Record ``event_id`` and return True, or False if it is a duplicate.
+        forget(event_id: str) -> None:
+            Drop ``event_id`` so a later delivery is accepted again.
+        purge() -> int:
+            Delete ids older than the retention window.
+        stats() -> dict[str, int]:
+            Return the accepted and duplicate counters.
+    """
+
+    def __init__(
+        self,
+        path: str | None = None,
+        maxsize: int = settings.WEBHOOK_DEDUP_MAXSIZE,
+        retention: float = settings.WEBHOOK_DEDUP_RETENTION,
+        purge_interval: float = 3600.0,
+    ):
+        self.retention = retention
+        self.purge_interval = purge_interval
+        self.accepted = 0
+        self.duplicates_in_memory = 0
+        self.duplicates_in_store = 0
+        self._recent = TTLCache(maxsize=maxsize, ttl=retention)
+        self._path = path
+        self._connection: sqlite3.Connection | None = None
+        self._lock = threading.RLock()
+        self._last_purge = 0.0
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        if self._connection is None:
+            with self._lock:
+                if self._connection is None:
+                    connection = connect(self._path)
+                    connection.executescript(
+                        """
+                        CREATE TABLE IF NOT EXISTS webhook_event_ids (
+                            event_id TEXT PRIMARY KEY,
+                            seen_at REAL NOT NULL
+                        );
+                        CREATE INDEX IF NOT EXISTS webhook_event_ids_seen_at
+                            ON webhook_event_ids (seen_at);
+                        """
+                    )
+                    self._connection = connection
+        return self._connection
+
+    def accept(self, event_id: str) -> bool:
+        """
+        Record a delivery of ``event_id``.
+
+        Args:
+            event_id (str): The Stripe event id.
+
+        Returns:
+            bool: True the first time the id is seen within the retention
+            window, False for a duplicate.
+        """
+        with self._lock:
+            if self._recent.get(event_id):
+                self.duplicates_in_memory += 1
+                return False
+
+            now = time.time()
+            cursor = self.connection.execute(
+                """
+                INSERT INTO webhook_event_ids (event_id, seen_at) VALUES (?, ?)
+                ON CONFLICT (event_id) DO UPDATE SET seen_at = excluded.seen_at
+                WHERE seen_at < ?
+                """,
+                (event_id, now, now - self.retention),
+            )
+            self._recent.set(event_id, True)
+            if cursor.rowcount == 0:
+                self.duplicates_in_store += 1
+                return False
+
+            self.accepted += 1
+            if now - self._last_purge > self.purge_interval:
+                self.purge()
+            return True
+
+    def forget(self, event_id: str) -> None:
+        with self._lock:
+            self._recent.pop(event_id)
+            self.connection.execute(
+                "DELETE FROM webhook_event_ids WHERE event_id = ?", (event_id,)
+            )
+
+    def purge(self) -> int:
+        with self._lock:
+            self._last_purge = time.time()
+            cursor = self.connection.execute(
+                "DELETE FROM webhook_event_ids WHERE seen_at < ?",
+                (self._last_purge - self.retention,),
+            )
+        return cursor.rowcount
+
+    def stats(self) -> dict[str, int]:
+        """
+        Return the deduplication counters.
+
+        Returns:
+            dict[str, int]: ``accepted``, ``duplicates`` and its split into
+            ``duplicates_in_memory`` and ``duplicates_in_store``.
+        """
+        return {
+            "accepted": self.accepted,
+            "duplicates": self.duplicates_in_memory + self.duplicates_in_store,
+            "duplicates_in_memory": self.duplicates_in_memory,
+            "duplicates_in_store": self.duplicates_in_store,
+        }
+
+
+webhook_dedup = WebhookDeduplicator()
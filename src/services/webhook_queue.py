@@ -0,0 +1,252 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+from typing import TYPE_CHECKING
+
+from src.core import settings
+from src.core.database import connect
+from src.services.webhook import WebhookService
+
+if TYPE_CHECKING:
+    import stripe
+
+logger = logging.getLogger(__name__)
+
+
+class WebhookQueue:
+    """Persistent local queue of verified Stripe webhook events.
+
+    The webhook route only verifies the signature and appends the raw payload
+    here, so Stripe gets its 2xx within milliseconds no matter how slow the
+    handlers are. Workers claim events with a lease: an event whose worker
+    died mid-way becomes claimable again once the lease expires, and an event
+    that keeps failing is retried with exponential backoff until
+    ``max_attempts`` is reached, then parked as ``failed``. Processed events
+    are deleted, so the table only holds the backlog and the failures;
+    ``webhook_dedup`` remembers their ids.
+
+    Methods:
+        put(event: stripe.Event, payload: str) -> int:
+            Append an event and return its sequence number.
+        claim() -> tuple[int, str, int] | None:
+            Lease the oldest due event as ``(seq, payload, attempts)``.
+        complete(seq: int) -> None:
+            Remove a processed event.
+        fail(seq: int, attempts: int, error: str) -> None:
+            Schedule a retry, or park the event once out of attempts.
+        counts() -> dict[str, int]:
+            Return the number of events in each status.
+    """
+
+    def __init__(
+        self,
+        path: str | None = None,
+        lease: float = settings.WEBHOOK_LEASE_SECONDS,
+        max_attempts: int = settings.WEBHOOK_MAX_ATTEMPTS,
+    ):
+        self.lease = lease
+        self.max_attempts = max_attempts
+        self._path = path
+        self._connection: sqlite3.Connection | None = None
+        self._lock = threading.RLock()
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        if self._connection is None:
+            with self._lock:
+                if self._connection is None:
+                    connection = connect(self._path)
+                    connection.executescript(
+                        """
+                        CREATE TABLE IF NOT EXISTS webhook_events (
+                            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                            event_id TEXT NOT NULL,
+                            type TEXT NOT NULL,
+                            payload TEXT NOT NULL,
+                            status TEXT NOT NULL DEFAULT 'pending',
+                            attempts INTEGER NOT NULL DEFAULT 0,
+                            available_at REAL NOT NULL,
+                            received_at REAL NOT NULL,
+                            last_error TEXT
+                        );
+                        CREATE INDEX IF NOT EXISTS webhook_events_due
+                            ON webhook_events (status, available_at);
+                        -- Left by versions that kept processed events.
+                        DELETE FROM webhook_events WHERE status = 'done';
+                        """
+                    )
+                    self._connection = connection
+        return self._connection
+
+    def put(self, event: stripe.Event, payload: str) -> int:
+        """
+        Append a verified event to the queue.
+
+        Args:
+            event (stripe.Event): The verified event.
+            payload (str): The raw request body the event was parsed from.
+
+        Returns:
+            int: The event's sequence number in the queue.
+        """
+        now = time.time()
+        with self._lock:
+            cursor = self.connection.execute(
+                """
+                INSERT INTO webhook_events (event_id, type, payload, available_at, received_at)
+                VALUES (?, ?, ?, ?, ?)
+                """,
+                (event["id"], event["type"], payload, now, now),
+            )
+        return cursor.lastrowid
+
+    def claim(self) -> tuple[int, str, int] | None:
+        """
+        Lease the oldest event that is pending or whose lease has expired.
+
+        Returns:
+            tuple[int, str, int] | None: ``(seq, payload, attempts)`` including
+            this attempt, or None if nothing is due.
+        """
+        now = time.time()
+        with self._lock:
+            return self.connection.execute(
+                """
+                UPDATE webhook_events
+                SET status = 'processing', attempts = attempts + 1, available_at = ?
+                WHERE seq = (
+                    SELECT seq FROM webhook_events
+                    WHERE status IN ('pending', 'processing') AND available_at <= ?
+                    ORDER BY seq LIMIT 1
+                )
+                RETURNING seq, payload, attempts
+                """,
+                (now + self.lease, now),
+            ).fetchone()
+
+    def complete(self, seq: int) -> None:
+        with self._lock:
+            self.connection.execute("DELETE FROM webhook_events WHERE seq = ?", (seq,))
+
+    def fail(self, seq: int, attempts: int, error: str) -> None:
+        """
+        Record a failed attempt.
+
+        Args:
+            seq (int): The event's sequence number.
+            attempts (int): Attempts made so far, including the failed one.
+            error (str): Description of the failure.
+        """
+        if attempts >= self.max_attempts:
+            status, available_at = "failed", time.time()
+        else:
+            status, available_at = "pending", time.time() + 2 ** attempts
+        with self._lock:
+            self.connection.execute(
+                """
+                UPDATE webhook_events SET status = ?, available_at = ?, last_error = ?
+                WHERE seq = ?
+                """,
+                (status, available_at, error, seq),
+            )
+
+    def counts(self) -> dict[str, int]:
+        with self._lock:
+            rows = self.connection.execute(
+                "SELECT status, COUNT(*) FROM webhook_events GROUP BY status"
+            ).fetchall()
+        return dict(rows)
+
+
+class WebhookWorkerPool:
+    """Fixed number of asyncio workers draining a ``WebhookQueue``.
+
+    Workers sleep until ``notify`` is called or ``poll_interval`` elapses, so
+    events left behind by a restart, retries coming due and events queued by
+    other processes sharing the database are picked up without a signal.
+
+    Methods:
+        start() -> None:
+            Start the workers on the running event loop, if not running.
+        notify() -> None:
+            Wake the workers after an event was queued.
+        stop(timeout: float) -> None:
+            Let in-flight events finish, then stop the workers.
+    """
+
+    def __init__(
+        self,
+        queue: WebhookQueue,
+        workers: int = settings.WEBHOOK_WORKERS,
+        poll_interval: float = settings.WEBHOOK_POLL_INTERVAL,
+    ):
+        self.queue = queue
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self._tasks: list[asyncio.Task] = []
+        self._wakeup: asyncio.Event | None = None
+        self._stopping = False
+
+    def start(self) -> None:
+        if self._tasks and not all(task.done() for task in self._tasks):
+            return
+        self._stopping = False
+        self._wakeup = asyncio.Event()
+        self._tasks = [
+            asyncio.create_task(self._work(), name=f"webhook-worker-{index}")
+            for index in range(self.workers)
+        ]
+
+    def notify(self) -> None:
+        self.start()
+        self._wakeup.set()
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """
+        Stop the workers.
+
+        Events still being handled after ``timeout`` seconds are cancelled and
+        will be claimed again once their lease expires.
+        """
+        if not self._tasks:
+            return
+        self._stopping = True
+        self._wakeup.set()
+        _, pending = await asyncio.wait(self._tasks, timeout=timeout)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        self._tasks = []
+
+    async def _work(self) -> None:
+        while not self._stopping:
+            job = self.queue.claim()
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                except TimeoutError:
+                    pass
+                self._wakeup.clear()
+                continue
+
+            seq, payload, attempts = job
+            import stripe
+
+            try:
+                event = stripe.Event.construct_from(json.loads(payload), settings.STRIPE_SECRET_KEY)
+                await WebhookService.handle_webhook_event_async(event)
+                self.queue.complete(seq)
+            except Exception as e:
+                logger.exception("Error handling webhook event %s (attempt %s)", seq, attempts)
+                self.queue.fail(seq, attempts, str(e))
+            # Let the route handlers run between events during a burst.
+            await asyncio.sleep(0)
+
+
+webhook_queue = WebhookQueue()
+webhook_workers = WebhookWorkerPool(webhook_queue)
@@ -1,14 +1,42 @@
+from .etag import (
+    etag_json_response,
+    etag_list_response,
+    etag_matches,
+    etag_model_response,
+    not_modified,
+)
+from .json_list import JSON_MEDIA_TYPE, encode_json_array, json_list_response
+from .ndjson import (
+    NDJSON_MEDIA_TYPE,
+    DuplexNDJSONResponse,
+    encode_ndjson,
+    iter_ndjson_lines,
+)
 from .payment import (
-    CurrencyEnum, 
-    PaymentMethodTypeEnum, 
+    CurrencyEnum,
+    PaymentMethodTypeEnum,
     SubscriptionInterval,
-    SubscriptionStatus
+    SubscriptionStatus,
 )
-
+from .timing import server_timing, timed
 
 __all__ = [
+    "JSON_MEDIA_TYPE",
+    "NDJSON_MEDIA_TYPE",
     "CurrencyEnum",
+    "DuplexNDJSONResponse",
     "PaymentMethodTypeEnum",
     "SubscriptionInterval",
-    "SubscriptionStatus"
-]
\ No newline at end of file
+    "SubscriptionStatus",
+    "encode_json_array",
+    "encode_ndjson",
+    "etag_json_response",
+    "etag_list_response",
+    "etag_matches",
+    "etag_model_response",
+    "iter_ndjson_lines",
+    "json_list_response",
+    "not_modified",
+    "server_timing",
+    "timed",
+]
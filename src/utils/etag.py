@@ -0,0 +1,119 @@
+from collections.abc import Sequence
+from functools import lru_cache
+from typing import Any
+
+from pydantic import TypeAdapter
+from starlette.responses import Response
+
+from src.core import make_etag, settings
+
+from .json_list import JSON_MEDIA_TYPE, json_list_response, list_adapter
+
+
+@lru_cache
+def model_adapter(value_type: Any) -> TypeAdapter:
+    """Return the cached ``TypeAdapter`` for ``value_type``."""
+    return TypeAdapter(value_type)
+
+
+def etag_matches(if_none_match: str | None, etag: str | None) -> bool:
+    """
+    Whether an ``If-None-Match`` header holds ``etag``.
+
+    Uses the weak comparison required for ``If-None-Match``, so ``W/"x"``
+    matches ``"x"``; ``*`` matches any current representation.
+
+    Args:
+        if_none_match (str | None): The request header.
+        etag (str | None): The current ETag, None if it is unknown.
+
+    Returns:
+        bool: True if the client already holds the current representation.
+    """
+    if not if_none_match or etag is None:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    current = etag.removeprefix("W/")
+    return any(
+        tag.strip().removeprefix("W/") == current for tag in if_none_match.split(",")
+    )
+
+
+def not_modified(etag: str) -> Response:
+    """Return a ``304 Not Modified`` carrying ``etag``."""
+    return Response(status_code=304, headers={"ETag": etag})
+
+
+def etag_json_response(body: bytes, if_none_match: str | None = None) -> Response:
+    """
+    Send a JSON body with a strong ETag computed from it.
+
+    Args:
+        body (bytes): The encoded JSON document.
+        if_none_match (str | None): The request's ``If-None-Match`` header.
+
+    Returns:
+        Response: ``304`` if the client holds this body already, else the body.
+    """
+    etag = make_etag(body)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    return Response(body, media_type=JSON_MEDIA_TYPE, headers={"ETag": etag})
+
+
+def etag_model_response(
+    value: Any, value_type: Any, if_none_match: str | None = None
+) -> Response:
+    """
+    Serialize ``value`` directly to JSON bytes and send it with its ETag.
+
+    The body is encoded as the ``Cache`` codecs encode it (``model_codec``),
+    so the ETag equals the one stored with the cached value.
+
+    Args:
+        value (Any): The response model.
+        value_type (Any): Its type, e.g. ``CustomerResponse``.
+        if_none_match (str | None): The request's ``If-None-Match`` header.
+
+    Returns:
+        Response: See ``etag_json_response``.
+    """
+    return etag_json_response(model_adapter(value_type).dump_json(value), if_none_match)
+
+
+def etag_list_response(
+    items: Sequence[Any],
+    item_type: type,
+    if_none_match: str | None = None,
+    etag: str | None = None,
+) -> Response:
+    """
+    ``json_list_response`` with a strong ETag.
+
+    A list sent as a single body gets the ETag of that body. A streamed list
+    is sent before its ETag could be computed, so it gets ``etag``, the
+    version stamp cached with it, and none if the stamp is unknown. Read the
+    stamp before the list: a stamp older than the list only costs the client
+    a full response on its next request, whereas a newer one would let it
+    keep a stale copy.
+
+    Args:
+        items (Sequence[Any]): Pydantic models of ``item_type``.
+        item_type (type): The model class.
+        if_none_match (str | None): The request's ``If-None-Match`` header.
+        etag (str | None): The cached ETag of ``items``, if known.
+
+    Returns:
+        Response: ``304``, or the encoded list.
+    """
+    if len(items) < settings.JSON_STREAM_MIN_ITEMS:
+        return etag_json_response(
+            list_adapter(item_type).dump_json(items), if_none_match
+        )
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    response = json_list_response(items, item_type)
+    if etag is not None:
+        response.headers["ETag"] = etag
+    return response
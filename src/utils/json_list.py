@@ -0,0 +1,68 @@
+from collections.abc import AsyncIterator, Sequence
+from functools import lru_cache
+from typing import Any
+
+from pydantic import TypeAdapter
+from starlette.responses import Response, StreamingResponse
+
+from src.core import settings
+
+JSON_MEDIA_TYPE = "application/json"
+
+
+@lru_cache
+def list_adapter(item_type: type) -> TypeAdapter:
+    """Return the cached ``TypeAdapter`` for ``list[item_type]``."""
+    return TypeAdapter(list[item_type])
+
+
+async def encode_json_array(
+    items: Sequence[Any], item_type: type, batch_size: int
+) -> AsyncIterator[bytes]:
+    """
+    Encode ``items`` as one JSON array, ``batch_size`` items per chunk.
+
+    Each batch is dumped straight to bytes by pydantic-core, so neither the
+    intermediate dicts nor the whole document are ever held in memory.
+
+    Args:
+        items (Sequence[Any]): Pydantic models of ``item_type``.
+        item_type (type): The model class, e.g. ``ProductResponse``.
+        batch_size (int): Items encoded per chunk.
+
+    Yields:
+        bytes: Consecutive pieces of the array.
+    """
+    adapter = list_adapter(item_type)
+    yield b"["
+    for start in range(0, len(items), batch_size):
+        batch = adapter.dump_json(items[start:start + batch_size])
+        yield (b"," if start else b"") + batch[1:-1]
+    yield b"]"
+
+
+def json_list_response(items: Sequence[Any], item_type: type, status_code: int = 200) -> Response:
+    """
+    Serialize a list of models directly to a JSON response.
+
+    Lists of at least ``JSON_STREAM_MIN_ITEMS`` items are streamed in batches
+    of ``JSON_STREAM_BATCH_SIZE``; shorter ones are sent as a single body.
+    Either way the models are not validated again, as FastAPI would do for a
+    returned value: routes declare ``response_model=list[item_type]`` for
+    the schema and return this response.
+
+    Args:
+        items (Sequence[Any]): Pydantic models of ``item_type``.
+        item_type (type): The model class.
+        status_code (int): The response status.
+
+    Returns:
+        Response: The encoded list.
+    """
+    if len(items) < settings.JSON_STREAM_MIN_ITEMS:
+        return Response(list_adapter(item_type).dump_json(items), status_code, media_type=JSON_MEDIA_TYPE)
+    return StreamingResponse(
+        encode_json_array(items, item_type, settings.JSON_STREAM_BATCH_SIZE),
+        status_code,
+        media_type=JSON_MEDIA_TYPE,
+    )
@@ -0,0 +1,74 @@
+import json
+from collections.abc import AsyncIterable, AsyncIterator
+from typing import Any
+
+from starlette.requests import ClientDisconnect
+from starlette.responses import StreamingResponse
+from starlette.types import Receive, Scope, Send
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+class DuplexNDJSONResponse(StreamingResponse):
+    """
+    NDJSON streaming response whose body is produced while the request body is still being read.
+
+    Below ASGI 2.4 (uvicorn reports 2.3) ``StreamingResponse`` listens for a
+    client disconnect by calling ``receive`` alongside the body iterator,
+    which would swallow the request chunks the iterator is waiting for. Here
+    the iterator's own reads from ``request.stream()`` notice the disconnect
+    instead.
+    """
+
+    media_type = NDJSON_MEDIA_TYPE
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            await self.stream_response(send)
+        except OSError:
+            raise ClientDisconnect()
+        if self.background is not None:
+            await self.background()
+
+
+async def iter_ndjson_lines(chunks: AsyncIterable[bytes]) -> AsyncIterator[tuple[int, bytes]]:
+    """
+    Split a byte stream into newline-delimited records.
+
+    Only the current partial line is buffered, so memory stays flat however
+    large the stream is. Blank lines are skipped but still counted.
+
+    Args:
+        chunks (AsyncIterable[bytes]): The raw stream, e.g. ``request.stream()``.
+
+    Yields:
+        tuple[int, bytes]: The 1-based line number and the line's content.
+    """
+    buffer = b""
+    number = 0
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            number += 1
+            if line.strip():
+                yield number, line
+    if buffer.strip():
+        yield number + 1, buffer
+
+
+async def encode_ndjson(records: AsyncIterable[Any]) -> AsyncIterator[bytes]:
+    """
+    Encode records as NDJSON, one line per record.
+
+    Args:
+        records (AsyncIterable[Any]): Pydantic models or JSON-serializable values.
+
+    Yields:
+        bytes: One encoded line per record.
+    """
+    async for record in records:
+        if hasattr(record, "model_dump_json"):
+            yield record.model_dump_json().encode() + b"\n"
+        else:
+            yield json.dumps(record).encode() + b"\n"
@@ -0,0 +1,32 @@
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+
+@contextmanager
+def timed(timings: dict[str, float] | None, phase: str) -> Iterator[None]:
+    """
+    Record how long the wrapped block took, in milliseconds, under ``phase``.
+
+    Args:
+        timings (dict[str, float] | None): Where to record the duration; the
+            block runs untimed when None.
+        phase (str): The name of the phase.
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if timings is not None:
+            timings[phase] = (time.perf_counter() - started) * 1000
+
+
+def server_timing(timings: dict[str, float]) -> str:
+    """
+    Format phase durations as a ``Server-Timing`` header value.
+
+    Example:
+        >>> server_timing({"create": 61.25})
+        'create;dur=61.2'
+    """
+    return ", ".join(f"{phase};dur={duration:.1f}" for phase, duration in timings.items())